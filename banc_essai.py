@@ -0,0 +1,382 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from itertools import cycle
+from typing import List, Dict, Optional, Any, Callable, Tuple, Iterable
+
+from bibliotheque import (
+    ajouter_livre,
+    rechercher_livre,
+    recherche_combinee,
+    filtrer_par_genre,
+    trier_catalogue,
+    generer_rapport,
+    charger_bibliotheque,
+    sauvegarder_bibliotheque,
+    sauvegarder_csv
+)
+from emprunts import chemin_emprunts
+from generateur import ecrire_catalogue
+
+# ------------------
+# Banc d'essai (temps et mémoire des fonctions de bibliotheque.py)
+# ------------------
+#
+#   python banc_essai.py --tailles 10000,100000 --sortie resultats.json
+#
+# Pour chaque taille, un catalogue synthétique est généré (generateur.py) puis
+# chaque opération est chronométrée (meilleure de plusieurs séries) et son pic
+# de mémoire mesuré avec tracemalloc. Les résultats sont comparés à la
+# référence enregistrée (banc_reference.json) : une opération trop lente, trop
+# gourmande, ou dont la durée croît plus vite avec la taille du catalogue
+# qu'en référence, est une régression et le code de sortie vaut 1.
+#
+# Les durées absolues dépendent de la machine : réenregistrer la référence
+# (--enregistrer-reference) en changeant de machine. La pente (exposant de
+# croissance entre deux tailles) est, elle, comparable d'une machine à l'autre.
+#
+# Le démarrage est mesuré à part, dans des processus neufs : durée de
+# `import bibliotheque` et délai jusqu'à la première invite du menu de main.py
+# (sur le plus grand catalogue : le chargement se fait en fond et ne doit pas
+# la retarder). Ces durées ont un budget absolu ; le dépasser est une régression.
+
+TAILLES_DEFAUT = (10000, 100000)
+FICHIER_REFERENCE = 'banc_reference.json'
+REPETITIONS = 3
+DUREE_MIN_SERIE = 0.2
+TOLERANCE_TEMPS = 2.0      # durée maximale, en multiple de la référence
+TOLERANCE_MEMOIRE = 1.5    # pic de mémoire maximal, en multiple de la référence
+TOLERANCE_PENTE = 0.3      # écart maximal d'exposant de croissance
+DUREE_MIN_PENTE = 1e-4     # en dessous, le bruit de mesure fausse la pente
+BUDGET_IMPORT = 0.1              # import de bibliotheque, en secondes
+BUDGET_PREMIERE_INVITE = 0.3     # lancement de main.py jusqu'au menu, interpréteur compris
+REPETITIONS_DEMARRAGE = 5
+INVITE = b'Choisissez une option'
+
+TITRES = ('amour', 'nuit', 'château', 'le roi', 'mystère')
+AUTEURS = ('martin', 'hugo', 'zola', 'claire')
+GENRES = ('Roman', 'Poésie', 'Économie', 'science-fiction')
+
+Operation = Tuple[str, Callable[[], Any]]
+
+def operations(catalogue: Any, fichier: str, dossier: str) -> List[Operation]:
+    """Opérations mesurées, dans l'ordre ; les requêtes varient d'un appel à l'autre."""
+    titres, auteurs, genres = cycle(TITRES), cycle(AUTEURS), cycle(GENRES)
+    copie, csv = os.path.join(dossier, 'copie.json'), os.path.join(dossier, 'copie.csv')
+    return [
+        ('charger_bibliotheque', lambda: charger_bibliotheque(fichier)),
+        ('charger_bibliotheque[paresseux]', lambda: charger_bibliotheque(fichier, mode='paresseux')),
+        ('ajouter_livre', lambda: ajouter_livre(catalogue, "Banc d'essai", 'Auteur Banc', 'Roman', 2000, 9.99)),
+        ('rechercher_livre[titre]', lambda: rechercher_livre(catalogue, 'titre', next(titres))),
+        ('rechercher_livre[auteur]', lambda: rechercher_livre(catalogue, 'auteur', next(auteurs))),
+        ('recherche_combinee', lambda: recherche_combinee(catalogue, titre=next(titres), genre=next(genres),
+                                                          disponible=True)),
+        ('filtrer_par_genre', lambda: filtrer_par_genre(catalogue, next(genres))),
+        ('trier_catalogue[titre]', lambda: trier_catalogue(catalogue, 'titre')),
+        ('trier_catalogue[auteur,-prix]', lambda: trier_catalogue(catalogue, 'auteur,-prix')),
+        ('generer_rapport', lambda: _sans_affichage(generer_rapport, catalogue)),
+        ('sauvegarder_bibliotheque', lambda: sauvegarder_bibliotheque(catalogue, copie, compacter=True)),
+        ('sauvegarder_csv', lambda: sauvegarder_csv(catalogue, csv)),
+    ]
+
+def _sans_affichage(fonction: Callable, *args: Any) -> Any:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fonction(*args)
+
+# ------------------
+# Mesures
+# ------------------
+
+def mesurer_duree(fonction: Callable[[], Any], repetitions: int = REPETITIONS,
+                  duree_min: float = DUREE_MIN_SERIE) -> float:
+    """Durée d'un appel, en secondes : la meilleure de `repetitions` séries.
+
+    Une série enchaîne assez d'appels pour durer au moins `duree_min` ; une
+    opération plus longue n'est donc appelée que `repetitions` fois (le premier
+    appel, qui sert à calibrer, compte alors comme une série).
+    """
+    debut = time.perf_counter()
+    fonction()
+    premiere = time.perf_counter() - debut
+    nombre = math.ceil(duree_min / premiere) if premiere < duree_min else 1
+    meilleure = premiere if nombre == 1 else math.inf
+    for _ in range(repetitions - (nombre == 1)):
+        debut = time.perf_counter()
+        for _ in range(nombre):
+            fonction()
+        meilleure = min(meilleure, (time.perf_counter() - debut) / nombre)
+    return meilleure
+
+def mesurer_memoire(fonction: Callable[[], Any]) -> int:
+    """Pic de mémoire allouée (octets, allocations Python) pendant un appel, résultat compris."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fonction()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def mesurer_demarrage(fichier: str, repetitions: int = REPETITIONS_DEMARRAGE) -> Dict[str, float]:
+    """Durées de démarrage (meilleures de `repetitions` processus) : import de bibliotheque, et
+    lancement de main.py sur `fichier` jusqu'à l'affichage de la première invite."""
+    repertoire = os.path.dirname(os.path.abspath(__file__))
+    code = ('import time; debut = time.perf_counter(); import bibliotheque; '
+            'print(time.perf_counter() - debut)')
+    duree_import = min(float(subprocess.run([sys.executable, '-c', code], cwd=repertoire, check=True,
+                                            capture_output=True, text=True).stdout)
+                       for _ in range(repetitions))
+    env = dict(os.environ, BIBLIOTHEQUE_FICHIER=fichier, PYTHONUNBUFFERED='1')
+    premiere_invite = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        processus = subprocess.Popen([sys.executable, os.path.join(repertoire, 'main.py')], env=env,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            lu = b''
+            while INVITE not in lu:
+                morceau = os.read(processus.stdout.fileno(), 65536)
+                if not morceau:
+                    raise RuntimeError("main.py s'est arrêté avant d'afficher le menu.")
+                lu += morceau
+            premiere_invite = min(premiere_invite, time.perf_counter() - debut)
+        finally:
+            processus.kill()
+            processus.wait()
+            processus.stdin.close()
+            processus.stdout.close()
+    return {'import': duree_import, 'premiere_invite': premiere_invite}
+
+def executer_banc(tailles: Iterable[int] = TAILLES_DEFAUT, graine: int = 0, repetitions: int = REPETITIONS,
+                  memoire: bool = True, dossier: Optional[str] = None, demarrage: bool = True,
+                  cache: bool = False, progression: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Mesure toutes les opérations pour chaque taille de catalogue ; retourne les résultats (JSON).
+
+    Les catalogues sont générés dans `dossier` (temporaire par défaut) et
+    réutilisés s'ils y sont déjà, pour la même taille et la même graine. Le
+    cache des requêtes est contourné, sauf avec `cache` : chaque série
+    répétant la même requête, on mesurerait sinon le cache et non la requête.
+    """
+    # Lu deux fois (mesures, puis démarrage) : un générateur doit être matérialisé
+    tailles = sorted(tailles)
+    resultats = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'systeme': platform.platform(),
+                    'processeurs': os.cpu_count()},
+        'graine': graine,
+        'cache': cache,
+        'tailles': {},
+    }
+    with contextlib.ExitStack() as pile:
+        if dossier is None:
+            dossier = pile.enter_context(tempfile.TemporaryDirectory(prefix='banc_'))
+        for taille in tailles:
+            resultats['tailles'][str(taille)] = _mesurer_taille(taille, graine, repetitions, memoire, dossier,
+                                                                cache, progression)
+        if demarrage and resultats['tailles']:
+            taille = tailles[-1]
+            resultats['demarrage'] = mesurer_demarrage(os.path.join(dossier, f'catalogue_{taille}_{graine}.json'))
+            resultats['demarrage']['taille'] = taille
+            if progression is not None:
+                progression(f"démarrage : import {_duree(resultats['demarrage']['import'])}, première invite "
+                            f"{_duree(resultats['demarrage']['premiere_invite'])}")
+    return resultats
+
+def _mesurer_taille(taille: int, graine: int, repetitions: int, memoire: bool, dossier: str, cache: bool,
+                    progression: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+    fichier = os.path.join(dossier, f'catalogue_{taille}_{graine}.json')
+    mesures = {}
+    if not os.path.exists(fichier):
+        debut = time.perf_counter()
+        ecrire_catalogue(fichier, taille, graine)
+        if progression is not None:
+            progression(f"{taille} livres : catalogue généré en {time.perf_counter() - debut:.1f} s")
+    # Premier chargement hors mesure ; la première sauvegarde crée le registre des emprunts
+    # (migration des historiques), comme pour une bibliothèque en service
+    catalogue = charger_bibliotheque(fichier)
+    if not os.path.exists(chemin_emprunts(fichier)):
+        sauvegarder_bibliotheque(catalogue, fichier)
+    if not cache:
+        catalogue.cache = None
+    for nom, fonction in operations(catalogue, fichier, dossier):
+        mesure = {'secondes': mesurer_duree(fonction, repetitions)}
+        if memoire:
+            mesure['pic_memoire'] = mesurer_memoire(fonction)
+        mesures[nom] = mesure
+        if progression is not None:
+            progression(f"{taille} livres : {nom} {_duree(mesure['secondes'])}")
+    return {'octets': os.path.getsize(fichier), 'operations': mesures}
+
+# ------------------
+# Comparaison à la référence
+# ------------------
+
+def _pente(n1: int, t1: float, n2: int, t2: float) -> float:
+    """Exposant de croissance : 1 pour une durée proportionnelle à la taille, 0 pour une durée constante."""
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+def comparer(resultats: Dict[str, Any], reference: Dict[str, Any], tolerance_temps: float = TOLERANCE_TEMPS,
+             tolerance_memoire: float = TOLERANCE_MEMOIRE, tolerance_pente: float = TOLERANCE_PENTE) -> List[str]:
+    """Régressions par rapport à `reference`, une phrase par régression (liste vide si aucune).
+
+    Seules les tailles et opérations présentes des deux côtés sont comparées.
+    """
+    regressions = []
+    communes = sorted((int(t) for t in resultats['tailles'] if t in reference['tailles']))
+    for taille in communes:
+        mesures = resultats['tailles'][str(taille)]['operations']
+        references = reference['tailles'][str(taille)]['operations']
+        for nom in mesures.keys() & references.keys():
+            m, r = mesures[nom], references[nom]
+            if m['secondes'] > r['secondes'] * tolerance_temps:
+                regressions.append(f"{nom} ({taille} livres) : {_duree(m['secondes'])} contre "
+                                   f"{_duree(r['secondes'])} en référence (×{m['secondes'] / r['secondes']:.1f})")
+            if 'pic_memoire' in m and 'pic_memoire' in r and m['pic_memoire'] > r['pic_memoire'] * tolerance_memoire:
+                regressions.append(f"{nom} ({taille} livres) : pic de mémoire {_octets(m['pic_memoire'])} contre "
+                                   f"{_octets(r['pic_memoire'])} en référence")
+    for petite, grande in zip(communes, communes[1:]):
+        petites, grandes = (resultats['tailles'][str(t)]['operations'] for t in (petite, grande))
+        ref_petites, ref_grandes = (reference['tailles'][str(t)]['operations'] for t in (petite, grande))
+        for nom in petites.keys() & grandes.keys() & ref_petites.keys() & ref_grandes.keys():
+            durees = (petites[nom]['secondes'], grandes[nom]['secondes'],
+                      ref_petites[nom]['secondes'], ref_grandes[nom]['secondes'])
+            if min(durees) < DUREE_MIN_PENTE:
+                continue
+            pente = _pente(petite, durees[0], grande, durees[1])
+            pente_reference = _pente(petite, durees[2], grande, durees[3])
+            if pente > pente_reference + tolerance_pente:
+                regressions.append(f"{nom} : croissance en n^{pente:.2f} entre {petite} et {grande} livres, "
+                                   f"contre n^{pente_reference:.2f} en référence")
+    return regressions
+
+def verifier_budgets(resultats: Dict[str, Any], budget_import: float = BUDGET_IMPORT,
+                     budget_premiere_invite: float = BUDGET_PREMIERE_INVITE) -> List[str]:
+    """Durées de démarrage au-delà de leur budget (liste vide si aucune, ou si non mesurées)."""
+    demarrage = resultats.get('demarrage')
+    if demarrage is None:
+        return []
+    depassements = []
+    if demarrage['import'] > budget_import:
+        depassements.append(f"import de bibliotheque : {_duree(demarrage['import'])}, "
+                            f"budget {_duree(budget_import)}")
+    if demarrage['premiere_invite'] > budget_premiere_invite:
+        depassements.append(f"première invite de main.py ({demarrage['taille']} livres) : "
+                            f"{_duree(demarrage['premiere_invite'])}, budget {_duree(budget_premiere_invite)}")
+    return depassements
+
+# ------------------
+# Affichage
+# ------------------
+
+def _duree(secondes: float) -> str:
+    if secondes >= 1:
+        return f"{secondes:.2f} s"
+    if secondes >= 1e-3:
+        return f"{secondes * 1e3:.2f} ms"
+    return f"{secondes * 1e6:.1f} µs"
+
+def _octets(n: int) -> str:
+    for unite in ('o', 'Ko', 'Mo'):
+        if n < 1024:
+            return f"{n:.0f} {unite}"
+        n /= 1024
+    return f"{n:.1f} Go"
+
+def afficher_resultats(resultats: Dict[str, Any]) -> None:
+    tailles = sorted(resultats['tailles'], key=int)
+    noms = list(dict.fromkeys(n for t in tailles for n in resultats['tailles'][t]['operations']))
+    print(f"\n⏱️ Banc d'essai (Python {resultats['machine']['python']}, "
+          f"{resultats['machine']['processeurs']} processeur(s))")
+    print(f"{'opération':<34}" + ''.join(f"{t + ' livres':>24}" for t in tailles))
+    for nom in noms:
+        cellules = []
+        for t in tailles:
+            m = resultats['tailles'][t]['operations'].get(nom)
+            cellule = '' if m is None else _duree(m['secondes'])
+            if m is not None and 'pic_memoire' in m:
+                cellule += f" / {_octets(m['pic_memoire'])}"
+            cellules.append(f"{cellule:>24}")
+        print(f"{nom:<34}" + ''.join(cellules))
+    demarrage = resultats.get('demarrage')
+    if demarrage is not None:
+        print(f"{'démarrage : import':<34}{_duree(demarrage['import']):>24}")
+        print(f"{'démarrage : première invite':<34}{_duree(demarrage['premiere_invite']):>24}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parseur = argparse.ArgumentParser(description="Banc d'essai des fonctions de bibliotheque.py.")
+    parseur.add_argument('--tailles', default=','.join(map(str, TAILLES_DEFAUT)),
+                         help="tailles de catalogue, séparées par des virgules (10k à 10M)")
+    parseur.add_argument('--graine', type=int, default=0)
+    parseur.add_argument('--repetitions', type=int, default=REPETITIONS)
+    parseur.add_argument('--sans-memoire', action='store_true', help="ne pas mesurer le pic de mémoire")
+    parseur.add_argument('--dossier', default=None, help="dossier des catalogues générés (réutilisés)")
+    parseur.add_argument('--sortie', default=None, help="fichier des résultats JSON ('-' : sortie standard)")
+    parseur.add_argument('--reference', default=FICHIER_REFERENCE)
+    parseur.add_argument('--enregistrer-reference', action='store_true',
+                         help="enregistrer ces résultats comme nouvelle référence")
+    parseur.add_argument('--tolerance-temps', type=float, default=TOLERANCE_TEMPS)
+    parseur.add_argument('--tolerance-memoire', type=float, default=TOLERANCE_MEMOIRE)
+    parseur.add_argument('--tolerance-pente', type=float, default=TOLERANCE_PENTE)
+    parseur.add_argument('--cache', action='store_true',
+                         help="mesurer les requêtes avec le cache des résultats (contourné par défaut)")
+    parseur.add_argument('--sans-demarrage', action='store_true',
+                         help="ne pas mesurer le démarrage (import, première invite de main.py)")
+    parseur.add_argument('--budget-import', type=float, default=BUDGET_IMPORT, help="en secondes")
+    parseur.add_argument('--budget-premiere-invite', type=float, default=BUDGET_PREMIERE_INVITE,
+                         help="en secondes")
+    args = parseur.parse_args(argv)
+    try:
+        tailles = [int(t) for t in args.tailles.split(',') if t.strip()]
+    except ValueError:
+        parseur.error("--tailles : entiers séparés par des virgules attendus.")
+
+    resultats = executer_banc(tailles, args.graine, args.repetitions, not args.sans_memoire, args.dossier,
+                              not args.sans_demarrage, args.cache, progression=lambda message: print(message, file=sys.stderr))
+    afficher_resultats(resultats)
+    if args.sortie == '-':
+        json.dump(resultats, sys.stdout, indent=2)
+        print()
+    elif args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2)
+
+    depassements = verifier_budgets(resultats, args.budget_import, args.budget_premiere_invite)
+    if depassements:
+        print("\n❌ Budget de démarrage dépassé :", file=sys.stderr)
+        for depassement in depassements:
+            print(f"  - {depassement}", file=sys.stderr)
+    if args.enregistrer_reference:
+        with open(args.reference, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2)
+        print(f"\n✅ Référence enregistrée dans '{args.reference}'.")
+        return 1 if depassements else 0
+    if not os.path.exists(args.reference):
+        print(f"\n⚠️ Pas de référence '{args.reference}' : rien à comparer.")
+        return 1 if depassements else 0
+    with open(args.reference, 'r', encoding='utf-8') as f:
+        reference = json.load(f)
+    regressions = comparer(resultats, reference, args.tolerance_temps, args.tolerance_memoire,
+                           args.tolerance_pente)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) par rapport à '{args.reference}' :", file=sys.stderr)
+        for regression in regressions:
+            print(f"  - {regression}", file=sys.stderr)
+        return 1
+    if depassements:
+        return 1
+    print(f"\n✅ Aucune régression par rapport à '{args.reference}'.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
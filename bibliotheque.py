@@ -1,23 +1,48 @@
+import functools
+import heapq
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Any
-from rich.console import Console
-from rich.table import Table
-import csv
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from typing import List, Dict, Optional, Any, Iterable, Callable, BinaryIO, Tuple
+
+from catalogue import Catalogue
+from journal import Journal, chemin_journal, rejouer_journal
+from index import normaliser, cle_tri, trier_par_cles
+from flux_json import LecteurCatalogue, lire_livre
+from livre import Livre, vers_json
+from stockage_sqlite import BibliothequeSQLite, est_chemin_sqlite
+from snapshot_binaire import SnapshotBinaire, est_chemin_binaire, ecrire_snapshot_binaire
+from export import exporter_livres
+from emprunts import RegistreEmprunts, RegistreMemoire, chemin_emprunts, FORMAT_DATE, DUREE_EMPRUNT
+from verrous import VerrouFichier
+from metriques import mesure, compter
 
 FICHIER_DATA = 'bibliotheque.json'
+MODES_CHARGEMENT = ('complet', 'flux', 'paresseux', 'mmap')
+
+# Conteneurs offrant get / supprimer / modifier / historique / prochain_id
+# (SnapshotBinaire est en lecture seule : ses méthodes de mutation lèvent ValueError)
+_CONTENEURS = (Catalogue, BibliothequeSQLite, SnapshotBinaire)
 
 def generer_id_unique(livres: List[Dict[str, Any]]) -> int:
-    """Retourne un ID unique (1 + max existant)."""
+    """Retourne un ID unique (compteur monotone d'un Catalogue ou de la base, sinon 1 + max existant)."""
+    if isinstance(livres, _CONTENEURS):
+        return livres.prochain_id
     if not livres:
         return 1
     max_id = max((livre.get('id', 0) for livre in livres), default=0)
     return max_id + 1
 
-def verifier_livre(titre: str, auteur: str, annee: int, prix: float, genre: str) -> None:
-    """Lève ValueError si une validation échoue."""
-    current_year = datetime.now().year
+def verifier_livre(titre: str, auteur: str, annee: int, prix: float, genre: str,
+                   annee_courante: Optional[int] = None) -> None:
+    """Lève ValueError si une validation échoue.
+
+    Pour valider un lot, passer `annee_courante` évite de relire l'horloge à chaque livre.
+    """
+    current_year = annee_courante or datetime.now().year
     erreurs = []
 
     if not isinstance(titre, str) or not titre.strip():
@@ -34,36 +59,175 @@ def verifier_livre(titre: str, auteur: str, annee: int, prix: float, genre: str)
     if erreurs:
         raise ValueError("; ".join(erreurs))
 
+# ------------------
+# Accès concurrents
+# ------------------
+#
+# Un Catalogue ou une base SQLite porte un verrou lecteurs-rédacteur (`verrou`)
+# et des verrous par livre (`verrous_livres`) : les recherches s'exécutent en
+# parallèle, les mutations une à la fois, et les emprunts / retours d'un même
+# livre l'un après l'autre. Une liste simple n'est pas protégée.
+
+def _lecture(livres: List[Dict[str, Any]]) -> Any:
+    verrou = getattr(livres, 'verrou', None)
+    return nullcontext() if verrou is None else verrou.lecture()
+
+def _ecriture(livres: List[Dict[str, Any]]) -> Any:
+    verrou = getattr(livres, 'verrou', None)
+    return nullcontext() if verrou is None else verrou.ecriture()
+
+def _verrou_livre(livres: List[Dict[str, Any]], id_livre: int) -> Any:
+    verrous = getattr(livres, 'verrous_livres', None)
+    return nullcontext() if verrous is None else verrous.verrou(id_livre)
+
+def _en_lecture(fonction: Callable) -> Callable:
+    """Décore une fonction `f(livres, ...)` pour l'exécuter sous le verrou de lecture de `livres`."""
+    @functools.wraps(fonction)
+    def sous_verrou(livres, *args, **kwargs):
+        with _lecture(livres):
+            return fonction(livres, *args, **kwargs)
+    return sous_verrou
+
+def _en_ecriture(fonction: Callable) -> Callable:
+    """Décore une fonction `f(livres, ...)` pour l'exécuter sous le verrou d'écriture de `livres`."""
+    @functools.wraps(fonction)
+    def sous_verrou(livres, *args, **kwargs):
+        with _ecriture(livres):
+            return fonction(livres, *args, **kwargs)
+    return sous_verrou
+
+# ------------------
+# Cache des requêtes
+# ------------------
+#
+# Sur un Catalogue (attribut `cache`, voir cache_requetes.py), les recherches,
+# filtres, tris et le rapport sont gardés par paramètres normalisés jusqu'à la
+# prochaine mutation. Le cache est consulté sous le verrou de lecture : aucune
+# mutation ne peut changer la version pendant le calcul.
+
+def _en_cache(cle: Callable[..., Tuple]) -> Callable:
+    """Décore une requête `f(livres, ...)` ; `cle(...)` normalise ses autres paramètres."""
+    def decorateur(fonction: Callable) -> Callable:
+        nom = fonction.__name__
+
+        @functools.wraps(fonction)
+        def en_cache(livres, *args, **kwargs):
+            cache = getattr(livres, 'cache', None)
+            if cache is None:
+                return fonction(livres, *args, **kwargs)
+            try:
+                cle_requete = (nom,) + cle(*args, **kwargs)
+            except (ValueError, TypeError, AttributeError):
+                # Paramètres invalides : la requête lève elle-même l'erreur attendue
+                return fonction(livres, *args, **kwargs)
+            return cache.obtenir(livres.version, cle_requete, lambda: fonction(livres, *args, **kwargs))
+        return en_cache
+    return decorateur
+
+def _texte_ou_none(valeur: Optional[str]) -> Optional[str]:
+    return normaliser(valeur).strip() if valeur else None
+
 # ------------------
 # Fonctions demandées par le sujet (noms conservés)
 # ------------------
 
+def _journaliser(livres: List[Dict[str, Any]], entree: Dict[str, Any]) -> None:
+    """Consigne une mutation dans le journal du catalogue, s'il en a un."""
+    journal = getattr(livres, 'journal', None)
+    if journal is not None:
+        livres.sequence += 1
+        journal.ecrire(livres.sequence, entree)
+
+def _journaliser_lot(livres: List[Dict[str, Any]], entrees: Iterable[Dict[str, Any]]) -> None:
+    """Consigne plusieurs mutations en une seule écriture (et au plus un fsync)."""
+    journal = getattr(livres, 'journal', None)
+    if journal is not None:
+        entrees = list(entrees)
+        journal.ecrire_lot(livres.sequence + 1, entrees)
+        livres.sequence += len(entrees)
+
+def _modifier(livres: List[Dict[str, Any]], livre: Dict[str, Any], champs: Dict[str, Any]) -> None:
+    """Met à jour des champs d'un livre (en passant par les index d'un Catalogue ou par la base)."""
+    if isinstance(livres, _CONTENEURS):
+        livres.modifier(livre['id'], champs)
+    else:
+        livre.update(champs)
+
+def _historique(livres: List[Dict[str, Any]], livre: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Historique d'un livre, relu à la demande (registre des emprunts, Catalogue paresseux ou base SQLite)."""
+    registre = getattr(livres, 'emprunts', None)
+    if registre is not None:
+        return registre.historique(livre['id'])
+    if isinstance(livres, _CONTENEURS):
+        return livres.historique(livre['id'])
+    return livre.setdefault('historique', [])
+
+def _nouveau_livre(id_livre: int, titre: str, auteur: str, genre: str, annee: int, prix: float) -> Livre:
+    """Construit un livre déjà validé (représentation compacte, accessible comme un dict)."""
+    return Livre.nouveau(id_livre, titre.strip(), auteur.strip(), genre.strip(), annee, float(prix))
+
+@mesure
+@_en_ecriture
 def ajouter_livre(livres: List[Dict[str, Any]], titre: str, auteur: str, genre: str, annee: int, prix: float) -> Dict[str, Any]:
     """Ajoute un livre après validation et retourne le dictionnaire ajouté."""
     verifier_livre(titre, auteur, annee, prix, genre)
-    nouvel_id = generer_id_unique(livres)
-    livre = {
-        'id': nouvel_id,
-        'titre': titre.strip(),
-        'auteur': auteur.strip(),
-        'genre': genre.strip(),
-        'annee_publication': annee,
-        'prix': float(prix),
-        'disponible': True,
-        'note': 0,
-        'historique': []
-    }
+    livre = _nouveau_livre(generer_id_unique(livres), titre, auteur, genre, annee, prix)
+    _journaliser(livres, {'op': 'ajout', 'livre': livre})
     livres.append(livre)
     return livre
 
-RICH_CONSOLE = Console()
+@mesure
+def ajouter_livres(livres: List[Dict[str, Any]], enregistrements: Iterable[Dict[str, Any]],
+                   valider: bool = True) -> List[Dict[str, Any]]:
+    """Ajoute un lot de livres en une passe et retourne les dictionnaires ajoutés.
 
-def afficher_tous_les_livres(livres: List[Dict[str, Any]]) -> None:
-    """Affiche la liste des livres sous forme de table (rich)."""
-    if not livres:
-        RICH_CONSOLE.print("📚 La bibliothèque est vide.", style="bold red")
-        return
-    table = Table(title="📚 Bibliothèque")
+    Chaque enregistrement fournit 'titre', 'auteur', 'genre', 'annee_publication'
+    (ou 'annee') et 'prix'. Tout le lot est validé avant insertion : si un
+    enregistrement est invalide, ValueError est levée et rien n'est ajouté.
+    Avec `valider=False`, les enregistrements ont déjà été validés (import en
+    masse, voir importation.py). L'appelant sauvegarde une seule fois après le lot.
+    """
+    annee_courante = datetime.now().year
+    valides = []
+    for i, rec in enumerate(enregistrements, start=1):
+        titre, auteur, genre = rec.get('titre'), rec.get('auteur'), rec.get('genre')
+        annee = rec.get('annee_publication', rec.get('annee'))
+        prix = rec.get('prix')
+        if valider:
+            try:
+                verifier_livre(titre, auteur, annee, prix, genre, annee_courante)
+            except ValueError as e:
+                raise ValueError(f"Enregistrement n°{i} : {e}")
+        valides.append((titre, auteur, genre, annee, prix))
+    # Les ids ne sont attribués qu'une fois le verrou pris
+    with _ecriture(livres):
+        premier_id = generer_id_unique(livres)
+        nouveaux = [_nouveau_livre(premier_id + i, *v) for i, v in enumerate(valides)]
+        _journaliser_lot(livres, ({'op': 'ajout', 'livre': livre} for livre in nouveaux))
+        livres.extend(nouveaux)
+    return nouveaux
+
+# rich n'est importé, et la console créée, qu'au premier affichage : recherche,
+# persistance et export n'en paient pas le coût au démarrage.
+_console = None
+
+def console() -> 'Console':
+    """Console rich partagée par les affichages."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+def __getattr__(nom: str) -> Any:
+    # Compatibilité : `RICH_CONSOLE` reste accessible, créée à la première lecture
+    if nom == 'RICH_CONSOLE':
+        return console()
+    raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+
+def _table_livres(livres: Iterable[Dict[str, Any]], titre: str = "📚 Bibliothèque") -> 'Table':
+    from rich.table import Table
+    table = Table(title=titre)
     table.add_column("ID", justify="right", style="cyan")
     table.add_column("Titre", style="magenta")
     table.add_column("Auteur", style="green")
@@ -80,68 +244,229 @@ def afficher_tous_les_livres(livres: List[Dict[str, Any]]) -> None:
         etoiles = '⭐' * note + '☆' * (5 - note)
         table.add_row(str(l.get('id', '')), titre, l.get('auteur', ''), l.get('genre', ''),
                       str(l.get('annee_publication', '')), f"{l.get('prix', 0.0):.2f}", statut, etoiles)
-    RICH_CONSOLE.print(table)
+    return table
+
+def afficher_tous_les_livres(livres: List[Dict[str, Any]]) -> None:
+    """Affiche la liste des livres sous forme de table (rich)."""
+    if not livres:
+        console().print("📚 La bibliothèque est vide.", style="bold red")
+        return
+    console().print(_table_livres(livres))
+
+# ------------------
+# Affichage paginé
+# ------------------
+
+TAILLE_PAGE = 20
+
+class PagesLivres:
+    """Découpe un itérable de livres en pages lues à la demande.
+
+    Seuls les livres nécessaires à la page demandée sont tirés de l'itérable :
+    afficher la première page ne dépend pas de la taille du catalogue. Les
+    livres déjà lus sont gardés pour revenir en arrière ; une liste est
+    simplement découpée sans copie préalable.
+    """
+
+    def __init__(self, livres: Iterable[Dict[str, Any]], taille_page: int = TAILLE_PAGE,
+                 total: Optional[int] = None) -> None:
+        if taille_page < 1:
+            raise ValueError("La taille de page doit être au moins 1.")
+        self.taille_page = taille_page
+        self._liste = livres if isinstance(livres, list) else None
+        self._source = None if self._liste is not None else iter(livres)
+        self._lus: List[Dict[str, Any]] = []
+        try:
+            self._total = len(livres)
+        except TypeError:
+            # Longueur annoncée par l'appelant (itérateur de tri), sinon découverte en lisant
+            self._total = total
+
+    @property
+    def nb_pages(self) -> Optional[int]:
+        """Nombre de pages, ou None tant que la fin d'un itérable sans longueur n'est pas atteinte."""
+        if self._total is None:
+            return None
+        return max(1, -(-self._total // self.taille_page))
+
+    def page(self, numero: int) -> List[Dict[str, Any]]:
+        """Livres de la page `numero` (à partir de 1) ; liste vide au-delà de la fin."""
+        if numero < 1:
+            raise ValueError("Le numéro de page doit être au moins 1.")
+        debut = (numero - 1) * self.taille_page
+        fin = debut + self.taille_page
+        if self._liste is not None:
+            return self._liste[debut:fin]
+        if self._source is not None and len(self._lus) < fin:
+            manquants = fin - len(self._lus)
+            lot = list(islice(self._source, manquants))
+            self._lus.extend(lot)
+            if len(lot) < manquants:
+                self._source = None
+                self._total = len(self._lus)
+        return self._lus[debut:fin]
 
+def afficher_page(pages: PagesLivres, numero: int) -> None:
+    """Affiche une seule page de livres (rich) ; seule cette page est mise en forme."""
+    livres = pages.page(numero)
+    if not livres and numero == 1:
+        console().print("📚 La bibliothèque est vide.", style="bold red")
+        return
+    total = pages.nb_pages
+    console().print(_table_livres(livres, f"📚 Bibliothèque — page {numero}/{total if total else '?'}"))
+
+@mesure
+@_en_lecture
+@_en_cache(lambda critere, valeur: (critere.lower(), normaliser(valeur).strip()))
 def rechercher_livre(livres: List[Dict[str, Any]], critere: str, valeur: str) -> List[Dict[str, Any]]:
-    """Recherche case-insensitive par titre, auteur ou genre. Retourne la liste des correspondances."""
+    """Recherche par titre, auteur ou genre, sans tenir compte de la casse ni des accents.
+
+    Sur un Catalogue, seuls les candidats de l'index de trigrammes sont examinés.
+    """
     critere = critere.lower()
-    valeur = valeur.lower().strip()
     if critere not in ('titre', 'auteur', 'genre'):
         raise ValueError("Critère de recherche invalide; utiliser 'titre', 'auteur' ou 'genre'.")
-    resultats = [l for l in livres if valeur in str(l.get(critere, '')).lower()]
+    if isinstance(livres, Catalogue):
+        return livres.livres_par_ids(livres.texte.rechercher(critere, valeur))
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.rechercher(critere, valeur)
+    valeur = normaliser(valeur).strip()
+    compter(len(livres))
+    resultats = [l for l in livres if valeur in normaliser(l.get(critere, ''))]
     return resultats
 
+@mesure
 def supprimer_livre(livres: List[Dict[str, Any]], id_livre: int) -> bool:
     """Supprime un livre par id. Retourne True si supprimé, False sinon."""
-    for i, l in enumerate(livres):
-        if l.get('id') == id_livre:
-            del livres[i]
-            return True
-    return False
+    with _verrou_livre(livres, id_livre), _ecriture(livres):
+        if isinstance(livres, Catalogue):
+            if livres.get(id_livre) is None:
+                return False
+            _journaliser(livres, {'op': 'suppression', 'id': id_livre})
+            return livres.supprimer(id_livre)
+        if isinstance(livres, (BibliothequeSQLite, SnapshotBinaire)):
+            return livres.supprimer(id_livre)
+        for i, l in enumerate(livres):
+            if l.get('id') == id_livre:
+                del livres[i]
+                return True
+        return False
 
 # ------------------
 # Emprunts / Retours
 # ------------------
 
 def trouver_par_id_interne(livres: List[Dict[str, Any]], id_livre: int) -> Optional[Dict[str, Any]]:
-    """Helper: cherche un livre par id."""
+    """Helper: cherche un livre par id (O(1) sur un Catalogue, par clé primaire en base)."""
+    if isinstance(livres, _CONTENEURS):
+        return livres.get(id_livre)
     for l in livres:
         if l.get('id') == id_livre:
             return l
     return None
 
+@mesure
 def emprunter_livre(livres: List[Dict[str, Any]], id_livre: int) -> None:
     """Marque un livre comme emprunté si disponible, lève ValueError sinon."""
-    livre = trouver_par_id_interne(livres, id_livre)
-    if livre is None:
-        raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
-    if not livre.get('disponible', True):
-        raise ValueError("Le livre est déjà emprunté.")
-    livre['disponible'] = False
-    livre.setdefault('historique', []).append({'action': 'emprunt', 'date': datetime.now().strftime("%Y-%m-%d %H:%M")})
+    _changer_disponibilite(livres, id_livre, False)
 
+@mesure
 def retourner_livre(livres: List[Dict[str, Any]], id_livre: int) -> None:
     """Marque un livre comme disponible si il était emprunté, lève ValueError sinon."""
-    livre = trouver_par_id_interne(livres, id_livre)
-    if livre is None:
-        raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
-    if livre.get('disponible', True):
-        raise ValueError("Le livre est déjà disponible (non emprunté).")
-    livre['disponible'] = True
-    livre.setdefault('historique', []).append({'action': 'retour', 'date': datetime.now().strftime("%Y-%m-%d %H:%M")})
+    _changer_disponibilite(livres, id_livre, True)
+
+def _changer_disponibilite(livres: List[Dict[str, Any]], id_livre: int, disponible: bool) -> None:
+    """Emprunt (disponible=False) ou retour (disponible=True) d'un livre.
 
+    Le verrou du livre couvre la vérification et la mise à jour : deux emprunts
+    simultanés du même livre ne peuvent pas réussir tous les deux. Le verrou
+    d'écriture n'est pris que pour la mise à jour.
+    """
+    action = 'retour' if disponible else 'emprunt'
+    deja = "Le livre est déjà disponible (non emprunté)." if disponible else "Le livre est déjà emprunté."
+    with _verrou_livre(livres, id_livre):
+        with _lecture(livres):
+            livre = trouver_par_id_interne(livres, id_livre)
+        if livre is None:
+            raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
+        if bool(livre.get('disponible', True)) == disponible:
+            raise ValueError(deja)
+        maintenant = datetime.now()
+        evenement = {'action': action, 'date': maintenant.strftime(FORMAT_DATE)}
+        with _ecriture(livres):
+            if isinstance(livres, BibliothequeSQLite):
+                # Mise à jour conditionnelle + historique dans une seule transaction
+                if not livres.changer_disponibilite(id_livre, disponible, evenement):
+                    raise ValueError(deja)
+                return
+            _journaliser(livres, {'op': 'maj', 'id': id_livre, 'champs': {'disponible': disponible},
+                                  'historique': evenement})
+            _modifier(livres, livre, {'disponible': disponible})
+            registre = getattr(livres, 'emprunts', None)
+            if registre is not None:
+                # Écrit dans le registre à la sauvegarde, avec l'état du livre (voir emprunts.py)
+                registre.ajouter(id_livre, action, maintenant)
+            else:
+                _historique(livres, livre).append(evenement)
+
+@mesure
+@_en_lecture
+@_en_cache(lambda genre: (normaliser(genre).strip(),))
 def filtrer_par_genre(livres: List[Dict[str, Any]], genre: str) -> List[Dict[str, Any]]:
-    """Retourne les livres d'un genre donné (case-insensitive)."""
-    g = genre.lower().strip()
-    return [l for l in livres if l.get('genre', '').lower() == g]
+    """Retourne les livres d'un genre donné (casse et accents ignorés)."""
+    if isinstance(livres, Catalogue):
+        ids = livres.genres.ids(genre)
+        compter(len(ids))
+        return livres.livres_par_ids(ids)
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.filtrer('genre', genre)
+    g = normaliser(genre).strip()
+    compter(len(livres))
+    return [l for l in livres if normaliser(l.get('genre', '')).strip() == g]
+
+@mesure
+@_en_lecture
+def filtrer_par_auteur(livres: List[Dict[str, Any]], auteur: str) -> List[Dict[str, Any]]:
+    """Retourne les livres d'un auteur donné (nom complet, casse et accents ignorés)."""
+    if isinstance(livres, Catalogue):
+        ids = livres.auteurs.ids(auteur)
+        compter(len(ids))
+        return livres.livres_par_ids(ids)
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.filtrer('auteur', auteur)
+    a = normaliser(auteur).strip()
+    compter(len(livres))
+    return [l for l in livres if normaliser(l.get('auteur', '')).strip() == a]
 
 # ------------------
 # Statistiques / Rapport
 # ------------------
 
-def generer_rapport(livres: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Calcule et affiche des statistiques; retourne aussi un dictionnaire avec les valeurs."""
+@mesure
+@_en_lecture
+@_en_cache(lambda k=3: (k,))
+def calculer_rapport(livres: List[Dict[str, Any]], k: int = 3) -> Dict[str, Any]:
+    """Calcule les statistiques de la bibliothèque sans rien afficher.
+
+    Sur un Catalogue, les compteurs sont maintenus à chaque mutation : le calcul
+    ne coûte que O(k) (plus le nombre de genres).
+    """
+    if isinstance(livres, Catalogue):
+        stats = livres.stats
+        return {
+            'total': stats.total,
+            'disponibles': stats.disponibles,
+            'empruntes': stats.total - stats.disponibles,
+            'prix_total': stats.prix_total,
+            'genre_populaire': stats.genre_populaire(),
+            'moins_chers': stats.moins_chers(k),
+            'plus_chers': stats.plus_chers(k)
+        }
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.rapport(k)
+
     total = len(livres)
+    compter(total)
     disponibles = sum(1 for l in livres if l.get('disponible', False))
     empruntes = total - disponibles
     prix_total = sum(float(l.get('prix', 0.0)) for l in livres)
@@ -153,12 +478,11 @@ def generer_rapport(livres: List[Dict[str, Any]]) -> Dict[str, Any]:
         genre_counts[g] = genre_counts.get(g, 0) + 1
     genre_populaire = max(genre_counts.items(), key=lambda x: x[1])[0] if genre_counts else None
 
-    # Livres les plus et moins chers
-    livres_trie_par_prix = sorted(livres, key=lambda x: x.get('prix', 0.0))
-    moins_chers = livres_trie_par_prix[:3] if livres_trie_par_prix else []
-    plus_chers = livres_trie_par_prix[-3:][::-1] if livres_trie_par_prix else []
+    # Livres les plus et moins chers (sélection partielle, sans trier tout le catalogue)
+    moins_chers = heapq.nsmallest(k, livres, key=lambda x: x.get('prix', 0.0))
+    plus_chers = heapq.nlargest(k, livres, key=lambda x: x.get('prix', 0.0))
 
-    rapport = {
+    return {
         'total': total,
         'disponibles': disponibles,
         'empruntes': empruntes,
@@ -168,107 +492,561 @@ def generer_rapport(livres: List[Dict[str, Any]]) -> Dict[str, Any]:
         'plus_chers': plus_chers
     }
 
-    # Affichage convivial
+def afficher_rapport(rapport: Dict[str, Any]) -> None:
+    """Affiche un rapport produit par calculer_rapport."""
     print("\n📊 Rapport de la bibliothèque :")
-    print(f"- Nombre total de livres : {total}")
-    print(f"- Disponible(s) : {disponibles} ✅")
-    print(f"- Emprunté(s) : {empruntes} ❌")
-    print(f"- Valeur totale (prix) : {prix_total:.2f} €")
-    if genre_populaire:
-        print(f"- Genre le plus représenté : {genre_populaire}")
-
-    if plus_chers:
+    print(f"- Nombre total de livres : {rapport['total']}")
+    print(f"- Disponible(s) : {rapport['disponibles']} ✅")
+    print(f"- Emprunté(s) : {rapport['empruntes']} ❌")
+    print(f"- Valeur totale (prix) : {rapport['prix_total']:.2f} €")
+    if rapport['genre_populaire']:
+        print(f"- Genre le plus représenté : {rapport['genre_populaire']}")
+
+    if rapport['plus_chers']:
         print("\n📈 Livres les plus chers :")
-        for l in plus_chers:
+        for l in rapport['plus_chers']:
             print(f" - {l.get('titre')} ({l.get('prix'):.2f} €) — ID {l.get('id')}")
-    if moins_chers:
+    if rapport['moins_chers']:
         print("\n📉 Livres les moins chers :")
-        for l in moins_chers:
+        for l in rapport['moins_chers']:
             print(f" - {l.get('titre')} ({l.get('prix'):.2f} €) — ID {l.get('id')}")
 
+@mesure
+def generer_rapport(livres: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Calcule et affiche des statistiques; retourne aussi un dictionnaire avec les valeurs."""
+    rapport = calculer_rapport(livres)
+    afficher_rapport(rapport)
     return rapport
 
+# ------------------
+# Suivi des emprunts
+# ------------------
+
+def _registre(livres: List[Dict[str, Any]]):
+    """Registre des emprunts : fichier dédié, base SQLite, ou historiques intégrés aux livres."""
+    if isinstance(livres, BibliothequeSQLite):
+        return livres
+    registre = getattr(livres, 'emprunts', None)
+    if registre is not None:
+        return registre
+    return RegistreMemoire((l['id'], _historique(livres, l)) for l in livres)
+
+def _par_id(livres: List[Dict[str, Any]]) -> Callable[[int], Optional[Dict[str, Any]]]:
+    if isinstance(livres, _CONTENEURS):
+        return livres.get
+    return {l.get('id'): l for l in livres}.get
+
+@mesure
+@_en_lecture
+def emprunts_recents(livres: List[Dict[str, Any]], jours: int = 30) -> List[Tuple[Dict[str, Any], datetime]]:
+    """(livre, date) des emprunts des `jours` derniers jours, du plus ancien au plus récent.
+
+    Avec un registre des emprunts, seule la plage de dates demandée est lue. Les
+    livres supprimés depuis sont omis.
+    """
+    trouver = _par_id(livres)
+    debut = datetime.now() - timedelta(days=jours)
+    resultats = []
+    for id_livre, _, date in _registre(livres).evenements(debut, action='emprunt'):
+        livre = trouver(id_livre)
+        if livre is not None:
+            resultats.append((livre, date))
+    return resultats
+
+@mesure
+@_en_lecture
+def livres_en_retard(livres: List[Dict[str, Any]], jours: int = DUREE_EMPRUNT.days) -> List[Tuple[Dict[str, Any], datetime]]:
+    """(livre, date d'emprunt) des livres empruntés depuis plus de `jours` jours, du plus ancien au plus récent."""
+    trouver = _par_id(livres)
+    retards = _registre(livres).en_retard(duree=timedelta(days=jours))
+    return [(trouver(i), date) for i, date in retards if trouver(i) is not None]
+
+@mesure
+@_en_lecture
+def livres_plus_empruntes(livres: List[Dict[str, Any]], k: int = 10) -> List[Tuple[Dict[str, Any], int]]:
+    """(livre, nombre d'emprunts) des k livres les plus empruntés."""
+    trouver = _par_id(livres)
+    return [(trouver(i), n) for i, n in _registre(livres).plus_empruntes(k, garder=lambda i: trouver(i) is not None)]
+
+def afficher_suivi_emprunts(livres: List[Dict[str, Any]], jours: int = 30, k: int = 5) -> None:
+    """Affiche les emprunts récents, les retards et les livres les plus empruntés."""
+    recents = emprunts_recents(livres, jours)
+    print(f"\n📥 Emprunts des {jours} derniers jours : {len(recents)}")
+    for livre, date in recents[-k:]:
+        print(f" - {date.strftime(FORMAT_DATE)} : {livre.get('titre')} — ID {livre.get('id')}")
+    retards = livres_en_retard(livres)
+    print(f"\n⏰ Emprunts en retard (plus de {DUREE_EMPRUNT.days} jours) : {len(retards)}")
+    for livre, date in retards:
+        print(f" - {livre.get('titre')} — emprunté le {date.strftime(FORMAT_DATE)} — ID {livre.get('id')}")
+    populaires = livres_plus_empruntes(livres, k)
+    if populaires:
+        print("\n🏆 Livres les plus empruntés :")
+        for livre, n in populaires:
+            print(f" - {livre.get('titre')} ({n} emprunt{'s' if n > 1 else ''}) — ID {livre.get('id')}")
+
 # ------------------
 # Persistance (JSON)
 # ------------------
 
-def charger_bibliotheque(filename: str = FICHIER_DATA) -> List[Dict[str, Any]]:
-    """Charge la bibliothèque depuis un fichier JSON. Si le fichier n'existe pas, retourne une liste vide."""
-    if not os.path.exists(filename):
-        return []
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if not isinstance(data, list):
+@mesure
+def charger_bibliotheque(filename: str = FICHIER_DATA, journaliser: bool = False, fsync: str = 'toujours',
+                         seuil_compactage: int = 1000, mode: str = 'complet',
+                         progression: Optional[Callable[[int, int], None]] = None, emprunts: bool = True) -> Catalogue:
+    """Charge la bibliothèque depuis un fichier JSON puis rejoue son journal s'il existe.
+
+    Si le fichier n'existe pas, part d'un catalogue vide. Accepte l'ancien format
+    (liste de livres) et le format courant {"prochain_id": ..., "sequence": ..., "livres": [...]}.
+    Avec `journaliser=True`, les mutations suivantes sont ajoutées au journal
+    (voir journal.py) au lieu de réécrire tout le fichier à chaque sauvegarde.
+
+    Modes : 'complet' (json.load du fichier entier), 'flux' (lecture livre par
+    livre, mémoire bornée, `progression(octets_lus, octets_total)` appelée à
+    chaque bloc) et 'paresseux' (comme 'flux', mais l'historique de chaque livre
+    n'est relu depuis le fichier qu'au premier besoin).
+
+    Un chemin en .db / .sqlite / .sqlite3 ouvre une base SQLite (voir ouvrir_sqlite).
+    Un chemin en .bin est un snapshot binaire (voir snapshot_binaire.py) : le mode
+    'mmap' retourne directement une vue en lecture seule, ouverte sans désérialiser
+    le fichier (journal non rejoué) ; les autres modes en construisent un Catalogue.
+
+    Avec `emprunts=True`, les emprunts et retours sont tenus dans un registre
+    séparé (`<fichier>.emprunts`, voir emprunts.py) au lieu de l'historique de
+    chaque livre. Le chargement ne crée rien : s'il n'existe pas encore, le
+    registre est créé (historiques migrés) à la prochaine réécriture complète
+    du fichier par sauvegarder_bibliotheque.
+    """
+    if mode not in MODES_CHARGEMENT:
+        raise ValueError(f"Mode de chargement invalide : {', '.join(MODES_CHARGEMENT)}.")
+    if est_chemin_sqlite(filename):
+        return ouvrir_sqlite(filename)
+    if mode == 'mmap' and not est_chemin_binaire(filename):
+        raise ValueError("Le mode 'mmap' est réservé aux snapshots binaires (.bin).")
+    # Verrou partagé : aucune sauvegarde (d'un autre processus) pendant la lecture
+    with VerrouFichier(filename).partage():
+        if mode == 'mmap':
+            snapshot = SnapshotBinaire(filename)
+            if emprunts and os.path.exists(chemin_emprunts(filename)):
+                snapshot.emprunts = RegistreEmprunts(chemin_emprunts(filename), snapshot.emprunts_enregistres)
+            return snapshot
+        catalogue = Catalogue()
+        emprunts_enregistres = None
+        if os.path.exists(filename) and est_chemin_binaire(filename):
+            with SnapshotBinaire(filename) as snapshot:
+                for ligne in range(len(snapshot)):
+                    livre = snapshot.livre(ligne, avec_historique=(mode != 'paresseux'))
+                    emplacement = snapshot.emplacement_historique(ligne)
+                    if mode == 'paresseux' and emplacement is not None:
+                        catalogue.differer_historique(livre['id'], *emplacement)
+                    catalogue.append(livre)
+                catalogue.prochain_id = max(catalogue.prochain_id, snapshot.prochain_id)
+                catalogue.sequence = snapshot.sequence
+                emprunts_enregistres = snapshot.emprunts_enregistres
+            catalogue.attacher_source(filename)
+        elif os.path.exists(filename) and mode == 'complet':
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Fichier JSON corrompu ou format invalide : {e}')
+            if isinstance(data, dict) and isinstance(data.get('livres'), list):
+                catalogue = Catalogue(data['livres'], prochain_id=int(data.get('prochain_id', 1)))
+                catalogue.sequence = int(data.get('sequence', 0))
+                emprunts_enregistres = data.get('emprunts_enregistres')
+            elif isinstance(data, list):
+                catalogue = Catalogue(data)
+            else:
                 raise ValueError('Format de fichier invalide : attendu une liste de livres.')
-            return data
-    except json.JSONDecodeError as e:
-        raise ValueError(f'Fichier JSON corrompu ou format invalide : {e}')
-    except Exception:
-        raise
-
-def sauvegarder_bibliotheque(livres: List[Dict[str, Any]], filename: str = FICHIER_DATA) -> None:
-    """Sauvegarde la liste de livres dans le fichier JSON. Lève exception si échec."""
+        elif os.path.exists(filename):
+            lecteur = LecteurCatalogue(filename, progression=progression)
+            for position, longueur, livre in lecteur:
+                if mode == 'paresseux':
+                    if livre.get('historique'):
+                        del livre['historique']
+                        catalogue.differer_historique(livre['id'], position, longueur)
+                catalogue.append(livre)
+            catalogue.attacher_source(filename)
+            catalogue.prochain_id = max(catalogue.prochain_id, int(lecteur.entete.get('prochain_id', 1)))
+            catalogue.sequence = int(lecteur.entete.get('sequence', 0))
+            emprunts_enregistres = lecteur.entete.get('emprunts_enregistres')
+
+        if emprunts:
+            # Avant le rejeu : les emprunts et retours du journal vont dans le registre
+            _attacher_registre(catalogue, chemin_emprunts(filename), emprunts_enregistres)
+        chemin = chemin_journal(filename)
+        appliquees, catalogue.sequence = rejouer_journal(catalogue, chemin, catalogue.sequence)
+        if journaliser:
+            catalogue.journal = Journal(chemin, fsync=fsync, seuil_compactage=seuil_compactage, entrees=appliquees)
+        compter(len(catalogue), _taille_fichier(filename) + _taille_fichier(chemin))
+        return catalogue
+
+def _attacher_registre(catalogue: Catalogue, chemin: str, emprunts_enregistres: Optional[int] = None) -> None:
+    """Attache le registre des emprunts au catalogue s'il existe, sinon le prévoit pour la sauvegarde.
+
+    Les historiques encore présents dans le fichier (déjà migrés) sont alors
+    ignorés et disparaissent à la sauvegarde suivante.
+    """
+    if os.path.exists(chemin):
+        catalogue.emprunts = RegistreEmprunts(chemin, emprunts_enregistres)
+        catalogue.oublier_historiques()
+    else:
+        catalogue.registre_a_creer = chemin
+
+def _creer_registre(catalogue: Catalogue) -> Optional[RegistreEmprunts]:
+    """Crée le registre prévu au chargement en y migrant les historiques des livres.
+
+    Si le fichier ne peut pas être créé (répertoire en lecture seule...) ou si un
+    historique n'entre pas dans le format du registre (date illisible ou avant
+    1970, action inconnue), les historiques restent dans les livres et le
+    fichier de données.
+    """
+    try:
+        evenements = [
+            (livre['id'], h['action'], datetime.strptime(h['date'], FORMAT_DATE))
+            for livre in catalogue
+            if livre.get('historique') or catalogue.emplacement_historique(livre['id'])
+            for h in catalogue.historique(livre['id'])
+        ]
+        catalogue.emprunts = RegistreEmprunts.creer(catalogue.registre_a_creer, evenements)
+    except (OSError, ValueError):
+        return None
+    finally:
+        catalogue.registre_a_creer = None
+    catalogue.oublier_historiques()
+    return catalogue.emprunts
+
+def ouvrir_sqlite(filename: str, source_json: Optional[str] = None) -> BibliothequeSQLite:
+    """Ouvre (ou crée) une base SQLite.
+
+    Tant que la base vide n'est pas marquée migrée, le contenu du fichier JSON
+    `source_json` (par défaut le même nom en .json) et son journal y sont migrés,
+    en une transaction qui pose la marque : une migration interrompue est reprise
+    à l'ouverture suivante. Une base déjà remplie, ou sans JSON à migrer, est
+    simplement marquée.
+    """
+    base = BibliothequeSQLite(filename)
+    source_json = source_json or os.path.splitext(filename)[0] + '.json'
+    if base.migration is None:
+        try:
+            if not base and os.path.exists(source_json):
+                catalogue = charger_bibliotheque(source_json, mode='flux')
+                base.importer((dict(vers_json(l), historique=_historique(catalogue, l)) for l in catalogue),
+                              prochain_id=catalogue.prochain_id, source=source_json)
+            else:
+                base.marquer_migration(source_json)
+        except BaseException:
+            base.fermer()
+            raise
+    return base
+
+def convertir_bibliotheque(source: str, destination: str) -> None:
+    """Convertit un fichier de données vers un autre format (JSON <-> binaire), sans perte.
+
+    Le format est déduit de l'extension ; le journal de la source est rejoué et
+    les historiques de son registre des emprunts sont intégrés à la destination.
+    """
+    catalogue = charger_bibliotheque(source, mode='paresseux')
+    sauvegarder_bibliotheque(catalogue, destination, compacter=True)
+    # Un ancien registre à côté de la destination serait périmé : il sera recréé au chargement
+    if os.path.exists(chemin_emprunts(destination)):
+        os.remove(chemin_emprunts(destination))
+
+def _taille_fichier(chemin: str) -> int:
+    return os.path.getsize(chemin) if os.path.exists(chemin) else 0
+
+def _chemin_temporaire(filename: str) -> str:
+    # Propre au processus et au thread : deux écritures simultanées ne partagent jamais le même temporaire
+    return f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+def _remplacer_atomiquement(filename: str, ecrire: Callable[[BinaryIO], Any]) -> Any:
+    """Écrit via `ecrire` dans un fichier temporaire, le synchronise puis le renomme sur `filename`."""
+    temporaire = _chemin_temporaire(filename)
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(livres, f, ensure_ascii=False, indent=4)
+        with open(temporaire, 'wb') as f:
+            resultat = ecrire(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, filename)
+        return resultat
     except TypeError as e:
         raise ValueError(f'Erreur de sérialisation JSON : {e}')
-    except Exception:
-        raise
+    finally:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+
+class _LecteurHistoriques:
+    """Fournit l'historique complet de chaque livre d'un catalogue à écrire.
+
+    Les historiques encore sur disque (chargement paresseux) sont relus un par un
+    depuis le fichier source resté ouvert, sans être gardés en mémoire. Avec un
+    `registre` (export vers un autre fichier), les historiques en sont extraits.
+    """
+
+    def __init__(self, catalogue: Catalogue, registre: Optional[RegistreEmprunts] = None) -> None:
+        self._catalogue = catalogue
+        self._registre = registre
+
+    def __call__(self, livre: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self._registre is not None:
+            return self._registre.historique(livre['id'])
+        historique = self._catalogue.relire_historique(livre['id'])
+        return livre.get('historique', []) if historique is None else historique
+
+def _ecrire_catalogue(f: BinaryIO, catalogue: Catalogue, registre: Optional[RegistreEmprunts] = None,
+                      emprunts_enregistres: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+    """Écrit le catalogue livre par livre dans `f` ; retourne les emplacements des historiques."""
+    position = f.write((
+        '{\n'
+        f'    "prochain_id": {catalogue.prochain_id},\n'
+        f'    "sequence": {catalogue.sequence},\n'
+        + ('' if emprunts_enregistres is None else f'    "emprunts_enregistres": {emprunts_enregistres},\n') +
+        '    "livres": [\n'
+    ).encode('utf-8'))
+    emplacements = {}
+    historique = _LecteurHistoriques(catalogue, registre)
+    for n, livre in enumerate(catalogue):
+        hist = historique(livre)
+        livre = dict(vers_json(livre), historique=hist)
+        position += f.write(((',\n' if n else '') + '        ').encode('utf-8'))
+        donnees = json.dumps(livre, ensure_ascii=False, indent=4).replace('\n', '\n        ').encode('utf-8')
+        if hist:
+            emplacements[livre['id']] = (position, len(donnees))
+        position += f.write(donnees)
+    f.write(b'\n    ]\n}')
+    return emplacements
+
+def _ecrire_binaire(f: BinaryIO, catalogue: Catalogue, registre: Optional[RegistreEmprunts] = None,
+                    emprunts_enregistres: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+    return ecrire_snapshot_binaire(f, catalogue, catalogue.prochain_id, catalogue.sequence,
+                                   _LecteurHistoriques(catalogue, registre), emprunts_enregistres)
+
+@mesure
+def sauvegarder_bibliotheque(livres: List[Dict[str, Any]], filename: str = FICHIER_DATA, compacter: bool = False) -> None:
+    """Sauvegarde la liste de livres dans le fichier JSON. Lève exception si échec.
+
+    Pour un Catalogue, le compteur d'ID est sauvegardé avec les livres, écrits un
+    par un. Si le catalogue est journalisé, la sauvegarde se limite à synchroniser
+    le journal ; le snapshot complet n'est réécrit (puis le journal vidé) qu'au-delà
+    du seuil de compactage ou si `compacter=True`.
+
+    Pour une base SQLite, chaque opération est déjà validée : sauvegarder vers la
+    base elle-même ne fait que confirmer la transaction en cours, et un autre
+    `filename` en exporte le contenu au format JSON.
+
+    Un `filename` en .bin est écrit au format snapshot binaire. Les historiques
+    tenus dans le registre des emprunts restent dans ce registre, dont les
+    événements en attente sont écrits juste avant le snapshot (qui en note le
+    nombre) ; sauvegarder vers un autre fichier les intègre aux livres écrits.
+    Avec un journal, ils y sont déjà consignés avec l'état des livres.
+
+    Le fichier est écrit à côté puis renommé : un lecteur voit l'ancienne ou la
+    nouvelle version, jamais un fichier tronqué. Un verrou `<fichier>.verrou`
+    (voir verrous.py) sérialise sauvegardes et chargements entre processus.
+    """
+    # Lecture seule côté mémoire (les recherches continuent), exclusif côté fichier
+    with _lecture(livres), VerrouFichier(filename).exclusif():
+        if isinstance(livres, SnapshotBinaire):
+            if os.path.abspath(filename) == os.path.abspath(livres.chemin):
+                return
+            catalogue = Catalogue(livres)
+            catalogue.prochain_id, catalogue.sequence = livres.prochain_id, livres.sequence
+            if livres.emprunts is not None:
+                catalogue.emprunts = livres.emprunts
+                catalogue.oublier_historiques()
+            livres = catalogue
+        if isinstance(livres, BibliothequeSQLite):
+            if est_chemin_sqlite(filename) and os.path.abspath(filename) == livres.chemin:
+                livres.valider()
+                return
+            catalogue = Catalogue(dict(vers_json(l), historique=livres.historique(l['id'])) for l in livres)
+            catalogue.prochain_id = livres.prochain_id
+            livres = catalogue
+        journal = getattr(livres, 'journal', None)
+        if journal is not None and journal.chemin != chemin_journal(filename):
+            journal = None
+        if journal is not None and not compacter and not journal.doit_compacter():
+            journal.synchroniser()
+            return
+
+        if isinstance(livres, Catalogue):
+            registre = livres.emprunts
+            if registre is None and livres.registre_a_creer == chemin_emprunts(filename):
+                registre = _creer_registre(livres)
+            emprunts_enregistres = None
+            if registre is not None and registre.chemin == chemin_emprunts(filename):
+                # Registre de ce fichier : ses événements y sont écrits (d'abord, voir emprunts.py), pas dans les livres
+                registre.synchroniser()
+                emprunts_enregistres, registre = len(registre), None
+            ecrire = _ecrire_binaire if est_chemin_binaire(filename) else _ecrire_catalogue
+            emplacements = _remplacer_atomiquement(filename, lambda f: ecrire(f, livres, registre,
+                                                                              emprunts_enregistres))
+            livres.relocaliser_historiques(filename, emplacements)
+        elif est_chemin_binaire(filename):
+            _remplacer_atomiquement(filename, lambda f: ecrire_snapshot_binaire(
+                f, livres, generer_id_unique(livres), 0, lambda l: l.get('historique', [])))
+        else:
+            _remplacer_atomiquement(filename, lambda f: f.write(
+                json.dumps(livres, ensure_ascii=False, indent=4, default=vers_json).encode('utf-8')))
+        compter(len(livres), _taille_fichier(filename))
+        if journal is not None:
+            journal.vider()
 
 # ------------------
 # Fonctions utilitaires supplémentaires renommées (bonus)
 # ------------------
 
+CLES_TRI = ('titre', 'auteur', 'prix', 'annee_publication')
+
+def _cles_tri(cle: Any) -> List[Tuple[str, bool]]:
+    """Analyse 'auteur,-prix' (ou ['auteur', '-prix']) en [('auteur', False), ('prix', True)]."""
+    noms = cle.split(',') if isinstance(cle, str) else list(cle)
+    cles = []
+    for nom in noms:
+        nom = nom.strip().lower()
+        decroissant = nom.startswith('-')
+        nom = nom.lstrip('-').strip()
+        nom = 'annee_publication' if nom == 'annee' else nom
+        if nom not in CLES_TRI:
+            cles = []
+            break
+        cles.append((nom, decroissant))
+    if not cles:
+        raise ValueError("Clé de tri invalide : 'titre', 'auteur', 'prix' ou 'annee' "
+                         "(plusieurs séparées par des virgules, '-' pour un ordre décroissant).")
+    return cles
+
+@mesure
+@_en_lecture
+@_en_cache(lambda cle='titre': tuple(_cles_tri(cle)))
 def trier_catalogue(livres: List[Dict[str, Any]], cle: str = 'titre') -> List[Dict[str, Any]]:
-    """Retourne une nouvelle liste triée par 'titre', 'auteur' ou 'prix'."""
-    if cle not in ('titre', 'auteur', 'prix'):
-        raise ValueError("Clé de tri invalide : 'titre', 'auteur' ou 'prix'.")
-    if cle == 'prix':
-        return sorted(livres, key=lambda x: x.get('prix', 0.0))
-    return sorted(livres, key=lambda x: x.get(cle, '').lower())
+    """Retourne une nouvelle liste triée selon une ou plusieurs clés.
+
+    `cle` : 'titre', 'auteur', 'prix' ou 'annee', ou plusieurs clés séparées par
+    des virgules ('auteur,-prix') ; un '-' inverse l'ordre d'une clé. Casse et
+    accents sont ignorés. Les livres sans valeur viennent après les autres en
+    ordre croissant, avant eux en ordre décroissant (comme `sorted(...,
+    reverse=True)`). Sur un Catalogue, les index triés évitent de retrier à
+    chaque appel.
+    """
+    cles = _cles_tri(cle)
+    if isinstance(livres, Catalogue):
+        resultats = list(livres.trier(cles))
+    elif isinstance(livres, BibliothequeSQLite):
+        resultats = livres.trier(cles)
+    else:
+        resultats = trier_par_cles(list(livres), cles)
+    compter(len(resultats))
+    return resultats
+
+def parcourir_tri(livres: List[Dict[str, Any]], cle: str = 'titre') -> Iterable[Dict[str, Any]]:
+    """Comme `trier_catalogue`, mais les livres d'un Catalogue sont produits à la demande.
+
+    Destiné à l'affichage par pages : la première page ne lit que ses livres
+    dans l'index trié. L'itérateur est parcouru hors verrou ; le catalogue ne
+    doit pas être modifié avant la fin de la lecture. Les autres sources
+    retournent la liste de `trier_catalogue`.
+    """
+    if isinstance(livres, Catalogue):
+        return livres.trier(_cles_tri(cle))
+    return trier_catalogue(livres, cle)
+
+@mesure
+@_en_lecture
+def top_k(livres: List[Dict[str, Any]], cle: str = 'prix', k: int = 10, minimum: Any = None,
+          maximum: Any = None) -> List[Dict[str, Any]]:
+    """Retourne les k premiers livres selon `cle` ('-prix' : les k plus chers), bornes incluses.
 
+    Exemple : top_k(livres, 'prix', 50, 10, 20) -> les 50 livres les moins chers
+    entre 10 € et 20 €. Sur un Catalogue, seuls les livres retournés sont lus.
+    """
+    (champ, decroissant), *autres = _cles_tri(cle)
+    if autres:
+        raise ValueError("top_k n'accepte qu'une seule clé de tri.")
+    if k <= 0:
+        return []
+    if isinstance(livres, Catalogue):
+        # Seuls les livres retournés sont lus
+        resultats = list(islice(livres.plage(champ, minimum, maximum, decroissant), k))
+        compter(len(resultats))
+        return resultats
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.plage(champ, minimum, maximum, k, decroissant)
+    bas = None if minimum is None else cle_tri(champ, minimum)
+    haut = None if maximum is None else cle_tri(champ, maximum)
+    bornes = bas is not None or haut is not None
+    compter(len(livres))
+    candidats = (
+        l for l in livres
+        if not (bornes and l.get(champ) is None)
+        and (bas is None or cle_tri(champ, l.get(champ)) >= bas)
+        and (haut is None or cle_tri(champ, l.get(champ)) <= haut)
+    )
+    choisir = heapq.nlargest if decroissant else heapq.nsmallest
+    return choisir(k, candidats, key=lambda l: cle_tri(champ, l.get(champ)))
+
+@mesure
 def ajouter_note(livres: List[Dict[str, Any]], id_livre: int, note: int) -> None:
     """Attribue une note de 1 à 5 à un livre."""
     if note < 1 or note > 5:
         raise ValueError("La note doit être entre 1 et 5.")
-    livre = trouver_par_id_interne(livres, id_livre)
-    if not livre:
-        raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
-    livre['note'] = int(note)
+    with _verrou_livre(livres, id_livre), _ecriture(livres):
+        livre = trouver_par_id_interne(livres, id_livre)
+        if not livre:
+            raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
+        _journaliser(livres, {'op': 'maj', 'id': id_livre, 'champs': {'note': int(note)}})
+        _modifier(livres, livre, {'note': int(note)})
 
+@_en_lecture
 def afficher_journal(livres: List[Dict[str, Any]], id_livre: int) -> None:
     """Affiche l'historique (journal) d'un livre."""
     livre = trouver_par_id_interne(livres, id_livre)
     if not livre:
         print("❌ Aucun livre trouvé avec cet ID.")
         return
-    hist = livre.get('historique', [])
-    if not hist:
+    # Avec un registre des emprunts, les événements sont relus un à un
+    registre = getattr(livres, 'emprunts', None)
+    if registre is None and isinstance(livres, BibliothequeSQLite):
+        registre = livres
+    hist = registre.evenements_livre(id_livre) if registre is not None else iter(_historique(livres, livre))
+    premier = next(hist, None)
+    if premier is None:
         print("📜 Aucune action enregistrée pour ce livre.")
         return
     print(f"\n📜 Historique pour '{livre['titre']}' :")
-    for h in hist:
+    for h in chain((premier,), hist):
         action = "Emprunté" if h['action'] == 'emprunt' else "Retour"
         print(f" - {h['date']} : {action}")
 
-def recherche_combinee(livres: List[Dict[str, Any]], titre: str = None, auteur: str = None, genre: str = None) -> List[Dict[str, Any]]:
-    """Recherche par combinaison de critères (titre partiel, auteur partiel, genre exact)."""
-    resultats = livres
-    if titre:
-        resultats = [l for l in resultats if titre.lower() in l.get('titre', '').lower()]
-    if auteur:
-        resultats = [l for l in resultats if auteur.lower() in l.get('auteur', '').lower()]
-    if genre:
-        resultats = [l for l in resultats if genre.lower() == l.get('genre', '').lower()]
-    return resultats
+@mesure
+@_en_lecture
+@_en_cache(lambda titre=None, auteur=None, genre=None, disponible=None:
+           (_texte_ou_none(titre), _texte_ou_none(auteur), _texte_ou_none(genre),
+            None if disponible is None else bool(disponible)))
+def recherche_combinee(livres: List[Dict[str, Any]], titre: str = None, auteur: str = None, genre: str = None,
+                       disponible: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Recherche par combinaison de critères (titre partiel, auteur partiel, genre exact, disponibilité).
+
+    Casse et accents sont ignorés ; sur un Catalogue, la recherche part du critère
+    indexé le plus sélectif (voir Catalogue.rechercher).
+    """
+    if isinstance(livres, Catalogue):
+        return list(livres.rechercher(titre, auteur, genre, disponible))
+    if isinstance(livres, BibliothequeSQLite):
+        return livres.recherche_combinee(titre, auteur, genre, disponible)
+
+    t = normaliser(titre) if titre else None
+    a = normaliser(auteur) if auteur else None
+    g = normaliser(genre).strip() if genre else None
+    compter(len(livres))
+    return [
+        l for l in livres
+        if (t is None or t in normaliser(l.get('titre', '')))
+        and (a is None or a in normaliser(l.get('auteur', '')))
+        and (g is None or g == normaliser(l.get('genre', '')).strip())
+        and (disponible is None or bool(l.get('disponible', False)) == disponible)
+    ]
 
+@mesure
+@_en_lecture
 def sauvegarder_csv(livres: List[Dict[str, Any]], filename: str = 'bibliotheque.csv') -> None:
-    """Exporte la bibliothèque au format CSV."""
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        champs = ['id','titre','auteur','genre','annee_publication','prix','disponible','note']
-        writer = csv.DictWriter(f, fieldnames=champs)
-        writer.writeheader()
-        for l in livres:
-            writer.writerow({k: l.get(k) for k in champs})
+    """Exporte la bibliothèque au format CSV (voir exporter_livres pour les autres options)."""
+    compter(exporter_livres(livres, filename, format='csv'), _taille_fichier(filename))
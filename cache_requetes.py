@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable
+
+# ------------------
+# Cache des résultats de requêtes (recherches, filtres, tris, rapport)
+# ------------------
+#
+# Un Catalogue porte un compteur `version` incrémenté à chaque mutation (ajout,
+# suppression, modification d'un livre). Le cache garde les derniers résultats
+# (LRU) pour la version courante : dès que la version change, tout est oublié,
+# si bien qu'un résultat périmé n'est jamais servi.
+#
+# Deux bornes : le nombre de requêtes gardées (`max_entrees`) et le nombre total
+# de livres référencés par les résultats (`max_livres`, qui borne la mémoire :
+# une référence par livre, les livres eux-mêmes étant partagés avec le catalogue).
+
+MAX_ENTREES = 256
+MAX_LIVRES = 500_000
+
+class CacheRequetes:
+    """Cache LRU de résultats, valable pour une version du catalogue."""
+
+    def __init__(self, max_entrees: int = MAX_ENTREES, max_livres: int = MAX_LIVRES) -> None:
+        if max_entrees < 0 or max_livres < 0:
+            raise ValueError("Les bornes du cache doivent être positives ou nulles.")
+        self.max_entrees = max_entrees
+        self.max_livres = max_livres
+        self._entrees: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._tailles: Dict[Hashable, int] = {}
+        self._livres = 0
+        self._version = None
+        self._verrou = threading.Lock()
+        self.succes = self.echecs = self.invalidations = self.evictions = 0
+
+    def obtenir(self, version: int, cle: Hashable, calculer: Callable[[], Any]) -> Any:
+        """Résultat de la requête `cle` pour `version` (copie), calculé par `calculer()` en cas d'échec."""
+        with self._verrou:
+            self._synchroniser(version)
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return _copie(self._entrees[cle])
+            self.echecs += 1
+        # Calcul hors du verrou du cache : les lecteurs du catalogue restent parallèles
+        resultat = calculer()
+        taille = _taille(resultat)
+        with self._verrou:
+            self._synchroniser(version)
+            if cle not in self._entrees and taille <= self.max_livres and self.max_entrees:
+                self._entrees[cle] = resultat
+                self._tailles[cle] = taille
+                self._livres += taille
+                while len(self._entrees) > self.max_entrees or self._livres > self.max_livres:
+                    ancienne, _ = self._entrees.popitem(last=False)
+                    self._livres -= self._tailles.pop(ancienne)
+                    self.evictions += 1
+        return _copie(resultat)
+
+    def _synchroniser(self, version: int) -> None:
+        if version != self._version:
+            if self._entrees:
+                self.invalidations += 1
+            self._vider()
+            self._version = version
+
+    def _vider(self) -> None:
+        self._entrees.clear()
+        self._tailles.clear()
+        self._livres = 0
+
+    def vider(self) -> None:
+        with self._verrou:
+            self._vider()
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Succès, échecs, taux de succès, invalidations (mutations), évictions (bornes) et occupation."""
+        with self._verrou:
+            requetes = self.succes + self.echecs
+            return {
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'taux_succes': self.succes / requetes if requetes else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'entrees': len(self._entrees),
+                'livres': self._livres,
+                'max_entrees': self.max_entrees,
+                'max_livres': self.max_livres,
+            }
+
+def _taille(resultat: Any) -> int:
+    """Nombre de livres référencés par un résultat (liste, ou rapport contenant des listes)."""
+    if isinstance(resultat, list):
+        return len(resultat)
+    if isinstance(resultat, dict):
+        return 1 + sum(len(v) for v in resultat.values() if isinstance(v, list))
+    return 1
+
+def _copie(resultat: Any) -> Any:
+    """Copie superficielle : l'appelant peut modifier la liste retournée sans toucher au cache."""
+    if isinstance(resultat, list):
+        return list(resultat)
+    if isinstance(resultat, dict):
+        return {k: list(v) if isinstance(v, list) else v for k, v in resultat.items()}
+    return resultat
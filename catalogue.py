@@ -0,0 +1,388 @@
+import threading
+from collections.abc import Mapping
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, BinaryIO
+
+from index import IndexTrigrammes, IndexEgalite, IndexTri, Statistiques, normaliser, trier_par_cles
+from flux_json import lire_livre
+from livre import Livre
+from verrous import VerrouLectureEcriture, VerrousParCle
+from cache_requetes import CacheRequetes
+from metriques import compter
+
+# ------------------
+# Catalogue indexé par id
+# ------------------
+
+class Catalogue:
+    """Conteneur de livres indexé par id, utilisable à la place d'une liste de dicts.
+
+    Les livres sont stockés sous forme de Livre (voir livre.py). Les suppressions laissent une "tombe" (None) dans la liste interne au lieu de
+    décaler tous les éléments ; la liste est compactée quand les tombes deviennent
+    trop nombreuses.
+
+    `prochain_id` est un compteur monotone : il ne redescend jamais, même si le
+    livre d'id maximal est supprimé, et il est sauvegardé avec les données.
+
+    `journal` (optionnel, voir journal.py) reçoit les mutations faites via les
+    fonctions de bibliotheque.py ; `sequence` est le numéro de la dernière
+    opération journalisée déjà reflétée dans le catalogue.
+
+    Les index secondaires (voir index.py) sont tenus à jour à chaque ajout,
+    suppression et appel à `modifier` : `texte` indexe titre, auteur et genre par
+    trigrammes, `genres`, `auteurs` et `disponibilite` sont des index d'égalité,
+    `stats` tient les compteurs du rapport, et `tris` garde un index trié par
+    titre, auteur, prix et année (celui du prix est partagé avec `stats`).
+
+    En chargement paresseux, l'historique d'un livre reste dans le fichier
+    `source` (position et longueur de l'enregistrement) jusqu'au premier appel à
+    `historique`. Ce fichier reste ouvert tant qu'il reste des historiques à y
+    relire : si un autre processus le remplace par renommage, le descripteur
+    désigne toujours le contenu lu au chargement.
+
+    `emprunts` (optionnel, voir emprunts.py) est le registre des emprunts qui
+    remplace alors l'historique intégré aux livres. `registre_a_creer` est le
+    chemin du registre à créer à la prochaine réécriture complète du fichier
+    (les historiques y sont alors migrés), tant qu'il n'existe pas.
+
+    `version` augmente à chaque ajout, suppression et appel à `modifier` ;
+    `cache` (voir cache_requetes.py, None pour s'en passer) garde les résultats
+    des requêtes de bibliotheque.py pour la version courante.
+
+    Accès concurrents : les fonctions de bibliotheque.py prennent `verrou`
+    (lecteurs-rédacteur, voir verrous.py) en lecture ou en écriture, et
+    `verrous_livres` pour sérialiser les opérations sur un même livre. Un
+    appelant qui parcourt lui-même le catalogue pendant que d'autres threads le
+    modifient prend `verrou.lecture()`. Les rares écritures faites pendant une
+    lecture (historique relu, tombes compactées, index trié mis à jour) sont
+    protégées par un verrou interne.
+    """
+
+    # Proportion de tombes à partir de laquelle on compacte la liste interne
+    SEUIL_COMPACTAGE = 0.25
+
+    def __init__(self, livres: Optional[Iterable[Dict[str, Any]]] = None, prochain_id: int = 1) -> None:
+        self._livres: List[Optional[Dict[str, Any]]] = []
+        self._positions: Dict[int, int] = {}
+        self._tombes = 0
+        self.prochain_id = prochain_id
+        self.sequence = 0
+        self.journal = None
+        self.emprunts = None
+        self.registre_a_creer: Optional[str] = None
+        self.version = 0
+        self.cache: Optional[CacheRequetes] = CacheRequetes()
+        self.source: Optional[str] = None
+        self._historiques_differes: Dict[int, Tuple[int, int]] = {}
+        self._fichier_source: Optional[BinaryIO] = None
+        self.verrou = VerrouLectureEcriture()
+        self.verrous_livres = VerrousParCle()
+        self._verrou_interne = threading.Lock()
+        self.texte = IndexTrigrammes()
+        self.genres = IndexEgalite('genre')
+        self.auteurs = IndexEgalite('auteur')
+        self.disponibilite = IndexEgalite('disponible', cle=bool, defaut=False)
+        self.stats = Statistiques()
+        self.tris = {
+            'titre': IndexTri('titre'),
+            'auteur': IndexTri('auteur'),
+            'prix': self.stats.par_prix,
+            'annee_publication': IndexTri('annee_publication'),
+        }
+        self._index = [self.texte, self.genres, self.auteurs, self.disponibilite, self.stats,
+                       self.tris['titre'], self.tris['auteur'], self.tris['annee_publication']]
+        if livres:
+            self.extend(livres)
+
+    # --- Interface "liste" ---
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __bool__(self) -> bool:
+        return bool(self._positions)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (l for l in self._livres if l is not None)
+
+    def __contains__(self, livre: Any) -> bool:
+        if not isinstance(livre, Mapping):
+            return False
+        trouve = self.get(livre.get('id'))
+        return trouve is not None and (trouve is livre or trouve == livre)
+
+    def __getitem__(self, index):
+        self._compacter_si_tombes()
+        return self._livres[index]
+
+    def __delitem__(self, index: int) -> None:
+        self._compacter_si_tombes()
+        livre = self._livres[index]
+        self.supprimer(livre.get('id'))
+
+    def __eq__(self, autre: Any) -> bool:
+        if isinstance(autre, (Catalogue, list)):
+            return list(self) == list(autre)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Catalogue({list(self)!r}, prochain_id={self.prochain_id})"
+
+    def append(self, livre: Dict[str, Any]) -> None:
+        """Ajoute un livre ; lève ValueError si l'id est absent ou déjà utilisé.
+
+        Un dict est converti en Livre (représentation compacte, voir livre.py).
+        """
+        if not isinstance(livre, Livre):
+            livre = Livre(livre)
+        id_livre = livre.get('id')
+        if id_livre is None:
+            raise ValueError("Le livre doit posséder un 'id'.")
+        if id_livre in self._positions:
+            raise ValueError(f"Un livre avec l'ID {id_livre} existe déjà.")
+        self._positions[id_livre] = len(self._livres)
+        self._livres.append(livre)
+        self.version += 1
+        for index in self._index:
+            index.ajouter(livre)
+        if id_livre >= self.prochain_id:
+            self.prochain_id = id_livre + 1
+
+    def extend(self, livres: Iterable[Dict[str, Any]]) -> None:
+        """Ajoute un lot de livres ; lève ValueError, sans rien ajouter, si un id manque ou est pris.
+
+        Chaque index reçoit le lot entier (`ajouter_lot`) plutôt qu'un livre à la fois.
+        """
+        lot = [livre if isinstance(livre, Livre) else Livre(livre) for livre in livres]
+        positions: Dict[int, int] = {}
+        for position, livre in enumerate(lot, len(self._livres)):
+            id_livre = livre.get('id')
+            if id_livre is None:
+                raise ValueError("Le livre doit posséder un 'id'.")
+            if id_livre in self._positions or id_livre in positions:
+                raise ValueError(f"Un livre avec l'ID {id_livre} existe déjà.")
+            positions[id_livre] = position
+        if not lot:
+            return
+        self._positions.update(positions)
+        self._livres.extend(lot)
+        self.version += 1
+        for index in self._index:
+            ajouter_lot = getattr(index, 'ajouter_lot', None)
+            if ajouter_lot is not None:
+                ajouter_lot(lot)
+            else:
+                for livre in lot:
+                    index.ajouter(livre)
+        self.prochain_id = max(self.prochain_id, max(positions) + 1)
+
+    def remove(self, livre: Dict[str, Any]) -> None:
+        if livre not in self:
+            raise ValueError("Catalogue.remove(x) : x absent du catalogue.")
+        self.supprimer(livre['id'])
+
+    # --- Accès par id ---
+
+    def get(self, id_livre: int) -> Optional[Dict[str, Any]]:
+        """Retourne le livre d'id donné en O(1), ou None."""
+        pos = self._positions.get(id_livre)
+        return None if pos is None else self._livres[pos]
+
+    def supprimer(self, id_livre: int) -> bool:
+        """Supprime un livre par id en O(1) amorti. Retourne True si supprimé."""
+        pos = self._positions.pop(id_livre, None)
+        if pos is None:
+            return False
+        for index in self._index:
+            index.retirer(self._livres[pos])
+        self.version += 1
+        self._historiques_differes.pop(id_livre, None)
+        self._livres[pos] = None
+        self._tombes += 1
+        if self._tombes > self.SEUIL_COMPACTAGE * len(self._livres):
+            self.compacter()
+        return True
+
+    def modifier(self, id_livre: int, champs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Met à jour des champs d'un livre en gardant les index cohérents.
+
+        Seuls les index portant sur un champ modifié sont recalculés. Retourne le
+        livre modifié, ou None si l'id est inconnu.
+        """
+        livre = self.get(id_livre)
+        if livre is None:
+            return None
+        concernes = [index for index in self._index if any(c in champs for c in index.champs)]
+        # Les statistiques se mettent à jour champ par champ, d'après l'ancien livre
+        avant = None
+        if self.stats in concernes:
+            avant = {c: livre[c] for c in ('id',) + self.stats.champs if c in livre}
+        for index in concernes:
+            if index is not self.stats:
+                index.retirer(livre)
+        livre.update(champs)
+        self.version += 1
+        for index in concernes:
+            if index is self.stats:
+                self.stats.modifier(avant, livre)
+            else:
+                index.ajouter(livre)
+        return livre
+
+    # --- Historique différé (chargement paresseux) ---
+
+    def attacher_source(self, source: str) -> None:
+        """Ouvre le fichier `source` d'où relire les historiques différés (à appeler juste après lecture)."""
+        with self._verrou_interne:
+            self._ouvrir_source(source)
+
+    def _ouvrir_source(self, source: Optional[str]) -> None:
+        # Appelé sous _verrou_interne
+        if self._fichier_source is not None:
+            self._fichier_source.close()
+            self._fichier_source = None
+        self.source = source
+        if source is not None and self._historiques_differes:
+            self._fichier_source = open(source, 'rb')
+
+    def differer_historique(self, id_livre: int, position: int, longueur: int) -> None:
+        """Note où relire l'historique d'un livre dans le fichier `source`."""
+        self._historiques_differes[id_livre] = (position, longueur)
+
+    def emplacement_historique(self, id_livre: int) -> Optional[Tuple[int, int]]:
+        """(position, longueur) de l'historique encore sur disque, ou None s'il est en mémoire."""
+        return self._historiques_differes.get(id_livre)
+
+    def relocaliser_historiques(self, source: str, emplacements: Dict[int, Tuple[int, int]]) -> None:
+        """Met à jour les emplacements différés après réécriture du fichier source.
+
+        Seuls les historiques encore différés suivent le nouveau fichier.
+        """
+        with self._verrou_interne:
+            differes = self._historiques_differes
+            differes.update((i, e) for i, e in emplacements.items() if i in differes)
+            self._ouvrir_source(source)
+
+    def oublier_historiques(self) -> None:
+        """Retire les historiques intégrés aux livres (en mémoire ou différés), tenus ailleurs."""
+        with self._verrou_interne:
+            self._historiques_differes.clear()
+            self._ouvrir_source(None)
+        for livre in self:
+            if livre.get('historique'):
+                del livre['historique']
+
+    def historique(self, id_livre: int) -> List[Dict[str, Any]]:
+        """Retourne la liste (modifiable) de l'historique d'un livre, en la chargeant au besoin."""
+        livre = self.get(id_livre)
+        if livre is None:
+            raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
+        with self._verrou_interne:
+            emplacement = self._historiques_differes.get(id_livre)
+            if emplacement is not None:
+                livre['historique'] = lire_livre(self._fichier_source, *emplacement).get('historique', [])
+                # Oublié seulement une fois l'historique en mémoire (lu sans verrou par la sauvegarde)
+                del self._historiques_differes[id_livre]
+                if not self._historiques_differes:
+                    self._ouvrir_source(self.source)
+            return livre.setdefault('historique', [])
+
+    def relire_historique(self, id_livre: int) -> Optional[List[Dict[str, Any]]]:
+        """Historique encore différé d'un livre, relu sans être gardé en mémoire ; None s'il est en mémoire."""
+        with self._verrou_interne:
+            emplacement = self._historiques_differes.get(id_livre)
+            if emplacement is None:
+                return None
+            return lire_livre(self._fichier_source, *emplacement).get('historique', [])
+
+    def livres_par_ids(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Retourne les livres des ids donnés, dans l'ordre du catalogue."""
+        return list(self._iterer_ids(ids))
+
+    def _iterer_ids(self, ids: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        positions = sorted(self._positions[i] for i in ids if i in self._positions)
+        return (self._livres[p] for p in positions)
+
+    # --- Recherche multi-critères ---
+
+    def rechercher(self, titre: Optional[str] = None, auteur: Optional[str] = None,
+                   genre: Optional[str] = None, disponible: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+        """Itère, dans l'ordre du catalogue, sur les livres satisfaisant tous les critères.
+
+        titre et auteur sont des sous-chaînes, genre une égalité, casse et accents
+        ignorés. Le plan part du critère indexé le plus sélectif ; les autres sont
+        vérifiés à la volée sur chaque candidat, sans liste intermédiaire.
+        """
+        # Chaque prédicat : (estimation du nombre de candidats, candidats, test sur un id)
+        predicats = []
+        for champ, valeur in (('titre', titre), ('auteur', auteur)):
+            if valeur:
+                v = normaliser(valeur).strip()
+                predicats.append((
+                    self.texte.estimer(champ, valeur),
+                    lambda champ=champ, valeur=valeur: self.texte.rechercher(champ, valeur),
+                    lambda i, champ=champ, v=v: v in self.texte.texte(champ, i),
+                ))
+        if genre:
+            g = normaliser(genre).strip()
+            predicats.append((
+                len(self.genres.ids(genre)),
+                lambda: self.genres.ids(genre),
+                lambda i: self.genres.cle(i) == g,
+            ))
+        if disponible is not None:
+            d = bool(disponible)
+            predicats.append((
+                len(self.disponibilite.ids(d)),
+                lambda: self.disponibilite.ids(d),
+                lambda i: self.disponibilite.cle(i) == d,
+            ))
+
+        if not predicats:
+            compter(len(self))
+            yield from self
+            return
+        predicats.sort(key=lambda p: p[0])
+        candidats = predicats[0][1]()
+        compter(len(candidats))
+        tests = [p[2] for p in predicats[1:]]
+        for livre in self._iterer_ids(candidats):
+            if all(test(livre['id']) for test in tests):
+                yield livre
+
+    # --- Tris ---
+
+    def trier(self, cles: List[Tuple[str, bool]]) -> Iterator[Dict[str, Any]]:
+        """Itère sur les livres triés selon des (champ, décroissant), sans trier le catalogue.
+
+        La première clé est lue dans son index trié ; seuls les groupes de livres
+        à égalité sur cette clé sont triés selon les clés suivantes.
+        """
+        champ, decroissant = cles[0]
+        if len(cles) == 1:
+            yield from self.plage(champ, decroissant=decroissant)
+            return
+        for groupe in self.tris[champ].groupes(decroissant=decroissant):
+            livres = [self._livres[self._positions[i]] for i in groupe]
+            if len(livres) > 1:
+                trier_par_cles(livres, cles[1:])
+            yield from livres
+
+    def plage(self, champ: str, minimum: Any = None, maximum: Any = None,
+              decroissant: bool = False) -> Iterator[Dict[str, Any]]:
+        """Itère, dans l'ordre du champ, sur les livres dont la valeur est entre les bornes (incluses)."""
+        ids = self.tris[champ].ids(minimum, maximum, decroissant)
+        return map(self._livres.__getitem__, map(self._positions.__getitem__, ids))
+
+    def compacter(self) -> None:
+        """Retire les tombes et reconstruit l'index des positions."""
+        if not self._tombes:
+            return
+        self._livres = [l for l in self._livres if l is not None]
+        self._positions = {l['id']: i for i, l in enumerate(self._livres)}
+        self._tombes = 0
+
+    def _compacter_si_tombes(self) -> None:
+        # L'accès positionnel n'a de sens que sur une liste sans trous
+        if self._tombes:
+            with self._verrou_interne:
+                self.compacter()
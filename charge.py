@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import List, Dict, Any, Tuple
+
+# ------------------
+# Test de charge du serveur HTTP (voir serveur.py)
+# ------------------
+#
+#   python charge.py --connexions 50 --duree 10
+#
+# Chaque connexion (persistante) enchaîne des requêtes tirées selon un mélange
+# recherches / emprunts-retours / notes / rapports. Affiche le débit et les
+# latences p50, p99 et max par type de requête.
+
+MELANGE = (('recherche', 0.5), ('recherche_combinee', 0.15), ('emprunt', 0.12),
+           ('retour', 0.12), ('note', 0.06), ('rapport', 0.05))
+MOTS = ('le', 'la', 'de', 'amour', 'nuit', 'guerre', 'mer', 'roi', 'hugo', 'zola')
+GENRES = ('Roman', 'Science-fiction', 'Policier', 'Poésie', 'Histoire')
+
+def percentile(valeurs: List[float], p: float) -> float:
+    """Percentile `p` (0-100) par la méthode du rang le plus proche ; `valeurs` triées."""
+    if not valeurs:
+        return 0.0
+    return valeurs[max(math.ceil(p / 100 * len(valeurs)) - 1, 0)]
+
+def _requete(type_requete: str, alea: random.Random, dernier_id: int) -> Tuple[str, str, bytes]:
+    id_livre = alea.randint(1, max(dernier_id, 1))
+    if type_requete == 'recherche':
+        return 'GET', f'/livres?critere={alea.choice(("titre", "auteur"))}&valeur={alea.choice(MOTS)}&limite=20', b''
+    if type_requete == 'recherche_combinee':
+        return 'GET', f'/recherche?titre={alea.choice(MOTS)}&genre={alea.choice(GENRES)}&disponible=o&limite=20', b''
+    if type_requete == 'note':
+        return 'POST', f'/livres/{id_livre}/note', json.dumps({'note': alea.randint(1, 5)}).encode()
+    if type_requete == 'rapport':
+        return 'GET', '/rapport', b''
+    return 'POST', f'/livres/{id_livre}/{type_requete}', b''
+
+async def _envoyer(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, hote: str,
+                   methode: str, chemin: str, corps: bytes) -> Tuple[int, bytes]:
+    writer.write(f'{methode} {chemin} HTTP/1.1\r\nHost: {hote}\r\n'
+                 f'Content-Length: {len(corps)}\r\n\r\n'.encode('latin-1') + corps)
+    await writer.drain()
+    statut = int((await reader.readline()).split()[1])
+    longueur = 0
+    while True:
+        ligne = await reader.readline()
+        if ligne in (b'\r\n', b'\n', b''):
+            break
+        nom, _, valeur = ligne.decode('latin-1').partition(':')
+        if nom.strip().lower() == 'content-length':
+            longueur = int(valeur)
+    return statut, await reader.readexactly(longueur)
+
+async def _client(hote: str, port: int, fin: float, graine: int, dernier_id: int,
+                  latences: Dict[str, List[float]], statuts: Dict[int, int]) -> None:
+    alea = random.Random(graine)
+    types, poids = zip(*MELANGE)
+    reader, writer = await asyncio.open_connection(hote, port)
+    try:
+        while time.perf_counter() < fin:
+            type_requete = alea.choices(types, poids)[0]
+            methode, chemin, corps = _requete(type_requete, alea, dernier_id)
+            debut = time.perf_counter()
+            statut, _ = await _envoyer(reader, writer, hote, methode, chemin, corps)
+            latences[type_requete].append(time.perf_counter() - debut)
+            statuts[statut] = statuts.get(statut, 0) + 1
+    finally:
+        writer.close()
+
+async def executer_charge(hote: str = '127.0.0.1', port: int = 8080, connexions: int = 20,
+                          duree: float = 10.0, graine: int = 0) -> Dict[str, Any]:
+    """Lance `connexions` clients pendant `duree` secondes ; retourne débit et latences (en ms)."""
+    reader, writer = await asyncio.open_connection(hote, port)
+    _, corps = await _envoyer(reader, writer, hote, 'GET', '/etat', b'')
+    writer.close()
+    etat_initial = json.loads(corps)
+    dernier_id = (etat_initial.get('prochain_id') or etat_initial['livres'] + 1) - 1
+
+    latences: Dict[str, List[float]] = {t: [] for t, _ in MELANGE}
+    statuts: Dict[int, int] = {}
+    debut = time.perf_counter()
+    await asyncio.gather(*(_client(hote, port, debut + duree, graine + i, dernier_id, latences, statuts)
+                           for i in range(connexions)))
+    ecoule = time.perf_counter() - debut
+
+    reader, writer = await asyncio.open_connection(hote, port)
+    _, corps = await _envoyer(reader, writer, hote, 'GET', '/etat', b'')
+    writer.close()
+    etat = json.loads(corps)
+
+    def resume(valeurs: List[float]) -> Dict[str, Any]:
+        valeurs = sorted(valeurs)
+        return {'requetes': len(valeurs),
+                'p50_ms': percentile(valeurs, 50) * 1000,
+                'p99_ms': percentile(valeurs, 99) * 1000,
+                'max_ms': valeurs[-1] * 1000 if valeurs else 0.0}
+
+    toutes = [v for valeurs in latences.values() for v in valeurs]
+    mutations = etat['mutations'] - etat_initial['mutations']
+    sauvegardes = etat['sauvegardes'] - etat_initial['sauvegardes']
+    return {
+        'connexions': connexions,
+        'duree_s': ecoule,
+        'debit_rps': len(toutes) / ecoule,
+        'total': resume(toutes),
+        'par_type': {t: resume(v) for t, v in latences.items()},
+        'statuts': statuts,
+        'mutations_par_sauvegarde': mutations / sauvegardes if sauvegardes else None,
+    }
+
+def afficher_resultats(resultats: Dict[str, Any]) -> None:
+    print(f"\n🚦 {resultats['connexions']} connexions, {resultats['duree_s']:.1f} s : "
+          f"{resultats['debit_rps']:.0f} requêtes/s")
+    print(f"{'type':<20}{'requêtes':>10}{'p50 (ms)':>11}{'p99 (ms)':>11}{'max (ms)':>11}")
+    for nom, r in list(resultats['par_type'].items()) + [('total', resultats['total'])]:
+        print(f"{nom:<20}{r['requetes']:>10}{r['p50_ms']:>11.2f}{r['p99_ms']:>11.2f}{r['max_ms']:>11.2f}")
+    print("Statuts : " + ', '.join(f"{s} × {n}" for s, n in sorted(resultats['statuts'].items())))
+    if resultats['mutations_par_sauvegarde']:
+        print(f"Validation groupée : {resultats['mutations_par_sauvegarde']:.1f} mutations par sauvegarde")
+
+if __name__ == '__main__':
+    parseur = argparse.ArgumentParser(description="Test de charge du serveur de la bibliothèque.")
+    parseur.add_argument('--hote', default='127.0.0.1')
+    parseur.add_argument('--port', type=int, default=8080)
+    parseur.add_argument('--connexions', type=int, default=20)
+    parseur.add_argument('--duree', type=float, default=10.0, help="en secondes")
+    parseur.add_argument('--graine', type=int, default=0)
+    parseur.add_argument('--json', action='store_true', help="résultats bruts en JSON")
+    args = parseur.parse_args()
+    resultats = asyncio.run(executer_charge(args.hote, args.port, args.connexions, args.duree, args.graine))
+    if args.json:
+        print(json.dumps(resultats, indent=2))
+    else:
+        afficher_resultats(resultats)
@@ -0,0 +1,237 @@
+import argparse
+import os
+import shlex
+import sys
+from typing import List, Dict, Optional, Any, Callable, Iterable
+
+from bibliotheque import (
+    ajouter_livre,
+    emprunter_livre,
+    retourner_livre,
+    ajouter_note,
+    supprimer_livre,
+    rechercher_livre,
+    generer_rapport,
+    afficher_tous_les_livres,
+    charger_bibliotheque,
+    sauvegarder_bibliotheque,
+    exporter_livres,
+    FICHIER_DATA
+)
+
+# ------------------
+# Ligne de commande (sous-commandes et lots de commandes)
+# ------------------
+#
+#   python main.py emprunter 12 15
+#   python main.py lot circulation.txt --checkpoint 500
+#
+# Un lot contient une commande par ligne, avec la même syntaxe (sans
+# `--fichier`) ; lignes vides et commentaires '#' ignorés. Les commandes sont
+# appliquées en mémoire et la bibliothèque n'est réécrite qu'à la fin du lot
+# (et toutes les `--checkpoint` modifications) au lieu d'après chaque opération.
+
+FORMATS_RECHERCHE = ('table', 'csv', 'jsonl')
+
+class _Parseur(argparse.ArgumentParser):
+    """ArgumentParser qui lève ValueError au lieu de quitter : une ligne invalide n'interrompt pas un lot."""
+
+    def error(self, message: str) -> None:
+        raise ValueError(message)
+
+def construire_parseur(lot: bool = False) -> argparse.ArgumentParser:
+    """Parseur des sous-commandes ; avec `lot=True`, celui d'une ligne de lot (ni --fichier, ni lot)."""
+    parseur = _Parseur(prog='main.py' if not lot else 'lot',
+                       description="Gestion de bibliothèque en ligne de commande (sans argument : menu interactif).")
+    if not lot:
+        parseur.add_argument('--fichier', default=os.environ.get('BIBLIOTHEQUE_FICHIER', FICHIER_DATA),
+                             help="fichier de données (défaut : $BIBLIOTHEQUE_FICHIER ou bibliotheque.json)")
+    sous = parseur.add_subparsers(dest='commande', required=True, metavar='commande')
+
+    p = sous.add_parser('ajouter', aliases=['add'], help="ajouter un livre")
+    p.add_argument('titre')
+    p.add_argument('auteur')
+    p.add_argument('genre')
+    p.add_argument('annee', type=int)
+    p.add_argument('prix', type=float)
+    p.set_defaults(executer=_ajouter, modifie=True)
+
+    for nom, alias, aide, executer in (('emprunter', 'borrow', "emprunter des livres", _emprunter),
+                                       ('retourner', 'return', "retourner des livres", _retourner),
+                                       ('supprimer', 'delete', "supprimer des livres", _supprimer)):
+        p = sous.add_parser(nom, aliases=[alias], help=aide)
+        p.add_argument('ids', type=int, nargs='+', metavar='id')
+        p.set_defaults(executer=executer, modifie=True)
+
+    p = sous.add_parser('noter', aliases=['rate'], help="noter un livre (1-5)")
+    p.add_argument('id', type=int)
+    p.add_argument('note', type=int)
+    p.set_defaults(executer=_noter, modifie=True)
+
+    p = sous.add_parser('rechercher', aliases=['search'], help="rechercher par titre, auteur ou genre")
+    p.add_argument('critere', choices=('titre', 'auteur', 'genre'))
+    p.add_argument('valeur')
+    p.add_argument('--format', choices=FORMATS_RECHERCHE, default='table')
+    p.set_defaults(executer=_rechercher, modifie=False)
+
+    p = sous.add_parser('rapport', aliases=['report'], help="afficher les statistiques")
+    p.set_defaults(executer=_rapport, modifie=False)
+
+    p = sous.add_parser('exporter', aliases=['export'], help="exporter en CSV / JSON lines (.gz pour compresser)")
+    p.add_argument('destination')
+    p.set_defaults(executer=_exporter, modifie=False)
+
+    p = sous.add_parser('importer', aliases=['import'], help="import en masse depuis un CSV / JSON lines")
+    p.add_argument('source')
+    p.add_argument('--processus', type=int, default=None)
+    p.add_argument('--rejets', default=None, help="rapport des lignes rejetées (défaut : <source>.rejets.csv)")
+    p.set_defaults(executer=_importer, modifie=True)
+
+    if not lot:
+        p = sous.add_parser('lot', aliases=['batch'], help="exécuter les commandes d'un fichier ('-' : entrée standard)")
+        p.add_argument('source', nargs='?', default='-')
+        p.add_argument('--checkpoint', type=int, default=0, metavar='N',
+                       help="sauvegarder toutes les N commandes de modification (défaut : à la fin seulement)")
+        p.add_argument('--details', action='store_true', help="afficher le résultat de chaque commande")
+    return parseur
+
+def executer_ligne_de_commande(argv: List[str]) -> int:
+    """Point d'entrée non interactif de main.py ; retourne le code de sortie."""
+    parseur = construire_parseur()
+    try:
+        args = parseur.parse_args(argv)
+    except ValueError as e:
+        parseur.print_usage(sys.stderr)
+        print(f"{parseur.prog} : erreur : {e}", file=sys.stderr)
+        return 2
+    try:
+        livres = charger_bibliotheque(args.fichier, mode='paresseux')
+    except Exception as e:
+        print(f"❌ Erreur lors du chargement du fichier : {e}", file=sys.stderr)
+        return 1
+    if args.commande in ('lot', 'batch'):
+        if args.source == '-':
+            return executer_lot(livres, args.fichier, sys.stdin, args.checkpoint, args.details)
+        with open(args.source, 'r', encoding='utf-8') as f:
+            return executer_lot(livres, args.fichier, f, args.checkpoint, args.details)
+    code = 0
+    try:
+        message = args.executer(livres, args)
+        if message:
+            print(message)
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        code = 1
+    if args.modifie:
+        # Même après une erreur : une commande sur plusieurs ids a pu en modifier une partie
+        try:
+            sauvegarder_bibliotheque(livres, args.fichier, compacter=True)
+        except Exception as e:
+            print(f"❌ Erreur lors de la sauvegarde : {e}", file=sys.stderr)
+            code = 1
+    return code
+
+def executer_lot(livres: List[Dict[str, Any]], fichier: str, lignes: Iterable[str], checkpoint: int = 0,
+                 details: bool = False) -> int:
+    """Exécute une commande par ligne sur `livres` et sauvegarde dans `fichier`.
+
+    Une ligne en erreur est signalée (numéro et motif) sans arrêter le lot. La
+    sauvegarde a lieu toutes les `checkpoint` commandes de modification (0 : à la
+    fin seulement) et, en cas d'interruption, avant de quitter. Retourne 0 si
+    toutes les lignes ont réussi, 1 sinon.
+    """
+    parseur = construire_parseur(lot=True)
+    commandes = erreurs = sauvegardes = 0
+    en_attente = 0  # modifications non encore sauvegardées
+    try:
+        for numero, ligne in enumerate(lignes, start=1):
+            try:
+                mots = shlex.split(ligne, comments=True)
+                if not mots:
+                    continue
+                commandes += 1
+                args = parseur.parse_args(mots)
+                try:
+                    message = args.executer(livres, args)
+                finally:
+                    # Une commande sur plusieurs ids a pu en modifier une partie avant l'erreur
+                    en_attente += args.modifie
+                if details and message:
+                    print(message)
+            except SystemExit:
+                # '-h' sur une ligne : l'aide a été affichée
+                pass
+            except Exception as e:
+                erreurs += 1
+                print(f"Ligne {numero} : {e}", file=sys.stderr)
+            if checkpoint > 0 and en_attente >= checkpoint:
+                sauvegarder_bibliotheque(livres, fichier, compacter=True)
+                sauvegardes += 1
+                en_attente = 0
+    finally:
+        if en_attente:
+            sauvegarder_bibliotheque(livres, fichier, compacter=True)
+            sauvegardes += 1
+    print(f"Lot terminé : {commandes} commandes, {erreurs} erreurs, {sauvegardes} sauvegardes.")
+    return 1 if erreurs else 0
+
+# --- Exécution des commandes (retournent le message à afficher) ---
+
+def _pour_chaque(ids: List[int], operation: Callable[[int], Any], message: str) -> str:
+    """Applique `operation` à chaque id ; les erreurs sont levées ensemble après les autres ids."""
+    faits, erreurs = [], []
+    for id_livre in ids:
+        try:
+            operation(id_livre)
+            faits.append(str(id_livre))
+        except ValueError as e:
+            erreurs.append(f"ID {id_livre} : {e}")
+    if erreurs:
+        raise ValueError('; '.join(erreurs))
+    return f"✅ {message} (ID {', '.join(faits)})."
+
+def _ajouter(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    livre = ajouter_livre(livres, args.titre, args.auteur, args.genre, args.annee, args.prix)
+    return f"✅ Livre ajouté avec succès (ID {livre['id']})."
+
+def _emprunter(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    return _pour_chaque(args.ids, lambda i: emprunter_livre(livres, i), "Livre(s) emprunté(s)")
+
+def _retourner(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    return _pour_chaque(args.ids, lambda i: retourner_livre(livres, i), "Livre(s) retourné(s)")
+
+def _supprimer(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    def supprimer(id_livre: int) -> None:
+        if not supprimer_livre(livres, id_livre):
+            raise ValueError("aucun livre trouvé avec cet ID.")
+    return _pour_chaque(args.ids, supprimer, "Livre(s) supprimé(s)")
+
+def _noter(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    ajouter_note(livres, args.id, args.note)
+    return f"✅ Livre {args.id} noté {args.note}/5."
+
+def _rechercher(livres: List[Dict[str, Any]], args: argparse.Namespace) -> Optional[str]:
+    resultats = rechercher_livre(livres, args.critere, args.valeur)
+    if args.format != 'table':
+        sys.stdout.flush()
+        exporter_livres(resultats, sys.stdout.buffer, format=args.format)
+        return None
+    if not resultats:
+        return "🔍 Aucun résultat trouvé."
+    afficher_tous_les_livres(resultats)
+    return None
+
+def _rapport(livres: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    generer_rapport(livres)
+
+def _exporter(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    n = exporter_livres(livres, args.destination)
+    return f"✅ Export réalisé avec succès sous '{args.destination}' ({n} livres)."
+
+def _importer(livres: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    from importation import importer_livres
+    resultat = importer_livres(livres, args.source, rapport_rejets=args.rejets, processus=args.processus)
+    message = f"✅ {resultat['acceptes']} livres importés ({resultat['lus']} lignes lues)."
+    if resultat['rejetes']:
+        message += f"\n⚠️ {resultat['rejetes']} lignes rejetées : voir '{resultat['rapport_rejets']}'."
+    return message
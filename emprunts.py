@@ -0,0 +1,252 @@
+import heapq
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple, Callable
+
+# ------------------
+# Registre des emprunts (événements en ajout seul)
+# ------------------
+#
+# Fichier : une en-tête de 8 octets puis un enregistrement de 13 octets par
+# événement (id du livre, minutes depuis 1970, action). Les événements sont
+# écrits dans l'ordre chronologique : le fichier sert d'index par date.
+#
+# Les nouveaux événements restent en mémoire jusqu'à `synchroniser`, appelée
+# par la sauvegarde du catalogue : registre et état des livres atteignent le
+# disque ensemble. Le snapshot du catalogue note le nombre d'enregistrements
+# qu'il couvre ; au chargement, ceux écrits au-delà (sauvegarde interrompue
+# entre le registre et le snapshot) sont ignorés, puis écrasés.
+
+ACTIONS = ('emprunt', 'retour')
+FORMAT_DATE = "%Y-%m-%d %H:%M"
+DUREE_EMPRUNT = timedelta(days=14)
+
+_MAGIE = b'BIBLEMP1'
+_ENREGISTREMENT = struct.Struct('<qIB')
+_EPOQUE = datetime(1970, 1, 1)
+_TAILLE_LOT = 4096
+
+def chemin_emprunts(filename: str) -> str:
+    return filename + '.emprunts'
+
+def _minutes(date: datetime) -> int:
+    return int((date - _EPOQUE).total_seconds() // 60)
+
+def _date(minutes: int) -> datetime:
+    return _EPOQUE + timedelta(minutes=minutes)
+
+def _code(action: str) -> int:
+    try:
+        return ACTIONS.index(action)
+    except ValueError:
+        raise ValueError(f"Action inconnue : {action!r} (attendu 'emprunt' ou 'retour').") from None
+
+def _evenement(code: int, minutes: int) -> Dict[str, str]:
+    """Événement au format de l'historique intégré aux livres."""
+    return {'action': ACTIONS[code], 'date': _date(minutes).strftime(FORMAT_DATE)}
+
+class CompteursEmprunts:
+    """Nombre d'emprunts par livre et emprunts en cours, tenus à jour événement par événement."""
+
+    def __init__(self) -> None:
+        self.emprunts: Dict[int, int] = {}
+        self.en_cours: Dict[int, int] = {}
+
+    def ajouter(self, id_livre: int, minutes: int, code: int) -> None:
+        if code == 0:
+            self.emprunts[id_livre] = self.emprunts.get(id_livre, 0) + 1
+            self.en_cours[id_livre] = minutes
+        else:
+            self.en_cours.pop(id_livre, None)
+
+class _RequetesEmprunts:
+    """Requêtes communes aux registres ; les sous-classes fournissent `compteurs`,
+    `evenements_livre` et `evenements`."""
+
+    compteurs: CompteursEmprunts
+
+    def historique(self, id_livre: int) -> List[Dict[str, str]]:
+        return list(self.evenements_livre(id_livre))
+
+    def en_retard(self, maintenant: Optional[datetime] = None,
+                  duree: timedelta = DUREE_EMPRUNT) -> List[Tuple[int, datetime]]:
+        """(id, date d'emprunt) des emprunts en cours depuis plus de `duree`, du plus ancien au plus récent."""
+        limite = _minutes((maintenant or datetime.now()) - duree)
+        retards = sorted((m, i) for i, m in self.compteurs.en_cours.items() if m < limite)
+        return [(i, _date(m)) for m, i in retards]
+
+    def plus_empruntes(self, k: int, garder: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, int]]:
+        """Les k (id, nombre d'emprunts) les plus empruntés, parmi les ids acceptés par `garder`."""
+        candidats = self.compteurs.emprunts.items()
+        if garder is not None:
+            candidats = (c for c in candidats if garder(c[0]))
+        return heapq.nlargest(k, candidats, key=itemgetter(1))
+
+class RegistreEmprunts(_RequetesEmprunts):
+    """Registre des emprunts et retours, en ajout seul, séparé des livres.
+
+    L'index par livre ne garde en mémoire que les numéros d'enregistrement : un
+    historique est relu à la demande, événement par événement. Une plage de
+    dates est trouvée par recherche dichotomique dans le fichier. Si l'horloge
+    recule, la date enregistrée est ramenée à la dernière date connue pour
+    garder l'ordre chronologique.
+    """
+
+    def __init__(self, chemin: str, limite: Optional[int] = None) -> None:
+        """Ouvre le registre en lecture ; `limite` : nombre d'enregistrements couverts par le snapshot."""
+        self.chemin = chemin
+        self._f = open(chemin, 'rb')
+        self._fd = self._f.fileno()
+        taille = os.fstat(self._fd).st_size
+        if taille and os.pread(self._fd, len(_MAGIE), 0) != _MAGIE:
+            self._f.close()
+            raise ValueError('Registre des emprunts invalide : en-tête inconnu.')
+        # Un dernier enregistrement incomplet (arrêt brutal pendant l'écriture) est ignoré
+        n = max(taille - len(_MAGIE), 0) // _ENREGISTREMENT.size
+        self._ecrits = self._n = n if limite is None else min(n, limite)
+        self._attente: List[Tuple[int, int, int]] = []
+        self._verrou = threading.Lock()
+        self._par_livre: Dict[int, array] = {}
+        self._derniere = 0
+        self.compteurs = CompteursEmprunts()
+        for numero, (id_livre, minutes, code) in enumerate(self._lire(0, self._n)):
+            self._indexer(numero, id_livre, minutes, code)
+
+    @classmethod
+    def creer(cls, chemin: str, evenements: Iterable[Tuple[int, str, datetime]]) -> 'RegistreEmprunts':
+        """Crée (ou remplace) un registre à partir d'événements (id, action, date), écrit atomiquement.
+
+        Lève ValueError, sans rien écrire, si un événement n'entre pas dans le
+        format (action inconnue, date avant 1970).
+        """
+        enregistrements = sorted(((_minutes(d), i, _code(a)) for i, a, d in evenements), key=itemgetter(0))
+        try:
+            donnees = b''.join(_ENREGISTREMENT.pack(i, minutes, code) for minutes, i, code in enregistrements)
+        except struct.error as e:
+            raise ValueError(f"Événement hors du format du registre des emprunts : {e}") from None
+        temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporaire, 'wb') as f:
+            f.write(_MAGIE)
+            f.write(donnees)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, chemin)
+        return cls(chemin)
+
+    def _indexer(self, numero: int, id_livre: int, minutes: int, code: int) -> None:
+        self._par_livre.setdefault(id_livre, array('I')).append(numero)
+        self.compteurs.ajouter(id_livre, minutes, code)
+        self._derniere = max(self._derniere, minutes)
+
+    def _lire(self, debut: int, fin: int) -> Iterator[Tuple[int, int, int]]:
+        """Enregistrements [debut, fin[ lus par lots (puis ceux en attente d'écriture)."""
+        with self._verrou:
+            ecrits = self._ecrits
+            attente = self._attente[max(debut - ecrits, 0):max(fin - ecrits, 0)]
+        for lot in range(debut, min(fin, ecrits), _TAILLE_LOT):
+            n = min(_TAILLE_LOT, ecrits - lot, fin - lot)
+            donnees = os.pread(self._fd, n * _ENREGISTREMENT.size, len(_MAGIE) + lot * _ENREGISTREMENT.size)
+            yield from _ENREGISTREMENT.iter_unpack(donnees)
+        yield from attente
+
+    def _lire_un(self, numero: int) -> Tuple[int, int, int]:
+        with self._verrou:
+            if numero >= self._ecrits:
+                return self._attente[numero - self._ecrits]
+        return _ENREGISTREMENT.unpack(os.pread(self._fd, _ENREGISTREMENT.size,
+                                               len(_MAGIE) + numero * _ENREGISTREMENT.size))
+
+    def _premier_a_partir_de(self, minutes: int) -> int:
+        """Numéro du premier enregistrement daté de `minutes` ou après (dichotomie sur le fichier)."""
+        bas, haut = 0, self._n
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            if self._lire_un(milieu)[1] < minutes:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        return bas
+
+    def __len__(self) -> int:
+        return self._n
+
+    def ajouter(self, id_livre: int, action: str, date: Optional[datetime] = None) -> Dict[str, str]:
+        """Ajoute un événement à la fin du registre (écrit à la prochaine synchronisation) ; retourne l'événement."""
+        code = _code(action)
+        minutes = max(_minutes(date or datetime.now()), self._derniere)
+        with self._verrou:
+            self._attente.append((id_livre, minutes, code))
+        self._indexer(self._n, id_livre, minutes, code)
+        self._n += 1
+        return _evenement(code, minutes)
+
+    def evenements_livre(self, id_livre: int) -> Iterator[Dict[str, str]]:
+        """Historique d'un livre dans l'ordre chronologique, relu un événement à la fois."""
+        for numero in self._par_livre.get(id_livre, ()):
+            _, minutes, code = self._lire_un(numero)
+            yield _evenement(code, minutes)
+
+    def evenements(self, debut: Optional[datetime] = None, fin: Optional[datetime] = None,
+                   action: Optional[str] = None) -> Iterator[Tuple[int, str, datetime]]:
+        """(id, action, date) des événements de [debut, fin[, dans l'ordre chronologique."""
+        code = None if action is None else _code(action)
+        bas = 0 if debut is None else self._premier_a_partir_de(_minutes(debut))
+        haut = self._n if fin is None else self._premier_a_partir_de(_minutes(fin))
+        for id_livre, minutes, c in self._lire(bas, haut):
+            if code is None or c == code:
+                yield id_livre, ACTIONS[c], _date(minutes)
+
+    def synchroniser(self) -> None:
+        """Écrit les événements en attente à la suite des enregistrements conservés, puis fsync."""
+        with self._verrou:
+            ecrits, attente = self._ecrits, list(self._attente)
+        if not attente:
+            return
+        with open(self.chemin, 'r+b') as f:
+            if os.fstat(f.fileno()).st_size < len(_MAGIE):
+                f.write(_MAGIE)
+            # Écrase les enregistrements ignorés au chargement (non couverts par le snapshot)
+            f.seek(len(_MAGIE) + ecrits * _ENREGISTREMENT.size)
+            f.write(b''.join(_ENREGISTREMENT.pack(*e) for e in attente))
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        with self._verrou:
+            self._ecrits += len(attente)
+            del self._attente[:len(attente)]
+
+    def fermer(self) -> None:
+        self._f.close()
+
+class RegistreMemoire(_RequetesEmprunts):
+    """Même interface que RegistreEmprunts, construite à partir des historiques
+    intégrés aux livres (listes simples, Catalogue sans fichier)."""
+
+    def __init__(self, historiques: Iterable[Tuple[int, List[Dict[str, str]]]]) -> None:
+        self._historiques: Dict[int, List[Dict[str, str]]] = {}
+        enregistrements = []
+        for id_livre, historique in historiques:
+            self._historiques[id_livre] = historique
+            enregistrements.extend(
+                (_minutes(datetime.strptime(h['date'], FORMAT_DATE)), id_livre, _code(h['action'])) for h in historique)
+        enregistrements.sort(key=itemgetter(0))
+        self._enregistrements = enregistrements
+        self.compteurs = CompteursEmprunts()
+        for minutes, id_livre, code in enregistrements:
+            self.compteurs.ajouter(id_livre, minutes, code)
+
+    def evenements_livre(self, id_livre: int) -> Iterator[Dict[str, str]]:
+        return iter(self._historiques.get(id_livre, ()))
+
+    def evenements(self, debut: Optional[datetime] = None, fin: Optional[datetime] = None,
+                   action: Optional[str] = None) -> Iterator[Tuple[int, str, datetime]]:
+        code = None if action is None else _code(action)
+        bas = None if debut is None else _minutes(debut)
+        haut = None if fin is None else _minutes(fin)
+        for minutes, id_livre, c in self._enregistrements:
+            if (bas is None or minutes >= bas) and (haut is None or minutes < haut) and (code is None or c == code):
+                yield id_livre, ACTIONS[c], _date(minutes)
@@ -0,0 +1,145 @@
+import io
+import json
+import os
+from operator import attrgetter
+from typing import Dict, Optional, Any, Iterable, Callable, Sequence, Union, BinaryIO
+
+from livre import Livre, CHAMPS
+
+# ------------------
+# Export en flux (CSV / JSON lines)
+# ------------------
+
+CHAMPS_EXPORT = ('id', 'titre', 'auteur', 'genre', 'annee_publication', 'prix', 'disponible', 'note')
+FORMATS_EXPORT = ('csv', 'jsonl')
+TAILLE_LOT_EXPORT = 10000
+NIVEAU_GZIP = 6
+
+_TAILLE_TAMPON = 1 << 20
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+def format_fichier(filename: str) -> str:
+    """Format déduit de l'extension ('.csv', '.jsonl' ou '.ndjson', éventuellement suivie de '.gz').
+
+    Sert à l'export comme à l'import (voir importation.py).
+    """
+    base, extension = os.path.splitext(filename.lower())
+    if extension == '.gz':
+        extension = os.path.splitext(base)[1]
+    if extension not in _EXTENSIONS:
+        raise ValueError("Format de fichier inconnu : utiliser .csv ou .jsonl (éventuellement .gz).")
+    return _EXTENSIONS[extension]
+
+def exporter_livres(livres: Iterable[Dict[str, Any]], destination: Union[str, BinaryIO], format: Optional[str] = None,
+                    champs: Sequence[str] = CHAMPS_EXPORT, compresser: Optional[bool] = None,
+                    progression: Optional[Callable[[int, Optional[int]], None]] = None,
+                    taille_lot: int = TAILLE_LOT_EXPORT) -> int:
+    """Exporte des livres (tout itérable : catalogue, résultat de recherche...) en CSV ou JSON lines.
+
+    `destination` est un chemin ou un fichier binaire déjà ouvert. Format et
+    compression gzip sont déduits de l'extension, sauf s'ils sont donnés.
+    Les livres sont lus et écrits par lots de `taille_lot` : la mémoire reste
+    constante quelle que soit la taille de l'export. `progression(lignes_ecrites,
+    total)` est appelée après chaque lot (`total` vaut None si l'itérable n'a pas
+    de longueur). Retourne le nombre de livres exportés.
+    """
+    chemin = destination if isinstance(destination, str) else None
+    if format is None:
+        if chemin is None:
+            raise ValueError("Format d'export requis pour un fichier déjà ouvert.")
+        format = format_fichier(chemin)
+    if format not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'export invalide : {', '.join(FORMATS_EXPORT)}.")
+    if compresser is None:
+        compresser = chemin is not None and chemin.lower().endswith('.gz')
+    if not champs:
+        raise ValueError("Aucun champ à exporter.")
+    champs = tuple(champs)
+    try:
+        total = len(livres)
+    except TypeError:
+        total = None
+
+    brut = open(chemin, 'wb', buffering=_TAILLE_TAMPON) if chemin is not None else destination
+    try:
+        if compresser:
+            # Importé à l'usage, comme csv : un export non compressé n'en paie pas le coût
+            import gzip
+            flux = gzip.GzipFile(fileobj=brut, mode='wb', compresslevel=NIVEAU_GZIP, mtime=0)
+        else:
+            flux = brut
+        texte = io.TextIOWrapper(flux, encoding='utf-8', newline='', write_through=False)
+        try:
+            ecrire_lot = _lots_csv(texte, champs) if format == 'csv' else _lots_jsonl(texte, champs)
+            n = 0
+            lot = []
+            for livre in livres:
+                lot.append(livre)
+                if len(lot) >= taille_lot:
+                    n += ecrire_lot(lot)
+                    lot = []
+                    if progression is not None:
+                        progression(n, total)
+            if lot:
+                n += ecrire_lot(lot)
+                if progression is not None:
+                    progression(n, total)
+            texte.flush()
+        finally:
+            # Ne ferme pas un fichier fourni par l'appelant
+            texte.detach()
+            if compresser:
+                flux.close()
+    finally:
+        if chemin is not None:
+            brut.close()
+        else:
+            brut.flush()
+    return n
+
+def _extracteur(champs: Sequence[str]) -> Callable[[Dict[str, Any]], Sequence[Any]]:
+    """Fonction livre -> valeurs des champs.
+
+    Pour un Livre dont les champs demandés sont tous renseignés, les valeurs sont
+    lues d'un coup dans ses attributs, sans appel à `get` par champ.
+    """
+    def par_get(livre: Dict[str, Any]) -> Sequence[Any]:
+        return [livre.get(c) for c in champs]
+
+    if not set(champs) <= set(CHAMPS) or 'historique' in champs:
+        return par_get
+    attributs = attrgetter(*champs)
+    unique = len(champs) == 1
+
+    def valeurs(livre: Dict[str, Any]) -> Sequence[Any]:
+        if type(livre) is Livre:
+            try:
+                v = attributs(livre)
+            except AttributeError:
+                return par_get(livre)
+            return (v,) if unique else v
+        return par_get(livre)
+    return valeurs
+
+def _lots_csv(texte: io.TextIOWrapper, champs: Sequence[str]) -> Callable[[list], int]:
+    import csv
+    writer = csv.writer(texte)
+    writer.writerow(champs)
+    valeurs = _extracteur(champs)
+
+    def ecrire(lot: list) -> int:
+        writer.writerows(map(valeurs, lot))
+        return len(lot)
+    return ecrire
+
+def _lots_jsonl(texte: io.TextIOWrapper, champs: Sequence[str]) -> Callable[[list], int]:
+    encodeur = json.JSONEncoder(ensure_ascii=False, default=str)
+    valeurs = _extracteur(champs)
+
+    def ecrire(lot: list) -> int:
+        if lot:
+            # Un seul write par lot
+            texte.write('\n'.join(encodeur.encode(dict(zip(champs, valeurs(l)))) for l in lot))
+            texte.write('\n')
+        return len(lot)
+    return ecrire
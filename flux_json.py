@@ -0,0 +1,128 @@
+import codecs
+import json
+import os
+import re
+from typing import Dict, Any, Iterator, Tuple, Optional, Callable
+
+# ------------------
+# Lecture incrémentale d'un fichier catalogue JSON
+# ------------------
+
+_ESPACES = re.compile(r'[ \t\n\r]*')
+
+class LecteurCatalogue:
+    """Lit un fichier catalogue JSON livre par livre, en mémoire bornée.
+
+    Accepte l'ancien format (liste de livres) et le format enveloppe
+    {"prochain_id": ..., "sequence": ..., "livres": [...]}. L'itération produit
+    des tuples (position en octets, longueur en octets, livre) ; les champs de
+    l'enveloppe sont disponibles dans `entete` une fois l'itération terminée.
+
+    `progression(octets_lus, octets_total)` est appelée après chaque bloc lu.
+    """
+
+    def __init__(self, chemin: str, progression: Optional[Callable[[int, int], None]] = None,
+                 taille_bloc: int = 1 << 16) -> None:
+        self.chemin = chemin
+        self.progression = progression
+        self.taille_bloc = taille_bloc
+        self.entete: Dict[str, Any] = {}
+        self._decodeur = json.JSONDecoder()
+
+    def __iter__(self) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        self._total = os.path.getsize(self.chemin)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._i = 0
+        self._octets = 0
+        self._fin = False
+        with open(self.chemin, 'rb') as self._f:
+            c = self._car()
+            if c == '[':
+                self._avancer(self._i + 1)
+                yield from self._tableau()
+            elif c == '{':
+                self._avancer(self._i + 1)
+                yield from self._enveloppe()
+            else:
+                raise ValueError('Format de fichier invalide : attendu une liste de livres.')
+
+    def _enveloppe(self) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        while True:
+            c = self._car()
+            if c == '}':
+                self._avancer(self._i + 1)
+                return
+            if c == ',':
+                self._avancer(self._i + 1)
+                continue
+            cle = self._valeur()
+            if self._car() != ':':
+                raise ValueError("Fichier JSON corrompu : ':' attendu.")
+            self._avancer(self._i + 1)
+            if cle == 'livres':
+                if self._car() != '[':
+                    raise ValueError("Format de fichier invalide : 'livres' doit être une liste.")
+                self._avancer(self._i + 1)
+                yield from self._tableau()
+            else:
+                self.entete[cle] = self._valeur()
+
+    def _tableau(self) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        while True:
+            c = self._car()
+            if c == ']':
+                self._avancer(self._i + 1)
+                return
+            if c == ',':
+                self._avancer(self._i + 1)
+                continue
+            if c == '':
+                raise ValueError('Fichier JSON corrompu : liste non terminée.')
+            debut = self._octets
+            livre = self._valeur()
+            yield debut, self._octets - debut, livre
+
+    def _valeur(self) -> Any:
+        while True:
+            self._car()
+            try:
+                valeur, fin = self._decodeur.raw_decode(self._buf, self._i)
+            except json.JSONDecodeError as e:
+                if self._fin:
+                    raise ValueError(f'Fichier JSON corrompu ou format invalide : {e}')
+                self._lire()
+                continue
+            if fin == len(self._buf) and not self._fin:
+                # Un nombre peut être coupé en fin de bloc : relire avant de conclure
+                self._lire()
+                continue
+            self._avancer(fin)
+            return valeur
+
+    def _car(self) -> str:
+        """Saute les blancs et retourne le prochain caractère ('' en fin de fichier)."""
+        while True:
+            self._avancer(_ESPACES.match(self._buf, self._i).end())
+            if self._i < len(self._buf):
+                return self._buf[self._i]
+            if self._fin:
+                return ''
+            self._lire()
+
+    def _avancer(self, j: int) -> None:
+        self._octets += len(self._buf[self._i:j].encode('utf-8'))
+        self._i = j
+
+    def _lire(self) -> None:
+        bloc = self._f.read(self.taille_bloc)
+        self._fin = not bloc
+        self._buf = self._buf[self._i:] + self._utf8.decode(bloc, final=self._fin)
+        self._i = 0
+        if self.progression is not None:
+            self.progression(self._f.tell(), self._total)
+
+def lire_livre(f, position: int, longueur: int) -> Dict[str, Any]:
+    """Relit un seul livre à partir de sa position dans un fichier ouvert en binaire."""
+    f.seek(position)
+    return json.loads(f.read(longueur).decode('utf-8'))
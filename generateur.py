@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List
+
+from emprunts import FORMAT_DATE
+
+# ------------------
+# Catalogues synthétiques (bancs d'essai)
+# ------------------
+#
+# Générateur déterministe : même taille et même graine donnent exactement le
+# même catalogue. Genres et mots des titres suivent une loi de Zipf, les
+# auteurs une loi de puissance (quelques auteurs et genres très représentés,
+# une longue traîne) ; les livres ont un historique d'emprunts, dont environ
+# 10 % sont en cours.
+
+GENRES = ('Roman', 'Policier', 'Science-fiction', 'Fantasy', 'Jeunesse', 'Bande dessinée', 'Histoire',
+          'Biographie', 'Poésie', 'Théâtre', 'Essai', 'Philosophie', 'Cuisine', 'Voyage', 'Sciences',
+          'Art', 'Religion', 'Économie')
+PRENOMS = ('Jean', 'Marie', 'Pierre', 'Anne', 'Louis', 'Claire', 'Paul', 'Sophie', 'Jacques', 'Hélène',
+           'Michel', 'Isabelle', 'André', 'Catherine', 'Henri', 'Julie', 'François', 'Camille', 'Émile',
+           'Nathalie', 'Victor', 'Léa', 'Albert', 'Chloé', 'Georges', 'Inès', 'Marcel', 'Zoé', 'René', 'Lucie',
+           'Alexandre', 'Margaux', 'Honoré', 'Simone', 'Gustave', 'Colette', 'Guy', 'Annie', 'Boris', 'Joanne')
+NOMS = ('Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau',
+        'Simon', 'Laurent', 'Lefèvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier',
+        'Morel', 'Girard', 'André', 'Mercier', 'Dupont', 'Lambert', 'Bonnet', 'François', 'Martinez', 'Legrand',
+        'Hugo', 'Zola', 'Verne', 'Sand', 'Dumas', 'Camus', 'Proust', 'Balzac', 'Flaubert', 'Rowling',
+        'Maupassant', 'Duras', 'Ernaux', 'Modiano', 'Sagan', 'Vian', 'Queneau', 'Pagnol', 'Giono', 'Colette')
+MOTS = ('le', 'la', 'les', 'un', 'une', 'de', 'du', 'des', 'et', 'au', 'nuit', 'jour', 'amour', 'guerre',
+        'paix', 'mer', 'ciel', 'terre', 'feu', 'vent', 'roi', 'reine', 'prince', 'château', 'ville', 'jardin',
+        'maison', 'voyage', 'secret', 'mystère', 'ombre', 'lumière', 'temps', 'mémoire', 'histoire', 'enfant',
+        'femme', 'homme', 'père', 'mère', 'frère', 'sœur', 'ami', 'ennemi', 'dernier', 'premier', 'grand',
+        'petit', 'noir', 'blanc', 'rouge', 'bleu', 'perdu', 'retrouvé', 'silence', 'cri', 'rêve', 'étoile',
+        'lune', 'soleil', 'hiver', 'été', 'printemps', 'automne', 'route', 'fleuve', 'montagne', 'forêt',
+        'île', 'désert', 'empire', 'royaume', 'dragon', 'sorcier', 'crime', 'enquête', 'meurtre', 'vérité',
+        'mensonge', 'destin', 'âme', 'cœur', 'sang', 'larmes', 'rire', 'chanson', 'lettre', 'livre', 'miroir',
+        'porte', 'clé', 'chemin', 'retour', 'départ', 'fin', 'commencement', 'éternité', 'nouvelle', 'vie')
+
+DATE_REFERENCE = datetime(2025, 1, 1)
+ANNEE_MIN = 1850
+EMPRUNTS_MOYENS = 3.0
+PART_EN_COURS = 0.1
+
+def _zipf(alea: random.Random, n: int) -> int:
+    """Rang dans [0, n) de loi approximativement zipfienne (exposant 1) : tirage log-uniforme."""
+    return min(int(math.exp(alea.random() * math.log(n + 1))) - 1, n - 1)
+
+def _puissance(alea: random.Random, n: int) -> int:
+    """Rang dans [0, n), moins concentré que _zipf : les 10 % premiers rangs font environ 30 % des tirages."""
+    return int(n * alea.random() ** 2)
+
+def nom_auteur(rang: int) -> str:
+    """Auteur de rang donné ; au-delà des combinaisons prénom-nom, un numéro les distingue."""
+    p, n = len(PRENOMS), len(NOMS)
+    # Rangs voisins : prénoms et noms différents (bijection, 41 et 50 étant premiers entre eux)
+    nom = f"{PRENOMS[rang % p]} {NOMS[((rang // p) * (p + 1) + rang) % n]}"
+    cycle = rang // (p * n)
+    return f"{nom} {cycle + 1}" if cycle else nom
+
+def generer_livres(n: int, graine: int = 0, historique: bool = True,
+                   maintenant: datetime = DATE_REFERENCE) -> Iterator[Dict[str, Any]]:
+    """Produit `n` livres (ids 1 à n), au format de la bibliothèque.
+
+    Le nombre d'auteurs croît avec le catalogue (un pour dix livres, au moins
+    cinquante). Les dates d'emprunt précèdent `maintenant` (date fixe par défaut,
+    pour un résultat indépendant du jour de génération).
+    """
+    alea = random.Random(graine)
+    nb_auteurs = max(50, n // 10)
+    annees = maintenant.year - ANNEE_MIN
+    for id_livre in range(1, n + 1):
+        titre = ' '.join(MOTS[_zipf(alea, len(MOTS))] for _ in range(alea.randint(2, 5)))
+        livre = {
+            'id': id_livre,
+            'titre': titre[0].upper() + titre[1:],
+            'auteur': nom_auteur(_puissance(alea, nb_auteurs)),
+            'genre': GENRES[_zipf(alea, len(GENRES))],
+            # Plus de livres récents qu'anciens
+            'annee_publication': ANNEE_MIN + int(annees * math.sqrt(alea.random())),
+            'prix': round(max(1.0, alea.lognormvariate(2.7, 0.5)), 2),
+            'disponible': True,
+            'note': alea.randint(1, 5) if alea.random() < 0.3 else 0,
+            'historique': [],
+        }
+        if historique:
+            livre['historique'] = _historique(alea, maintenant)
+            livre['disponible'] = not livre['historique'] or livre['historique'][-1]['action'] == 'retour'
+        yield livre
+
+def _historique(alea: random.Random, maintenant: datetime) -> List[Dict[str, str]]:
+    evenements = []
+    date = maintenant - timedelta(days=alea.uniform(30, 3 * 365))
+    for _ in range(min(int(alea.expovariate(1 / EMPRUNTS_MOYENS)), 50)):
+        date += timedelta(days=alea.uniform(0, 60), minutes=alea.randint(0, 24 * 60))
+        if date >= maintenant:
+            break
+        evenements.append({'action': 'emprunt', 'date': date.strftime(FORMAT_DATE)})
+        date += timedelta(days=alea.uniform(1, 30))
+        if date >= maintenant:
+            break
+        evenements.append({'action': 'retour', 'date': date.strftime(FORMAT_DATE)})
+    if evenements and evenements[-1]['action'] == 'retour' and alea.random() < PART_EN_COURS:
+        # Emprunt en cours (éventuellement en retard)
+        date = maintenant - timedelta(days=alea.uniform(0, 40))
+        if date.strftime(FORMAT_DATE) > evenements[-1]['date']:
+            evenements.append({'action': 'emprunt', 'date': date.strftime(FORMAT_DATE)})
+    return evenements
+
+def ecrire_catalogue(chemin: str, n: int, graine: int = 0, historique: bool = True) -> int:
+    """Écrit un catalogue généré dans `chemin` (format JSON de la bibliothèque), en flux.
+
+    Retourne la taille du fichier en octets.
+    """
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write(f'{{"prochain_id": {n + 1}, "sequence": 0, "livres": [\n')
+        for livre in generer_livres(n, graine, historique):
+            f.write((',\n' if livre['id'] > 1 else '') + json.dumps(livre, ensure_ascii=False))
+        f.write('\n]}\n')
+    return os.path.getsize(chemin)
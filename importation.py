@@ -0,0 +1,252 @@
+import csv
+import gzip
+import io
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain
+from operator import itemgetter
+from typing import List, Dict, Optional, Any, Iterator, Tuple, Callable, TextIO
+
+from bibliotheque import verifier_livre, ajouter_livres
+from export import format_fichier, FORMATS_EXPORT
+
+# ------------------
+# Import en masse (CSV / JSON lines)
+# ------------------
+#
+# Le fichier est lu en flux par lots ; chaque lot est converti et validé (mêmes
+# règles que verifier_livre) dans un processus du pool pendant que le suivant
+# est lu. Les lignes acceptées sont ajoutées au catalogue en une seule passe à
+# la fin, les lignes rejetées sont écrites avec leur motif dans un rapport CSV.
+
+TAILLE_LOT_IMPORT = 10000
+COLONNES_IMPORT = ('titre', 'auteur', 'genre', 'annee_publication', 'prix')
+
+_ALIAS = {'annee': 'annee_publication'}
+_LOTS_PAR_PROCESSUS = 2  # lots soumis d'avance à chaque processus
+
+Lot = List[Tuple[int, Any]]
+
+def chemin_rejets(source: str) -> str:
+    return source + '.rejets.csv'
+
+def importer_livres(livres: List[Dict[str, Any]], source: str, format: Optional[str] = None,
+                    rapport_rejets: Optional[str] = None, processus: Optional[int] = None,
+                    taille_lot: int = TAILLE_LOT_IMPORT,
+                    progression: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Importe les livres d'un fichier CSV ou JSON lines (éventuellement .gz).
+
+    Colonnes (ou clés) attendues : 'titre', 'auteur', 'genre', 'annee_publication'
+    (ou 'annee') et 'prix' ; les autres sont ignorées. La validation est répartie
+    sur `processus` processus (par défaut, un par cœur ; un fichier d'un seul lot
+    est validé sur place). Les lignes invalides sont écrites dans `rapport_rejets`
+    (par défaut `<source>.rejets.csv`, créé seulement s'il y a des rejets) avec
+    leur numéro de ligne et le motif du rejet ; pour une source CSV, ce rapport
+    corrigé se réimporte tel quel (colonnes 'ligne' et 'raison' ignorées). Les livres
+    acceptés sont ajoutés en une passe, après la lecture complète du fichier :
+    une erreur de lecture n'en ajoute aucun. `progression(octets_lus, octets_total)`
+    est appelée après chaque lot.
+
+    Retourne {'lus', 'acceptes', 'rejetes', 'rapport_rejets'} ('rapport_rejets'
+    vaut None sans rejet). L'appelant sauvegarde ensuite la bibliothèque.
+    """
+    if format is None:
+        format = format_fichier(source)
+    if format not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'import invalide : {', '.join(FORMATS_EXPORT)}.")
+    if processus is None:
+        processus = os.cpu_count() or 1
+    rapport_rejets = rapport_rejets or chemin_rejets(source)
+    annee_courante = datetime.now().year
+    total = os.path.getsize(source)
+    acceptes: List[Dict[str, Any]] = []
+    lus = 0
+
+    with open(source, 'rb') as brut:
+        flux = gzip.GzipFile(fileobj=brut, mode='rb') if source.lower().endswith('.gz') else brut
+        # 'utf-8-sig' : tolère l'indicateur d'ordre des octets ajouté par les tableurs
+        texte = io.TextIOWrapper(flux, encoding='utf-8-sig', newline='')
+        try:
+            if format == 'csv':
+                lecteur = csv.reader(texte)
+                entete = next(lecteur, [])
+                positions = _positions_colonnes(entete)
+                lots = _lots_csv(lecteur, taille_lot)
+            else:
+                entete, positions = ['enregistrement'], None
+                lots = _lots_jsonl(texte, taille_lot)
+            rejets = _RapportRejets(rapport_rejets, entete, format)
+            try:
+                for lot_acceptes, lot_rejets, n in _valider_lots(lots, format, positions, annee_courante, processus):
+                    lus += n
+                    acceptes.extend(lot_acceptes)
+                    rejets.ecrire(lot_rejets)
+                    if progression is not None:
+                        progression(min(brut.tell(), total), total)
+            finally:
+                rejets.fermer()
+        finally:
+            texte.detach()
+            if flux is not brut:
+                flux.close()
+
+    ajouter_livres(livres, acceptes, valider=False)
+    return {
+        'lus': lus,
+        'acceptes': len(acceptes),
+        'rejetes': rejets.n,
+        'rapport_rejets': rapport_rejets if rejets.n else None,
+    }
+
+def _positions_colonnes(entete: List[str]) -> Tuple[int, ...]:
+    """Position de chaque colonne de COLONNES_IMPORT dans l'en-tête CSV."""
+    noms = [_ALIAS.get(n.strip().lower(), n.strip().lower()) for n in entete]
+    manquantes = [c for c in COLONNES_IMPORT if c not in noms]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans l'en-tête CSV : {', '.join(manquantes)}.")
+    return tuple(noms.index(c) for c in COLONNES_IMPORT)
+
+def _lots_csv(lecteur: Any, taille_lot: int) -> Iterator[Lot]:
+    """Lots de (numéro de ligne, champs) ; une ligne CSV peut s'étendre sur plusieurs lignes du fichier."""
+    lot = []
+    precedente = lecteur.line_num
+    for champs in lecteur:
+        if champs:
+            lot.append((precedente + 1, champs))
+            if len(lot) >= taille_lot:
+                yield lot
+                lot = []
+        precedente = lecteur.line_num
+    if lot:
+        yield lot
+
+def _lots_jsonl(texte: TextIO, taille_lot: int) -> Iterator[Lot]:
+    lot = []
+    for numero, ligne in enumerate(texte, start=1):
+        ligne = ligne.strip()
+        if ligne:
+            lot.append((numero, ligne))
+            if len(lot) >= taille_lot:
+                yield lot
+                lot = []
+    if lot:
+        yield lot
+
+def _valider_lots(lots: Iterator[Lot], format: str, positions: Optional[Tuple[int, ...]], annee_courante: int,
+                  processus: int) -> Iterator[Tuple[List[Dict[str, Any]], List[Tuple[int, str, Any]], int]]:
+    """Résultats de _valider_lot, dans l'ordre du fichier.
+
+    Au plus `_LOTS_PAR_PROCESSUS` lots par processus sont en attente : la mémoire
+    reste bornée quelle que soit la taille du fichier.
+    """
+    debut = [lot for lot in (next(lots, None), next(lots, None)) if lot is not None]
+    lots = chain(debut, lots)
+    if processus <= 1 or len(debut) < 2:
+        for lot in lots:
+            yield _valider_lot(format, positions, annee_courante, lot)
+        return
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        en_attente = deque()
+        for lot in lots:
+            en_attente.append(pool.submit(_valider_lot, format, positions, annee_courante, lot))
+            if len(en_attente) >= processus * _LOTS_PAR_PROCESSUS:
+                yield en_attente.popleft().result()
+        while en_attente:
+            yield en_attente.popleft().result()
+
+def _valider_lot(format: str, positions: Optional[Tuple[int, ...]], annee_courante: int,
+                 lot: Lot) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str, Any]], int]:
+    """Convertit et valide un lot (exécuté dans un processus du pool).
+
+    Retourne (enregistrements acceptés, rejets (ligne, motif, données brutes), taille du lot).
+    """
+    acceptes, rejets = [], []
+    colonnes = itemgetter(*positions) if format == 'csv' else None
+    for numero, brut in lot:
+        try:
+            if format == 'csv':
+                try:
+                    valeurs = colonnes(brut)
+                except IndexError:
+                    # Ligne trop courte : les colonnes absentes sont vides
+                    valeurs = [brut[i] if i < len(brut) else None for i in positions]
+            else:
+                valeurs = _valeurs_json(brut)
+            titre, auteur, genre, annee, prix = valeurs
+            annee, prix = _entier(annee), _nombre(prix)
+            verifier_livre(titre, auteur, annee, prix, genre, annee_courante)
+        except ValueError as e:
+            rejets.append((numero, str(e), brut))
+            continue
+        acceptes.append({'titre': titre, 'auteur': auteur, 'genre': genre,
+                         'annee_publication': annee, 'prix': prix})
+    return acceptes, rejets, len(lot)
+
+def _valeurs_json(ligne: str) -> List[Any]:
+    try:
+        donnees = json.loads(ligne)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON invalide : {e}")
+    if not isinstance(donnees, dict):
+        raise ValueError("Objet JSON attendu.")
+    for alias, colonne in _ALIAS.items():
+        if colonne not in donnees and alias in donnees:
+            donnees[colonne] = donnees[alias]
+    return [donnees.get(c) for c in COLONNES_IMPORT]
+
+def _entier(valeur: Any) -> Any:
+    """Entier lu dans une chaîne ; sinon la valeur telle quelle (verifier_livre la rejettera si besoin)."""
+    if type(valeur) is str:
+        try:
+            return int(valeur)
+        except ValueError:
+            pass
+    return valeur
+
+def _nombre(valeur: Any) -> Any:
+    """Nombre fini lu dans une chaîne (virgule décimale acceptée) ; sinon la valeur telle quelle."""
+    if type(valeur) is str:
+        try:
+            nombre = float(valeur)
+        except ValueError:
+            try:
+                nombre = float(valeur.replace(',', '.'))
+            except ValueError:
+                return valeur
+        return nombre if math.isfinite(nombre) else valeur
+    return valeur
+
+class _RapportRejets:
+    """Rapport CSV des lignes rejetées : ligne, raison puis les données d'origine.
+
+    Le fichier n'est créé qu'au premier rejet.
+    """
+
+    def __init__(self, chemin: str, entete: List[str], format: str) -> None:
+        self.chemin = chemin
+        self.entete = entete
+        self.format = format
+        self.n = 0
+        self._f = None
+        self._writer = None
+
+    def ecrire(self, rejets: List[Tuple[int, str, Any]]) -> None:
+        if not rejets:
+            return
+        if self._f is None:
+            self._f = open(self.chemin, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._f)
+            self._writer.writerow(['ligne', 'raison'] + list(self.entete))
+        if self.format == 'csv':
+            self._writer.writerows([numero, raison] + brut for numero, raison, brut in rejets)
+        else:
+            self._writer.writerows(rejets)
+        self.n += len(rejets)
+
+    def fermer(self) -> None:
+        if self._f is not None:
+            self._f.close()
@@ -0,0 +1,409 @@
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from heapq import heapify, heappop, heappush
+from itertools import chain, groupby, islice
+from operator import itemgetter
+from typing import Dict, Any, Set, Iterable, Iterator, Optional, Callable, List, Tuple
+
+from metriques import compter
+
+# ------------------
+# Normalisation du texte (casse + accents)
+# ------------------
+
+def normaliser(texte: Any) -> str:
+    """Retourne le texte sans accents et en minuscules ("Saint-Exupéry" -> "saint-exupery")."""
+    texte = str(texte)
+    if texte.isascii():
+        # Rien à décomposer : évite NFKD et le filtrage caractère par caractère
+        return texte.casefold()
+    decompose = unicodedata.normalize('NFKD', texte)
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+def trigrammes(texte: str) -> Set[str]:
+    """Ensemble des sous-chaînes de 3 caractères d'un texte déjà normalisé."""
+    return {texte[i:i + 3] for i in range(len(texte) - 2)}
+
+def _texte_et_trigrammes(texte: str) -> Tuple[str, Set[str]]:
+    return texte, trigrammes(texte)
+
+# Au-delà de ce nombre de valeurs distinctes, un lot cesse d'en mémoriser (titres uniques)
+MEMO_LOT = 65536
+
+def _memoiser(fonction: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """`fonction` mémorisée le temps d'un lot : un auteur ou un genre répété n'est normalisé qu'une fois."""
+    memo: Dict[str, Any] = {}
+
+    def memorisee(valeur: Any) -> Any:
+        if type(valeur) is not str:
+            return fonction(valeur)
+        resultat = memo.get(valeur)
+        if resultat is None:
+            resultat = fonction(valeur)
+            if len(memo) < MEMO_LOT:
+                memo[valeur] = resultat
+        return resultat
+    return memorisee
+
+# ------------------
+# Index inversé de trigrammes (recherche de sous-chaîne)
+# ------------------
+
+class IndexTrigrammes:
+    """Index inversé trigramme -> ids pour les champs texte des livres.
+
+    Les valeurs normalisées sont conservées par id : une requête ne normalise que
+    la valeur cherchée, puis vérifie les seuls candidats issus des listes de
+    trigrammes.
+    """
+
+    def __init__(self, champs: Iterable[str] = ('titre', 'auteur', 'genre')) -> None:
+        self.champs = tuple(champs)
+        self._postings: Dict[str, Dict[str, Set[int]]] = {c: {} for c in self.champs}
+        self._textes: Dict[str, Dict[int, str]] = {c: {} for c in self.champs}
+
+    def ajouter(self, livre: Dict[str, Any]) -> None:
+        id_livre = livre['id']
+        for champ in self.champs:
+            texte = normaliser(livre.get(champ, ''))
+            self._textes[champ][id_livre] = texte
+            postings = self._postings[champ]
+            for t in trigrammes(texte):
+                postings.setdefault(t, set()).add(id_livre)
+
+    def ajouter_lot(self, livres: List[Dict[str, Any]]) -> None:
+        """Comme `ajouter` pour chaque livre, champ par champ."""
+        decouper = _memoiser(lambda valeur: _texte_et_trigrammes(normaliser(valeur)))
+        for champ in self.champs:
+            textes = self._textes[champ]
+            postings = self._postings[champ]
+            for livre in livres:
+                id_livre = livre['id']
+                texte, cles = decouper(livre.get(champ, ''))
+                textes[id_livre] = texte
+                for t in cles:
+                    ids = postings.get(t)
+                    if ids is None:
+                        postings[t] = {id_livre}
+                    else:
+                        ids.add(id_livre)
+
+    def retirer(self, livre: Dict[str, Any]) -> None:
+        id_livre = livre['id']
+        for champ in self.champs:
+            texte = self._textes[champ].pop(id_livre, None)
+            if texte is None:
+                continue
+            postings = self._postings[champ]
+            for t in trigrammes(texte):
+                ids = postings.get(t)
+                if ids is not None:
+                    ids.discard(id_livre)
+                    if not ids:
+                        del postings[t]
+
+    def estimer(self, champ: str, valeur: str) -> int:
+        """Majorant du nombre de résultats, sans calculer l'intersection."""
+        cles = trigrammes(normaliser(valeur).strip())
+        if not cles:
+            return len(self._textes[champ])
+        postings = self._postings[champ]
+        return min(len(postings.get(t, ())) for t in cles)
+
+    def texte(self, champ: str, id_livre: int) -> Optional[str]:
+        """Valeur normalisée d'un champ pour un livre indexé."""
+        return self._textes[champ].get(id_livre)
+
+    def rechercher(self, champ: str, valeur: str) -> Set[int]:
+        """Ids des livres dont le champ contient `valeur` (casse et accents ignorés)."""
+        v = normaliser(valeur).strip()
+        textes = self._textes[champ]
+        cles = trigrammes(v)
+        if not cles:
+            # Requête trop courte pour les trigrammes : parcours des valeurs pré-normalisées
+            compter(len(textes))
+            return {i for i, t in textes.items() if v in t}
+        postings = self._postings[champ]
+        listes = sorted((postings.get(t, set()) for t in cles), key=len)
+        candidats = set(listes[0])
+        for ids in listes[1:]:
+            if not candidats:
+                break
+            candidats &= ids
+        compter(len(candidats))
+        return {i for i in candidats if v in textes[i]}
+
+# ------------------
+# Index d'égalité (valeur normalisée -> ids)
+# ------------------
+
+def _cle_texte(valeur: Any) -> str:
+    return normaliser(valeur).strip()
+
+class IndexEgalite:
+    """Index de hachage sur la valeur (normalisée par `cle`) d'un champ."""
+
+    def __init__(self, champ: str, cle: Callable[[Any], Any] = _cle_texte, defaut: Any = '') -> None:
+        self.champ = champ
+        self.champs = (champ,)
+        self._cle = cle
+        self._defaut = defaut
+        self._ids: Dict[Any, Set[int]] = {}
+        self._cles: Dict[int, Any] = {}
+
+    def ajouter(self, livre: Dict[str, Any]) -> None:
+        cle = self._cle(livre.get(self.champ, self._defaut))
+        self._cles[livre['id']] = cle
+        self._ids.setdefault(cle, set()).add(livre['id'])
+
+    def ajouter_lot(self, livres: List[Dict[str, Any]]) -> None:
+        """Comme `ajouter` pour chaque livre, une valeur répétée n'étant normalisée qu'une fois."""
+        cle = _memoiser(self._cle)
+        for livre in livres:
+            id_livre = livre['id']
+            valeur = cle(livre.get(self.champ, self._defaut))
+            self._cles[id_livre] = valeur
+            ids = self._ids.get(valeur)
+            if ids is None:
+                self._ids[valeur] = {id_livre}
+            else:
+                ids.add(id_livre)
+
+    def retirer(self, livre: Dict[str, Any]) -> None:
+        cle = self._cles.pop(livre['id'], None)
+        ids = self._ids.get(cle)
+        if ids is not None:
+            ids.discard(livre['id'])
+            if not ids:
+                del self._ids[cle]
+
+    def ids(self, valeur: Any) -> Set[int]:
+        """Ids des livres dont le champ vaut `valeur` (après normalisation)."""
+        return self._ids.get(self._cle(valeur), set())
+
+    def cle(self, id_livre: int) -> Any:
+        """Valeur normalisée du champ pour un livre indexé."""
+        return self._cles.get(id_livre)
+
+# ------------------
+# Clés de tri et index triés
+# ------------------
+
+def _cle_annee(valeur: Any) -> int:
+    return int(valeur)
+
+# Clé de comparaison d'une valeur (non None) pour chaque champ triable
+CLES_TRI: Dict[str, Callable[[Any], Any]] = {
+    'titre': _cle_texte,
+    'auteur': _cle_texte,
+    'prix': float,
+    'annee_publication': _cle_annee,
+}
+
+def cle_tri(champ: str, valeur: Any) -> Tuple:
+    """Clé de tri d'une valeur ; une valeur absente (None) passe après toutes les autres."""
+    return (True,) if valeur is None else (False, CLES_TRI[champ](valeur))
+
+def trier_par_cles(livres: List[Dict[str, Any]], cles: List[Tuple[str, bool]]) -> List[Dict[str, Any]]:
+    """Trie `livres` sur place selon des (champ, décroissant), la première clé étant prioritaire."""
+    # Tris stables successifs, de la clé la moins prioritaire à la plus prioritaire
+    for champ, decroissant in reversed(cles):
+        livres.sort(key=lambda l: cle_tri(champ, l.get(champ)), reverse=decroissant)
+    return livres
+
+class IndexTri:
+    """Liste (clé de tri, id) gardée triée pour un champ.
+
+    Les ajouts isolés sont insérés par dichotomie ; un chargement en masse est
+    mis en attente et trié d'un coup à la première lecture. Un parcours ou une
+    plage ne lit que les entrées retournées. Les livres sans valeur sont gardés
+    à part et viennent après les autres (avant eux en ordre décroissant).
+    """
+
+    # Au-delà de ce nombre d'ajouts en attente, un tri complet bat les insertions
+    SEUIL_INSERTION = 16
+
+    def __init__(self, champ: str) -> None:
+        self.champ = champ
+        self.champs = (champ,)
+        self._cle = CLES_TRI[champ]
+        self._entrees: List[Tuple[Any, int]] = []
+        self._en_attente: List[Tuple[Any, int]] = []
+        self._sans_valeur: Set[int] = set()
+        # Le tri différé a lieu à la lecture : deux lecteurs ne doivent pas le faire ensemble
+        self._verrou = threading.Lock()
+
+    def ajouter(self, livre: Dict[str, Any]) -> None:
+        valeur = livre.get(self.champ)
+        if valeur is None:
+            self._sans_valeur.add(livre['id'])
+        else:
+            self._en_attente.append((self._cle(valeur), livre['id']))
+
+    def ajouter_lot(self, livres: List[Dict[str, Any]]) -> None:
+        """Comme `ajouter` pour chaque livre ; le lot est trié d'un coup à la première lecture."""
+        cle = _memoiser(self._cle)
+        en_attente = self._en_attente
+        for livre in livres:
+            valeur = livre.get(self.champ)
+            if valeur is None:
+                self._sans_valeur.add(livre['id'])
+            else:
+                en_attente.append((cle(valeur), livre['id']))
+
+    def retirer(self, livre: Dict[str, Any]) -> None:
+        valeur = livre.get(self.champ)
+        if valeur is None:
+            self._sans_valeur.discard(livre['id'])
+            return
+        entrees = self._triees()
+        entree = (self._cle(valeur), livre['id'])
+        i = bisect_left(entrees, entree)
+        if i < len(entrees) and entrees[i] == entree:
+            del entrees[i]
+
+    def _triees(self) -> List[Tuple[Any, int]]:
+        if self._en_attente:
+            with self._verrou:
+                if len(self._en_attente) <= self.SEUIL_INSERTION:
+                    for entree in self._en_attente:
+                        insort(self._entrees, entree)
+                else:
+                    self._entrees.extend(self._en_attente)
+                    self._entrees.sort()
+                self._en_attente = []
+        return self._entrees
+
+    def _plage(self, minimum: Any, maximum: Any) -> Tuple[List[Tuple[Any, int]], int, int, List[int]]:
+        """(entrées, début, fin, ids sans valeur) ; une borne exclut les livres sans valeur."""
+        entrees = self._triees()
+        bas = 0 if minimum is None else bisect_left(entrees, (self._cle(minimum),))
+        haut = len(entrees) if maximum is None else bisect_right(entrees, (self._cle(maximum), float('inf')))
+        bornes = minimum is not None or maximum is not None
+        return entrees, bas, haut, [] if bornes else sorted(self._sans_valeur)
+
+    def groupes(self, minimum: Any = None, maximum: Any = None, decroissant: bool = False) -> Iterator[List[int]]:
+        """Ids par groupes de clé égale, dans l'ordre du tri, bornes incluses.
+
+        À clé égale, les ids restent croissants, même en ordre décroissant (comme
+        un tri stable avec reverse=True).
+        """
+        entrees, bas, haut, sans_valeur = self._plage(minimum, maximum)
+        if decroissant and sans_valeur:
+            yield sans_valeur
+        indices = range(haut - 1, bas - 1, -1) if decroissant else range(bas, haut)
+        for _, groupe in groupby(map(entrees.__getitem__, indices), key=itemgetter(0)):
+            ids = [id_livre for _, id_livre in groupe]
+            yield ids[::-1] if decroissant else ids
+        if not decroissant and sans_valeur:
+            yield sans_valeur
+
+    def ids(self, minimum: Any = None, maximum: Any = None, decroissant: bool = False) -> Iterator[int]:
+        """Ids dans l'ordre du tri (voir `groupes`)."""
+        if decroissant:
+            return chain.from_iterable(self.groupes(minimum, maximum, decroissant))
+        entrees, bas, haut, sans_valeur = self._plage(minimum, maximum)
+        return chain(map(itemgetter(1), map(entrees.__getitem__, range(bas, haut))), sans_valeur)
+
+# ------------------
+# Statistiques maintenues incrémentalement
+# ------------------
+
+class Statistiques:
+    """Compteurs du catalogue tenus à jour à chaque mutation.
+
+    Les prix sont indexés par un IndexTri : les k livres les moins et les plus
+    chers se lisent aux deux bouts de l'index, sans retrier le catalogue.
+    Une modification ne met à jour que les compteurs des champs changés.
+    """
+
+    def __init__(self) -> None:
+        self.champs = ('disponible', 'prix', 'genre')
+        self.total = 0
+        self.disponibles = 0
+        self.prix_total = 0.0
+        self.genres: Dict[str, int] = {}
+        self.par_prix = IndexTri('prix')
+        self._livres: Dict[int, Dict[str, Any]] = {}
+        # Rang d'arrivée de chaque livre (ordre du catalogue) et, par genre, un
+        # tas (rang, id) dont le sommet valide est le premier livre du genre
+        self._rangs: Dict[int, int] = {}
+        self._premiers: Dict[str, List[Tuple[int, int]]] = {}
+        self._prochain_rang = 0
+
+    def ajouter(self, livre: Dict[str, Any]) -> None:
+        self.total += 1
+        self.disponibles += bool(livre.get('disponible', False))
+        self.prix_total += float(livre.get('prix', 0.0))
+        self.par_prix.ajouter(livre)
+        self._livres[livre['id']] = livre
+        self._rangs[livre['id']] = self._prochain_rang
+        self._prochain_rang += 1
+        self._ajouter_genre(livre)
+
+    def retirer(self, livre: Dict[str, Any]) -> None:
+        self.total -= 1
+        self.disponibles -= bool(livre.get('disponible', False))
+        self.prix_total -= float(livre.get('prix', 0.0))
+        self.par_prix.retirer(livre)
+        self._livres.pop(livre['id'], None)
+        self._rangs.pop(livre['id'], None)
+        self._retirer_genre(livre.get('genre', 'Inconnu'))
+        if not self.total:
+            # Repart de zéro pour ne pas traîner d'erreur d'arrondi
+            self.prix_total = 0.0
+
+    def modifier(self, avant: Dict[str, Any], livre: Dict[str, Any]) -> None:
+        """Répercute la modification d'un livre (`avant` : copie de ses anciens champs)."""
+        self.disponibles += bool(livre.get('disponible', False)) - bool(avant.get('disponible', False))
+        if livre.get('prix') != avant.get('prix'):
+            self.prix_total += float(livre.get('prix', 0.0)) - float(avant.get('prix', 0.0))
+            self.par_prix.retirer(avant)
+            self.par_prix.ajouter(livre)
+        genre = avant.get('genre', 'Inconnu')
+        if livre.get('genre', 'Inconnu') != genre:
+            self._retirer_genre(genre)
+            self._ajouter_genre(livre)
+
+    def _ajouter_genre(self, livre: Dict[str, Any]) -> None:
+        genre = livre.get('genre', 'Inconnu')
+        self.genres[genre] = self.genres.get(genre, 0) + 1
+        heappush(self._premiers.setdefault(genre, []), (self._rangs[livre['id']], livre['id']))
+
+    def _retirer_genre(self, genre: str) -> None:
+        self.genres[genre] -= 1
+        if not self.genres[genre]:
+            del self.genres[genre]
+            del self._premiers[genre]
+        elif len(self._premiers[genre]) > 2 * self.genres[genre] + 16:
+            # Trop d'entrées périmées : le tas est reconstruit
+            tas = [e for e in self._premiers[genre] if self._valide(genre, e)]
+            heapify(tas)
+            self._premiers[genre] = tas
+
+    def _valide(self, genre: str, entree: Tuple[int, int]) -> bool:
+        rang, id_livre = entree
+        livre = self._livres.get(id_livre)
+        return (livre is not None and self._rangs[id_livre] == rang
+                and livre.get('genre', 'Inconnu') == genre)
+
+    def _premier_rang(self, genre: str) -> int:
+        tas = self._premiers[genre]
+        while not self._valide(genre, tas[0]):
+            heappop(tas)
+        return tas[0][0]
+
+    def genre_populaire(self) -> Optional[str]:
+        """Genre le plus représenté ; à égalité, celui qui apparaît en premier dans le catalogue."""
+        if not self.genres:
+            return None
+        maximum = max(self.genres.values())
+        ex_aequo = [genre for genre, nombre in self.genres.items() if nombre == maximum]
+        return min(ex_aequo, key=self._premier_rang)
+
+    def moins_chers(self, k: int) -> List[Dict[str, Any]]:
+        return [self._livres[i] for i in islice(self.par_prix.ids(), max(k, 0))]
+
+    def plus_chers(self, k: int) -> List[Dict[str, Any]]:
+        return [self._livres[i] for i in islice(self.par_prix.ids(decroissant=True), max(k, 0))]
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Tuple
+
+from livre import vers_json
+from emprunts import FORMAT_DATE
+
+# ------------------
+# Journal des mutations (write-ahead, une ligne JSON par opération)
+# ------------------
+
+POLITIQUES_FSYNC = ('toujours', 'lot', 'jamais')
+_TAILLE_BLOC = 10000
+
+def chemin_journal(filename: str) -> str:
+    """Chemin du journal associé à un fichier de données."""
+    return filename + '.journal'
+
+class Journal:
+    """Journal append-only des mutations du catalogue.
+
+    Chaque ligne est un objet JSON numéroté ('seq') décrivant une opération :
+    - {'op': 'ajout', 'livre': {...}}
+    - {'op': 'suppression', 'id': ...}
+    - {'op': 'maj', 'id': ..., 'champs': {...}, 'historique': {...} (optionnel)}
+
+    Politique fsync : 'toujours' (après chaque ligne), 'lot' (toutes les
+    `taille_lot` lignes) ou 'jamais' (laissé au système).
+    """
+
+    def __init__(self, chemin: str, fsync: str = 'toujours', taille_lot: int = 100,
+                 seuil_compactage: int = 1000, entrees: int = 0) -> None:
+        if fsync not in POLITIQUES_FSYNC:
+            raise ValueError(f"Politique fsync invalide : {', '.join(POLITIQUES_FSYNC)}.")
+        self.chemin = chemin
+        self.fsync = fsync
+        self.taille_lot = taille_lot
+        self.seuil_compactage = seuil_compactage
+        self.entrees = entrees
+        self._non_synchronisees = 0
+        _tronquer_ligne_incomplete(chemin)
+        self._f = open(chemin, 'a', encoding='utf-8')
+
+    def ecrire(self, seq: int, entree: Dict[str, Any]) -> None:
+        """Ajoute l'opération numéro `seq` en fin de journal selon la politique fsync."""
+        ligne = json.dumps({'seq': seq, **entree}, ensure_ascii=False, default=vers_json)
+        self._f.write(ligne + '\n')
+        self._f.flush()
+        self.entrees += 1
+        self._non_synchronisees += 1
+        if self.fsync == 'toujours' or (self.fsync == 'lot' and self._non_synchronisees >= self.taille_lot):
+            self.synchroniser()
+
+    def ecrire_lot(self, premiere_seq: int, entrees: List[Dict[str, Any]]) -> None:
+        """Ajoute des opérations numérotées à partir de `premiere_seq`, par blocs de lignes.
+
+        Avec la politique 'toujours', un seul fsync couvre tout le lot.
+        """
+        encodeur = json.JSONEncoder(ensure_ascii=False, default=vers_json)
+        for debut in range(0, len(entrees), _TAILLE_BLOC):
+            bloc = entrees[debut:debut + _TAILLE_BLOC]
+            self._f.write(''.join(encodeur.encode({'seq': seq, **entree}) + '\n'
+                                  for seq, entree in enumerate(bloc, start=premiere_seq + debut)))
+        self._f.flush()
+        self.entrees += len(entrees)
+        self._non_synchronisees += len(entrees)
+        if self.fsync == 'toujours' or (self.fsync == 'lot' and self._non_synchronisees >= self.taille_lot):
+            self.synchroniser()
+
+    def synchroniser(self) -> None:
+        """Force l'écriture sur disque des lignes en attente."""
+        if self._non_synchronisees:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._non_synchronisees = 0
+
+    def doit_compacter(self) -> bool:
+        return self.entrees >= self.seuil_compactage
+
+    def vider(self) -> None:
+        """Tronque le journal ; à appeler une fois le snapshot écrit."""
+        self._f.close()
+        self._f = open(self.chemin, 'w', encoding='utf-8')
+        self.entrees = 0
+        self._non_synchronisees = 0
+
+    def fermer(self) -> None:
+        self.synchroniser()
+        self._f.close()
+
+def _tronquer_ligne_incomplete(chemin: str) -> None:
+    # Retire une éventuelle fin de ligne partielle laissée par un crash, pour que
+    # les prochaines écritures ne soient pas collées à une ligne corrompue.
+    if not os.path.exists(chemin):
+        return
+    with open(chemin, 'rb+') as f:
+        contenu = f.read()
+        if contenu and not contenu.endswith(b'\n'):
+            f.truncate(contenu.rfind(b'\n') + 1)
+
+def lire_journal(chemin: str) -> Iterator[Dict[str, Any]]:
+    """Itère sur les opérations du journal.
+
+    Une dernière ligne incomplète (écriture interrompue par un crash) est ignorée.
+    """
+    if not os.path.exists(chemin):
+        return
+    with open(chemin, 'r', encoding='utf-8') as f:
+        for ligne in f:
+            if not ligne.endswith('\n'):
+                break
+            try:
+                yield json.loads(ligne)
+            except json.JSONDecodeError:
+                break
+
+def rejouer_journal(livres, chemin: str, depuis: int = 0) -> Tuple[int, int]:
+    """Rejoue sur `livres` les opérations de numéro > `depuis`.
+
+    Retourne (nombre d'opérations appliquées, dernier numéro vu). Les opérations
+    déjà contenues dans le snapshot sont ignorées, le rejeu est donc sûr même si
+    un crash a eu lieu entre l'écriture du snapshot et la troncature du journal.
+    """
+    appliquees, derniere = 0, depuis
+    for entree in lire_journal(chemin):
+        seq = entree.get('seq', 0)
+        if seq <= depuis:
+            continue
+        op = entree.get('op')
+        if op == 'ajout':
+            if livres.get(entree['livre']['id']) is None:
+                livres.append(entree['livre'])
+        elif op == 'suppression':
+            livres.supprimer(entree['id'])
+        elif op == 'maj':
+            livre = livres.modifier(entree['id'], entree.get('champs', {}))
+            if livre is not None and 'historique' in entree:
+                evenement = entree['historique']
+                registre = getattr(livres, 'emprunts', None)
+                if registre is not None:
+                    # Registre des emprunts : l'événement y est remis en attente d'écriture
+                    registre.ajouter(entree['id'], evenement['action'],
+                                     datetime.strptime(evenement['date'], FORMAT_DATE))
+                else:
+                    livres.historique(entree['id']).append(evenement)
+        else:
+            raise ValueError(f"Opération de journal inconnue : {op!r}")
+        appliquees += 1
+        derniere = seq
+    return appliquees, derniere
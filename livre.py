@@ -0,0 +1,127 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Dict, Any, Iterator, Optional
+
+# ------------------
+# Représentation compacte d'un livre
+# ------------------
+
+CHAMPS = ('id', 'titre', 'auteur', 'genre', 'annee_publication', 'prix', 'disponible', 'note', 'historique')
+_CHAMPS = frozenset(CHAMPS)
+
+class Livre(MutableMapping):
+    """Livre stocké dans des __slots__ au lieu d'un dict, avec l'interface d'un dict.
+
+    Les noms d'auteur et de genre sont internés : un même auteur n'est stocké
+    qu'une fois, quel que soit le nombre de ses livres. L'historique est toujours
+    présent du point de vue de l'appelant, mais une liste vide n'est allouée
+    qu'au premier accès. Les clés inconnues sont rangées dans un petit dict
+    annexe, créé seulement si besoin.
+    """
+
+    __slots__ = CHAMPS + ('_autres',)
+
+    def __init__(self, donnees: Optional[Dict[str, Any]] = None, **champs: Any) -> None:
+        self._autres = None
+        if donnees:
+            self.update(donnees)
+        if champs:
+            self.update(champs)
+
+    @classmethod
+    def nouveau(cls, id_livre: int, titre: str, auteur: str, genre: str, annee: int, prix: float) -> 'Livre':
+        """Livre neuf (disponible, sans note ni historique), construit sans passer par __setitem__."""
+        livre = cls.__new__(cls)
+        livre._autres = None
+        livre.id = id_livre
+        livre.titre = titre
+        livre.auteur = sys.intern(auteur)
+        livre.genre = sys.intern(genre)
+        livre.annee_publication = annee
+        livre.prix = prix
+        livre.disponible = True
+        livre.note = 0
+        return livre
+
+    def __getitem__(self, cle: str) -> Any:
+        if cle in _CHAMPS:
+            try:
+                return getattr(self, cle)
+            except AttributeError:
+                if cle == 'historique':
+                    self.historique = []
+                    return self.historique
+                raise KeyError(cle) from None
+        if self._autres is None:
+            raise KeyError(cle)
+        return self._autres[cle]
+
+    def __setitem__(self, cle: str, valeur: Any) -> None:
+        if cle in _CHAMPS:
+            if cle in ('auteur', 'genre') and isinstance(valeur, str):
+                valeur = sys.intern(valeur)
+            elif cle == 'historique' and not valeur:
+                # Pas de liste vide stockée : elle sera recréée au premier accès
+                self.__delitem__(cle)
+                return
+            setattr(self, cle, valeur)
+        else:
+            if self._autres is None:
+                self._autres = {}
+            self._autres[cle] = valeur
+
+    def __delitem__(self, cle: str) -> None:
+        if cle in _CHAMPS:
+            if hasattr(self, cle):
+                delattr(self, cle)
+            elif cle != 'historique':
+                raise KeyError(cle)
+        elif self._autres is not None and cle in self._autres:
+            del self._autres[cle]
+        else:
+            raise KeyError(cle)
+
+    def __iter__(self) -> Iterator[str]:
+        for cle in CHAMPS:
+            if cle == 'historique' or hasattr(self, cle):
+                yield cle
+        if self._autres:
+            yield from self._autres
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, cle: Any) -> bool:
+        if cle in _CHAMPS:
+            return cle == 'historique' or hasattr(self, cle)
+        return self._autres is not None and cle in self._autres
+
+    def get(self, cle: str, defaut: Any = None) -> Any:
+        # Raccourci : évite le try/except de Mapping.get sur le chemin des recherches.
+        # Un historique non alloué est rendu comme une liste vide non rattachée :
+        # pour le modifier, passer par livre['historique'] ou setdefault.
+        if cle == 'historique':
+            return getattr(self, cle, [])
+        if cle in _CHAMPS:
+            return getattr(self, cle, defaut)
+        return defaut if self._autres is None else self._autres.get(cle, defaut)
+
+    def __repr__(self) -> str:
+        return f"Livre({vers_json(self)!r})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return vers_json(self)
+
+    def __setstate__(self, etat: Dict[str, Any]) -> None:
+        self._autres = None
+        self.update(etat)
+
+def vers_json(objet: Any) -> Dict[str, Any]:
+    """Hook `default=` de json.dump : convertit un Livre en dict sans allouer d'historique."""
+    if isinstance(objet, Livre):
+        donnees = {c: getattr(objet, c) for c in CHAMPS if hasattr(objet, c)}
+        donnees.setdefault('historique', [])
+        if objet._autres:
+            donnees.update(objet._autres)
+        return donnees
+    raise TypeError(f"Objet de type {type(objet).__name__} non sérialisable en JSON")
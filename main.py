@@ -1,6 +1,14 @@
+import os
+import sys
+import threading
+
+from catalogue import Catalogue
 from bibliotheque import (
     ajouter_livre,
-    afficher_tous_les_livres,
+    ajouter_livres,
+    PagesLivres,
+    afficher_page,
+    TAILLE_PAGE,
     rechercher_livre,
     emprunter_livre,
     retourner_livre,
@@ -9,11 +17,13 @@ from bibliotheque import (
     supprimer_livre,
     charger_bibliotheque,
     sauvegarder_bibliotheque,
-    trier_catalogue,
+    FICHIER_DATA,
+    parcourir_tri,
     ajouter_note,
     afficher_journal,
     recherche_combinee,
-    sauvegarder_csv
+    exporter_livres,
+    afficher_suivi_emprunts
 )
 
 def saisie_int_retry(prompt: str, allow_quit: bool = True) -> int:
@@ -37,6 +47,90 @@ def saisie_float_retry(prompt: str, allow_quit: bool = True) -> float:
         except ValueError:
             print("❌ Entrée invalide — entrez un nombre (ex: 19.99) ou 'q' pour annuler.")
 
+def afficher_par_pages(livres, taille_page: int = TAILLE_PAGE, total=None) -> None:
+    """Affiche les livres page par page : 's' suivante, 'p' précédente, un numéro pour y aller, 'q' pour quitter."""
+    pages = PagesLivres(livres, taille_page, total)
+    numero = 1
+    while True:
+        if numero > 1 and not pages.page(numero):
+            # Au-delà de la dernière page (longueur découverte en lisant) : on s'y arrête
+            numero = pages.nb_pages
+        afficher_page(pages, numero)
+        total = pages.nb_pages
+        if total == 1:
+            return
+        choix = input("Page : [s]uivante, [p]récédente, numéro, [q]uitter : ").strip().lower()
+        if choix in ('q', ''):
+            return
+        if choix == 's':
+            if total is not None and numero >= total:
+                print("Dernière page atteinte.")
+            else:
+                numero += 1
+        elif choix == 'p':
+            numero = max(1, numero - 1)
+        elif choix.isdigit() and int(choix) >= 1:
+            numero = int(choix) if total is None else min(int(choix), total)
+        else:
+            print("❌ Choix invalide.")
+
+EXEMPLES = [
+    ("1984", "George Orwell", "Dystopie", 1949, 12.99),
+    ("Le Petit Prince", "Antoine de Saint-Exupéry", "Conte", 1943, 9.50),
+    ("Harry Potter à l'école des Sorciers", "J.K. Rowling", "Fantasy", 1997, 19.99),
+    ("Clean Code", "Robert C. Martin", "Informatique", 2008, 34.90),
+    ("Sapiens", "Yuval Noah Harari", "Histoire", 2011, 24.00),
+    ("Le Comte de Monte-Cristo", "Alexandre Dumas", "Aventure", 1844, 14.00),
+    ("Algorithms", "Robert Sedgewick", "Informatique", 2011, 45.00),
+    ("La Peste", "Albert Camus", "Roman", 1947, 11.00),
+    ("Don Quichotte", "Miguel de Cervantes", "Roman", 1605, 16.50),
+    ("Le Rouge et le Noir", "Stendhal", "Roman", 1830, 10.20),
+]
+
+class ChargementEnFond:
+    """Charge la bibliothèque dans un thread pendant que le menu s'affiche.
+
+    `livres()` attend la fin du chargement : le premier choix du menu n'est
+    servi qu'une fois le catalogue prêt.
+    """
+
+    def __init__(self, fichier: str) -> None:
+        self.fichier = fichier
+        self._livres = None
+        self._erreur = None
+        self._thread = threading.Thread(target=self._charger, name='chargement', daemon=True)
+        self._thread.start()
+
+    def _charger(self) -> None:
+        try:
+            livres = charger_bibliotheque(self.fichier, journaliser=True, mode='paresseux')
+        except Exception as e:
+            self._erreur = e
+            livres = Catalogue()
+        # Si vide, exemples initiaux
+        if not livres:
+            try:
+                ajouter_livres(livres, [
+                    {'titre': t, 'auteur': a, 'genre': g, 'annee_publication': y, 'prix': p}
+                    for t, a, g, y, p in EXEMPLES
+                ])
+            except ValueError:
+                pass
+            try:
+                sauvegarder_bibliotheque(livres, self.fichier)
+            except Exception:
+                pass
+        self._livres = livres
+
+    def livres(self) -> Catalogue:
+        if self._thread.is_alive():
+            print("⏳ Chargement de la bibliothèque...")
+            self._thread.join()
+        if self._erreur is not None:
+            print(f"⚠️ Erreur lors du chargement du fichier : {self._erreur}")
+            self._erreur = None
+        return self._livres
+
 def saisie_texte_nonvide(prompt: str, allow_quit: bool = True) -> str:
     while True:
         val = input(prompt).strip()
@@ -47,37 +141,19 @@ def saisie_texte_nonvide(prompt: str, allow_quit: bool = True) -> str:
         print("❌ Le champ ne peut pas être vide (ou tapez 'q' pour annuler).")
 
 if __name__ == '__main__':
-    livres = []
-    # Chargement initial
+    # Avec des arguments : mode non interactif (sous-commande ou lot, voir `python main.py -h`)
+    if len(sys.argv) > 1:
+        from commandes import executer_ligne_de_commande
+        sys.exit(executer_ligne_de_commande(sys.argv[1:]))
+    # Fichier de données : JSON par défaut, base SQLite si l'extension est .db / .sqlite
+    fichier = os.environ.get('BIBLIOTHEQUE_FICHIER', FICHIER_DATA)
+    # Nombre de livres par page pour les affichages en table
     try:
-        livres = charger_bibliotheque()
-    except Exception as e:
-        print(f"⚠️ Erreur lors du chargement du fichier : {e}")
-        livres = []
-
-    # Si vide, exemples initiaux
-    if not livres:
-        exemples = [
-            ("1984", "George Orwell", "Dystopie", 1949, 12.99),
-            ("Le Petit Prince", "Antoine de Saint-Exupéry", "Conte", 1943, 9.50),
-            ("Harry Potter à l'école des Sorciers", "J.K. Rowling", "Fantasy", 1997, 19.99),
-            ("Clean Code", "Robert C. Martin", "Informatique", 2008, 34.90),
-            ("Sapiens", "Yuval Noah Harari", "Histoire", 2011, 24.00),
-            ("Le Comte de Monte-Cristo", "Alexandre Dumas", "Aventure", 1844, 14.00),
-            ("Algorithms", "Robert Sedgewick", "Informatique", 2011, 45.00),
-            ("La Peste", "Albert Camus", "Roman", 1947, 11.00),
-            ("Don Quichotte", "Miguel de Cervantes", "Roman", 1605, 16.50),
-            ("Le Rouge et le Noir", "Stendhal", "Roman", 1830, 10.20),
-        ]
-        for t, a, g, y, p in exemples:
-            try:
-                ajouter_livre(livres, t, a, g, y, p)
-            except ValueError:
-                pass
-        try:
-            sauvegarder_bibliotheque(livres)
-        except Exception:
-            pass
+        taille_page = max(1, int(os.environ.get('BIBLIOTHEQUE_TAILLE_PAGE', TAILLE_PAGE)))
+    except ValueError:
+        taille_page = TAILLE_PAGE
+    # Chargement initial, en parallèle de l'affichage du menu
+    chargement = ChargementEnFond(fichier)
 
     # Boucle principale
     while True:
@@ -94,10 +170,13 @@ if __name__ == '__main__':
         print("10. Noter un livre")
         print("11. Afficher historique un livre")
         print("12. Recherche avancée")
-        print("13. Export CSV")
+        print("13. Export (CSV / JSON lines)")
+        print("14. Suivi des emprunts")
+        print("15. Import en masse (CSV / JSON lines)")
         print("0. Quitter")
 
-        choix = input("Choisissez une option (0-13) : ").strip()
+        choix = input("Choisissez une option (0-15) : ").strip()
+        livres = chargement.livres()
 
         try:
             if choix == '1':
@@ -109,13 +188,13 @@ if __name__ == '__main__':
                     annee = saisie_int_retry("Année de publication (ex: 1997) : ")
                     prix = saisie_float_retry("Prix (ex: 19.99) : ")
                     livre = ajouter_livre(livres, titre, auteur, genre, annee, prix)
-                    sauvegarder_bibliotheque(livres)
+                    sauvegarder_bibliotheque(livres, fichier)
                     print(f"✅ Livre ajouté avec succès (ID {livre['id']})")
                 except ValueError as e:
                     print(f"❌ Opération annulée / erreur : {e}")
 
             elif choix == '2':
-                afficher_tous_les_livres(livres)
+                afficher_par_pages(livres, taille_page)
 
             elif choix == '3':
                 # boucle de reprise si critere invalide
@@ -130,7 +209,7 @@ if __name__ == '__main__':
                         if not res:
                             print("🔍 Aucun résultat trouvé.")
                         else:
-                            afficher_tous_les_livres(res)
+                            afficher_par_pages(res, taille_page)
                         break
                     except ValueError as e:
                         print(f"❌ {e} — réessayez ou tapez 'q' pour annuler.")
@@ -147,7 +226,7 @@ if __name__ == '__main__':
                             raise ValueError("Annulé par l'utilisateur.")
                         id_l = int(id_l)
                         emprunter_livre(livres, id_l)
-                        sauvegarder_bibliotheque(livres)
+                        sauvegarder_bibliotheque(livres, fichier)
                         print("✅ Livre emprunté avec succès.")
                         break
                     except ValueError as e:
@@ -164,7 +243,7 @@ if __name__ == '__main__':
                             raise ValueError("Annulé par l'utilisateur.")
                         id_l = int(id_l)
                         retourner_livre(livres, id_l)
-                        sauvegarder_bibliotheque(livres)
+                        sauvegarder_bibliotheque(livres, fichier)
                         print("✅ Livre retourné avec succès.")
                         break
                     except ValueError as e:
@@ -182,7 +261,7 @@ if __name__ == '__main__':
                     if not res:
                         print("Aucun livre trouvé pour ce genre.")
                     else:
-                        afficher_tous_les_livres(res)
+                        afficher_par_pages(res, taille_page)
 
             elif choix == '7':
                 generer_rapport(livres)
@@ -199,7 +278,7 @@ if __name__ == '__main__':
                         if conf == 'o':
                             ok = supprimer_livre(livres, id_l)
                             if ok:
-                                sauvegarder_bibliotheque(livres)
+                                sauvegarder_bibliotheque(livres, fichier)
                                 print("✅ Livre supprimé.")
                             else:
                                 print("❌ Aucun livre trouvé avec cet ID.")
@@ -213,10 +292,11 @@ if __name__ == '__main__':
 
             elif choix == '9':
                 print("\n🔀 Trier les livres")
-                cle = input("Par quel critère trier ? (titre / auteur / prix) : ").strip().lower()
+                cle = input("Par quel critère trier ? (titre / auteur / prix / annee ; ex. 'auteur,-prix') : ").strip().lower()
                 try:
-                    livres_tries = trier_catalogue(livres, cle)
-                    afficher_tous_les_livres(livres_tries)
+                    # Tri parcouru à la demande : seules les pages affichées sont lues
+                    livres_tries = parcourir_tri(livres, cle)
+                    afficher_par_pages(livres_tries, taille_page, len(livres))
                 except Exception as e:
                     print(f"❌ {e}")
 
@@ -233,7 +313,7 @@ if __name__ == '__main__':
                             raise ValueError("Annulé par l'utilisateur.")
                         note = int(note)
                         ajouter_note(livres, id_l, note)
-                        sauvegarder_bibliotheque(livres)
+                        sauvegarder_bibliotheque(livres, fichier)
                         print("✅ Livre noté avec succès.")
                         break
                     except ValueError as e:
@@ -261,31 +341,53 @@ if __name__ == '__main__':
                 titre = input("Titre (laisser vide si non) : ").strip() or None
                 auteur = input("Auteur (laisser vide si non) : ").strip() or None
                 genre = input("Genre (laisser vide si non) : ").strip() or None
-                res = recherche_combinee(livres, titre, auteur, genre)
+                dispo = input("Disponibilité (o = disponibles, n = empruntés, vide = tous) : ").strip().lower()
+                disponible = {'o': True, 'n': False}.get(dispo)
+                res = recherche_combinee(livres, titre, auteur, genre, disponible)
                 if not res:
                     print("🔍 Aucun résultat trouvé.")
                 else:
-                    afficher_tous_les_livres(res)
+                    afficher_par_pages(res, taille_page)
 
             elif choix == '13':
+                nom = input("Fichier d'export (.csv, .jsonl, + .gz pour compresser ; vide = bibliotheque.csv) : ").strip()
+                nom = nom or 'bibliotheque.csv'
                 try:
-                    sauvegarder_csv(livres)
-                    print("✅ Export CSV réalisé avec succès sous 'bibliotheque.csv'.")
+                    n = exporter_livres(livres, nom)
+                    print(f"✅ Export réalisé avec succès sous '{nom}' ({n} livres).")
                 except Exception as e:
-                    print(f"❌ Erreur lors de l'export CSV : {e}")
+                    print(f"❌ Erreur lors de l'export : {e}")
+
+            elif choix == '14':
+                afficher_suivi_emprunts(livres)
+
+            elif choix == '15':
+                nom = input("Fichier à importer (.csv, .jsonl, + .gz si compressé ; vide = annuler) : ").strip()
+                if not nom:
+                    print("Annulé.")
+                else:
+                    try:
+                        from importation import importer_livres
+                        resultat = importer_livres(livres, nom)
+                        sauvegarder_bibliotheque(livres, fichier)
+                        print(f"✅ {resultat['acceptes']} livres importés ({resultat['lus']} lignes lues).")
+                        if resultat['rejetes']:
+                            print(f"⚠️ {resultat['rejetes']} lignes rejetées : voir '{resultat['rapport_rejets']}'.")
+                    except Exception as e:
+                        print(f"❌ Erreur lors de l'import : {e}")
 
             elif choix == '0':
                 # sauvegarde et sortie propre
                 print("Au revoir 👋 — sauvegarde en cours...")
                 try:
-                    sauvegarder_bibliotheque(livres)
+                    sauvegarder_bibliotheque(livres, fichier, compacter=True)
                 except Exception as e:
                     print(f"⚠️ Erreur lors de la sauvegarde : {e}")
                 print("Fermeture terminée.")
                 break  # quitte la boucle principale
 
             else:
-                print("Option invalide — choisissez un nombre entre 0 et 13.")
+                print("Option invalide — choisissez un nombre entre 0 et 15.")
 
         except Exception as e:
             # Attrape les erreurs inattendues sans renvoyer immédiatement au menu :
@@ -0,0 +1,247 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Optional, Any, Callable
+
+# ------------------
+# Métriques des opérations (appels, latences, enregistrements examinés)
+# ------------------
+#
+# Désactivées par défaut : une fonction décorée par `mesure` ne paie alors qu'un
+# test de booléen. Une fois activées (activer_metriques), chaque appel compte
+# sa durée (histogramme), ses erreurs, et ce que l'opération déclare avec
+# `compter` : livres examinés, octets lus ou écrits. Une opération plus longue
+# que `seuil_lent` est tracée (logger 'bibliotheque.lent') avec ses arguments.
+
+BORNES_LATENCE = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1.0, 2.5, 5.0, 10.0)
+SEUIL_LENT = 0.5
+INTERVALLE_PROMETHEUS = 15.0
+OPERATIONS_LENTES_GARDEES = 100
+
+_actif = False
+_seuil_lent: Optional[float] = SEUIL_LENT
+_verrou = threading.Lock()
+_local = threading.local()
+_compteurs: Dict[str, '_Compteurs'] = {}
+_lentes: deque = deque(maxlen=OPERATIONS_LENTES_GARDEES)
+_exportation: Optional['_ExportPrometheus'] = None
+
+class _Compteurs:
+    __slots__ = ('appels', 'erreurs', 'duree_totale', 'duree_max', 'histogramme', 'enregistrements', 'octets')
+
+    def __init__(self) -> None:
+        self.appels = self.erreurs = self.enregistrements = self.octets = 0
+        self.duree_totale = self.duree_max = 0.0
+        self.histogramme = [0] * (len(BORNES_LATENCE) + 1)  # dernière case : au-delà de la dernière borne
+
+class _Appel:
+    """Compteurs de l'appel en cours d'un thread (voir compter)."""
+    __slots__ = ('enregistrements', 'octets')
+
+    def __init__(self) -> None:
+        self.enregistrements = self.octets = 0
+
+def mesure(fonction: Callable) -> Callable:
+    """Décore une opération pour la mesurer sous son nom quand les métriques sont actives."""
+    nom = fonction.__name__
+
+    @functools.wraps(fonction)
+    def mesuree(*args, **kwargs):
+        if not _actif:
+            return fonction(*args, **kwargs)
+        return _mesurer(nom, fonction, args, kwargs)
+    return mesuree
+
+def compter(enregistrements: int = 0, octets: int = 0) -> None:
+    """Attribue à l'opération mesurée en cours (la plus interne) des livres examinés et des octets lus ou écrits."""
+    if not _actif:
+        return
+    pile = getattr(_local, 'pile', None)
+    if pile:
+        appel = pile[-1]
+        appel.enregistrements += enregistrements
+        appel.octets += octets
+
+def _mesurer(nom: str, fonction: Callable, args: tuple, kwargs: dict) -> Any:
+    pile = getattr(_local, 'pile', None)
+    if pile is None:
+        pile = _local.pile = []
+    appel = _Appel()
+    pile.append(appel)
+    erreur = False
+    debut = time.perf_counter()
+    try:
+        return fonction(*args, **kwargs)
+    except BaseException:
+        erreur = True
+        raise
+    finally:
+        duree = time.perf_counter() - debut
+        pile.pop()
+        with _verrou:
+            c = _compteurs.get(nom)
+            if c is None:
+                c = _compteurs[nom] = _Compteurs()
+            c.appels += 1
+            c.erreurs += erreur
+            c.duree_totale += duree
+            c.duree_max = max(c.duree_max, duree)
+            c.histogramme[bisect.bisect_left(BORNES_LATENCE, duree)] += 1
+            c.enregistrements += appel.enregistrements
+            c.octets += appel.octets
+        if _seuil_lent is not None and duree >= _seuil_lent:
+            _signaler_lente(nom, args, kwargs, duree, appel)
+
+def _signaler_lente(nom: str, args: tuple, kwargs: dict, duree: float, appel: _Appel) -> None:
+    arguments = ', '.join([_resume(a) for a in args] + [f'{k}={_resume(v)}' for k, v in kwargs.items()])
+    _lentes.append({'operation': nom, 'arguments': arguments, 'duree': duree,
+                    'enregistrements': appel.enregistrements, 'octets': appel.octets, 'date': time.time()})
+    _traces().warning("Opération lente : %s(%s) en %.3f s (%d livres examinés, %d octets)",
+                    nom, arguments, duree, appel.enregistrements, appel.octets)
+
+def _traces() -> Any:
+    # logging n'est importé qu'à la première trace (coût évité au démarrage)
+    import logging
+    return logging.getLogger('bibliotheque.lent')
+
+def _resume(valeur: Any) -> str:
+    """Argument lisible dans une trace : un catalogue est résumé par son type et sa taille."""
+    if not isinstance(valeur, (str, bytes)) and hasattr(valeur, '__len__'):
+        try:
+            return f'<{type(valeur).__name__} de {len(valeur)} éléments>'
+        except Exception:
+            pass
+    texte = repr(valeur)
+    return texte if len(texte) <= 80 else texte[:77] + '...'
+
+# ------------------
+# Activation et consultation
+# ------------------
+
+def activer_metriques(seuil_lent: Optional[float] = SEUIL_LENT, fichier_prometheus: Optional[str] = None,
+                      intervalle: float = INTERVALLE_PROMETHEUS) -> None:
+    """Active les mesures ; `seuil_lent` en secondes (None : pas de trace des opérations lentes).
+
+    Avec `fichier_prometheus`, les métriques y sont écrites au format texte de
+    Prometheus toutes les `intervalle` secondes, et à la désactivation.
+    """
+    global _actif, _seuil_lent, _exportation
+    _seuil_lent = seuil_lent
+    if _exportation is not None:
+        _exportation.arreter()
+        _exportation = None
+    if fichier_prometheus is not None:
+        _exportation = _ExportPrometheus(fichier_prometheus, intervalle)
+    _actif = True
+
+def desactiver_metriques() -> None:
+    """Arrête les mesures ; les valeurs déjà comptées restent consultables."""
+    global _actif, _exportation
+    _actif = False
+    if _exportation is not None:
+        _exportation.arreter()
+        _exportation = None
+
+def metriques_actives() -> bool:
+    return _actif
+
+def reinitialiser_metriques() -> None:
+    with _verrou:
+        _compteurs.clear()
+        _lentes.clear()
+
+def metriques() -> Dict[str, Dict[str, Any]]:
+    """Copie des métriques par opération.
+
+    'histogramme' associe à chaque borne de BORNES_LATENCE (puis '+Inf') le
+    nombre d'appels de durée inférieure ou égale à cette borne et supérieure à
+    la précédente.
+    """
+    with _verrou:
+        return {nom: {
+            'appels': c.appels,
+            'erreurs': c.erreurs,
+            'duree_totale': c.duree_totale,
+            'duree_moyenne': c.duree_totale / c.appels if c.appels else 0.0,
+            'duree_max': c.duree_max,
+            'histogramme': dict(zip([str(b) for b in BORNES_LATENCE] + ['+Inf'], c.histogramme)),
+            'enregistrements': c.enregistrements,
+            'octets': c.octets,
+        } for nom, c in sorted(_compteurs.items())}
+
+def operations_lentes() -> List[Dict[str, Any]]:
+    """Dernières opérations lentes (au plus OPERATIONS_LENTES_GARDEES), de la plus ancienne à la plus récente."""
+    with _verrou:
+        return list(_lentes)
+
+# ------------------
+# Format texte Prometheus
+# ------------------
+
+def texte_prometheus() -> str:
+    """Métriques au format d'exposition texte de Prometheus."""
+    valeurs = metriques()
+    lignes = []
+
+    def famille(nom: str, type_metrique: str, aide: str, champ: str) -> None:
+        lignes.append(f'# HELP {nom} {aide}')
+        lignes.append(f'# TYPE {nom} {type_metrique}')
+        for operation, m in valeurs.items():
+            lignes.append(f'{nom}{{operation="{_etiquette(operation)}"}} {m[champ]}')
+
+    famille('bibliotheque_operations_total', 'counter', "Nombre d'appels par opération.", 'appels')
+    famille('bibliotheque_erreurs_total', 'counter', "Nombre d'appels terminés par une exception.", 'erreurs')
+    lignes.append('# HELP bibliotheque_duree_secondes Durée des opérations.')
+    lignes.append('# TYPE bibliotheque_duree_secondes histogram')
+    for operation, m in valeurs.items():
+        etiquette = _etiquette(operation)
+        cumul = 0
+        for borne, n in m['histogramme'].items():
+            cumul += n
+            lignes.append(f'bibliotheque_duree_secondes_bucket{{operation="{etiquette}",le="{borne}"}} {cumul}')
+        lignes.append(f'bibliotheque_duree_secondes_sum{{operation="{etiquette}"}} {m["duree_totale"]}')
+        lignes.append(f'bibliotheque_duree_secondes_count{{operation="{etiquette}"}} {m["appels"]}')
+    famille('bibliotheque_livres_examines_total', 'counter', "Livres examinés par les opérations.",
+            'enregistrements')
+    famille('bibliotheque_octets_total', 'counter', "Octets lus (chargement) ou écrits (sauvegarde, export).",
+            'octets')
+    return '\n'.join(lignes) + '\n'
+
+def _etiquette(valeur: str) -> str:
+    return valeur.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def ecrire_prometheus(chemin: str) -> None:
+    """Écrit les métriques dans `chemin` (remplacé par renommage : un collecteur ne lit jamais un fichier partiel)."""
+    temporaire = f'{chemin}.{os.getpid()}.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        f.write(texte_prometheus())
+    os.replace(temporaire, chemin)
+
+class _ExportPrometheus:
+    """Thread qui écrit périodiquement les métriques dans un fichier."""
+
+    def __init__(self, chemin: str, intervalle: float) -> None:
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, name='metriques-prometheus', daemon=True)
+        self._thread.start()
+
+    def _boucle(self) -> None:
+        while not self._arret.wait(self.intervalle):
+            self._ecrire()
+
+    def _ecrire(self) -> None:
+        try:
+            ecrire_prometheus(self.chemin)
+        except OSError as e:
+            _traces().warning("Écriture des métriques dans '%s' impossible : %s", self.chemin, e)
+
+    def arreter(self) -> None:
+        self._arret.set()
+        self._thread.join()
+        self._ecrire()
@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+from bibliotheque import (
+    rechercher_livre,
+    recherche_combinee,
+    emprunter_livre,
+    retourner_livre,
+    ajouter_note,
+    calculer_rapport,
+    trouver_par_id_interne,
+    charger_bibliotheque,
+    sauvegarder_bibliotheque,
+    FICHIER_DATA
+)
+from livre import vers_json
+from cache_requetes import CacheRequetes, MAX_ENTREES, MAX_LIVRES
+from metriques import activer_metriques, desactiver_metriques, metriques, operations_lentes, SEUIL_LENT
+
+# ------------------
+# Serveur HTTP/JSON (asyncio, bibliothèque standard)
+# ------------------
+#
+#   GET  /livres?critere=titre&valeur=...        rechercher_livre
+#   GET  /recherche?titre=&auteur=&genre=&disponible=o|n
+#                                                recherche_combinee
+#   GET  /livres/<id>                            un livre
+#   POST /livres/<id>/emprunt                    emprunter_livre
+#   POST /livres/<id>/retour                     retourner_livre
+#   POST /livres/<id>/note   {"note": 4}         ajouter_note
+#   GET  /rapport                                statistiques (calculer_rapport)
+#   GET  /etat                                   compteurs du serveur et du cache des requêtes
+#   GET  /metriques                              métriques des opérations (voir metriques.py)
+#
+# Les listes sont limitées à `limite` livres (paramètre, 100 par défaut) ;
+# `total` donne le nombre de résultats. Recherches et rapport s'exécutent dans
+# un pool de threads (verrous de bibliotheque.py) pour que la boucle
+# d'événements reste disponible ; mutations et sauvegardes ont leur propre
+# thread, pour ne pas attendre derrière les recherches en file.
+#
+# Validation groupée : une mutation est appliquée en mémoire et journalisée
+# sans fsync ; la réponse n'est envoyée qu'après la prochaine sauvegarde, qui
+# regroupe toutes les mutations arrivées pendant `delai_groupe` secondes (un
+# seul fsync du journal pour tout le groupe ; les emprunts et retours y sont
+# consignés avec l'état des livres). Si cette sauvegarde échoue, la mutation
+# reste appliquée en mémoire et sera écrite par la prochaine sauvegarde réussie :
+# la réponse est alors 503 (appliquée, mais pas encore durable), pas 500.
+
+DELAI_GROUPE = 0.005
+LIMITE_RESULTATS = 100
+LIMITE_MAX_RESULTATS = 10000
+TAILLE_MAX_CORPS = 1 << 20
+
+_RAISONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+_ACTIONS = {'emprunt': emprunter_livre, 'retour': retourner_livre}
+
+class ErreurHTTP(ValueError):
+    """Erreur renvoyée au client avec un statut HTTP."""
+
+    def __init__(self, statut: int, message: str) -> None:
+        super().__init__(message)
+        self.statut = statut
+
+class ValidationGroupee:
+    """Regroupe les sauvegardes : toutes les mutations en attente sont validées
+    par une seule sauvegarde, au plus une à la fois."""
+
+    def __init__(self, sauvegarder: Callable[[], None], executer: Callable, delai: float = DELAI_GROUPE) -> None:
+        self._sauvegarder = sauvegarder
+        self._executer = executer
+        self.delai = delai
+        self._en_attente: List[asyncio.Future] = []
+        self._tache: Optional[asyncio.Task] = None
+        self.mutations = 0
+        self.sauvegardes = 0
+
+    async def attendre(self) -> None:
+        """Attend que la mutation qui vient d'être appliquée soit sur disque."""
+        attente = asyncio.get_running_loop().create_future()
+        self._en_attente.append(attente)
+        self.mutations += 1
+        if self._tache is None:
+            self._tache = asyncio.ensure_future(self._valider())
+        await attente
+
+    async def _valider(self) -> None:
+        try:
+            while self._en_attente:
+                await asyncio.sleep(self.delai)
+                groupe, self._en_attente = self._en_attente, []
+                try:
+                    await self._executer(self._sauvegarder)
+                except Exception as e:
+                    for attente in groupe:
+                        attente.set_exception(e)
+                else:
+                    self.sauvegardes += 1
+                    for attente in groupe:
+                        attente.set_result(None)
+        finally:
+            self._tache = None
+
+    async def vider(self) -> None:
+        """Attend la fin des validations en cours."""
+        while self._tache is not None:
+            await asyncio.shield(self._tache)
+
+class ServeurBibliotheque:
+    """Expose une bibliothèque chargée en mémoire par HTTP/JSON (voir l'en-tête du module)."""
+
+    def __init__(self, livres: List[Dict[str, Any]], fichier: str, delai_groupe: float = DELAI_GROUPE,
+                 threads: int = 4) -> None:
+        self.livres = livres
+        self.fichier = fichier
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bibliotheque')
+        self._pool_ecritures = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bibliotheque-ecritures')
+        self.validation = ValidationGroupee(lambda: sauvegarder_bibliotheque(livres, fichier),
+                                            self._ecrire, delai_groupe)
+        self.requetes = 0
+
+    async def _hors_boucle(self, fonction: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fonction, *args)
+
+    async def _ecrire(self, fonction: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._pool_ecritures, fonction, *args)
+
+    async def demarrer(self, hote: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._connexion, hote, port)
+
+    async def fermer(self) -> None:
+        await self.validation.vider()
+        await self._ecrire(lambda: sauvegarder_bibliotheque(self.livres, self.fichier, compacter=True))
+        self._pool.shutdown()
+        self._pool_ecritures.shutdown()
+
+    # --- Protocole HTTP/1.1 (connexions persistantes) ---
+
+    async def _connexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne:
+                    break
+                entetes = {}
+                while True:
+                    entete = await reader.readline()
+                    if entete in (b'\r\n', b'\n', b''):
+                        break
+                    nom, _, valeur = entete.decode('latin-1').partition(':')
+                    entetes[nom.strip().lower()] = valeur.strip()
+                try:
+                    methode, cible, version = ligne.decode('latin-1').split()
+                    longueur = int(entetes.get('content-length') or 0)
+                except ValueError:
+                    await self._repondre(writer, 400, {'erreur': 'Requête HTTP invalide.'}, False)
+                    break
+                if longueur > TAILLE_MAX_CORPS:
+                    await self._repondre(writer, 413, {'erreur': 'Corps de requête trop volumineux.'}, False)
+                    break
+                corps = await reader.readexactly(longueur) if longueur else b''
+                garder = version == 'HTTP/1.1' and entetes.get('connection', '').lower() != 'close'
+                statut, reponse = await self._traiter(methode, cible, corps)
+                await self._repondre(writer, statut, reponse, garder)
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _repondre(self, writer: asyncio.StreamWriter, statut: int, reponse: Any, garder: bool) -> None:
+        donnees = reponse if isinstance(reponse, bytes) else _encoder(reponse)
+        entete = (f'HTTP/1.1 {statut} {_RAISONS[statut]}\r\n'
+                  f'Content-Type: application/json; charset=utf-8\r\n'
+                  f'Content-Length: {len(donnees)}\r\n')
+        if not garder:
+            entete += 'Connection: close\r\n'
+        writer.write((entete + '\r\n').encode('latin-1') + donnees)
+        await writer.drain()
+
+    async def _traiter(self, methode: str, cible: str, corps: bytes) -> Tuple[int, Any]:
+        self.requetes += 1
+        url = urlsplit(cible)
+        parametres = dict(parse_qsl(url.query))
+        segments = [s for s in url.path.split('/') if s]
+        try:
+            return 200, await self._router(methode, segments, parametres, corps)
+        except ErreurHTTP as e:
+            return e.statut, {'erreur': str(e)}
+        except ValueError as e:
+            return 400, {'erreur': str(e)}
+        except Exception as e:
+            return 500, {'erreur': f'Erreur inattendue : {e}'}
+
+    # --- Routes ---
+
+    async def _router(self, methode: str, segments: List[str], parametres: Dict[str, str], corps: bytes) -> Any:
+        if segments == ['livres'] and methode == 'GET':
+            critere, valeur = parametres.get('critere', 'titre'), parametres.get('valeur', '')
+            return await self._liste(lambda: rechercher_livre(self.livres, critere, valeur), parametres)
+        if segments == ['recherche'] and methode == 'GET':
+            disponible = {'o': True, 'oui': True, 'true': True, 'n': False, 'non': False, 'false': False}
+            if parametres.get('disponible', 'o').lower() not in disponible:
+                raise ValueError("Paramètre 'disponible' invalide : 'o' ou 'n'.")
+            return await self._liste(lambda: recherche_combinee(
+                self.livres, parametres.get('titre'), parametres.get('auteur'), parametres.get('genre'),
+                disponible.get(parametres['disponible'].lower()) if 'disponible' in parametres else None),
+                parametres)
+        if segments == ['rapport'] and methode == 'GET':
+            return await self._hors_boucle(lambda: _encoder(calculer_rapport(self.livres)))
+        if segments == ['metriques'] and methode == 'GET':
+            return {'operations': metriques(), 'lentes': operations_lentes()}
+        if segments == ['etat'] and methode == 'GET':
+            cache = getattr(self.livres, 'cache', None)
+            return {'livres': len(self.livres), 'prochain_id': getattr(self.livres, 'prochain_id', None),
+                    'requetes': self.requetes, 'mutations': self.validation.mutations,
+                    'sauvegardes': self.validation.sauvegardes,
+                    'cache': None if cache is None else cache.statistiques()}
+        if len(segments) in (2, 3) and segments[0] == 'livres':
+            id_livre = _entier(segments[1], "ID de livre invalide.")
+            if len(segments) == 2 and methode == 'GET':
+                livre = await self._hors_boucle(trouver_par_id_interne, self.livres, id_livre)
+                if livre is None:
+                    raise ErreurHTTP(404, f"Aucun livre trouvé avec l'ID {id_livre}.")
+                return livre
+            if len(segments) == 3 and segments[2] in ('emprunt', 'retour', 'note'):
+                if methode != 'POST':
+                    raise ErreurHTTP(405, 'Méthode non autorisée : utiliser POST.')
+                return await self._muter(id_livre, segments[2], corps)
+        raise ErreurHTTP(404, 'Route inconnue.')
+
+    async def _liste(self, recherche: Callable[[], List[Dict[str, Any]]], parametres: Dict[str, str]) -> bytes:
+        limite = min(_entier(parametres.get('limite', LIMITE_RESULTATS), "Limite invalide."), LIMITE_MAX_RESULTATS)
+
+        def executer() -> bytes:
+            resultats = recherche()
+            return _encoder({'total': len(resultats), 'livres': resultats[:max(limite, 0)]})
+        return await self._hors_boucle(executer)
+
+    async def _muter(self, id_livre: int, action: str, corps: bytes) -> Dict[str, Any]:
+        if await self._hors_boucle(trouver_par_id_interne, self.livres, id_livre) is None:
+            raise ErreurHTTP(404, f"Aucun livre trouvé avec l'ID {id_livre}.")
+        if action == 'note':
+            try:
+                note = json.loads(corps or b'{}').get('note')
+            except (json.JSONDecodeError, AttributeError):
+                raise ValueError('Corps JSON attendu : {"note": 1..5}.')
+            await self._ecrire(ajouter_note, self.livres, id_livre, _entier(note, "Note invalide."))
+        else:
+            await self._ecrire(_ACTIONS[action], self.livres, id_livre)
+        try:
+            await self.validation.attendre()
+        except Exception as e:
+            raise ErreurHTTP(503, f"Modification appliquée mais pas encore enregistrée sur disque : {e}") from e
+        return {'id': id_livre, 'action': action, 'ok': True}
+
+def _encoder(objet: Any) -> bytes:
+    return json.dumps(objet, ensure_ascii=False, default=vers_json).encode('utf-8')
+
+def _entier(valeur: Any, message: str) -> int:
+    if isinstance(valeur, bool):
+        raise ValueError(message)
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+
+async def servir(fichier: str = FICHIER_DATA, hote: str = '127.0.0.1', port: int = 8080,
+                 delai_groupe: float = DELAI_GROUPE, threads: int = 4, cache_entrees: int = MAX_ENTREES,
+                 cache_livres: int = MAX_LIVRES) -> None:
+    """Charge la bibliothèque et sert les requêtes jusqu'à SIGINT / SIGTERM, puis sauvegarde.
+
+    `cache_entrees` et `cache_livres` bornent le cache des requêtes (0 : pas de cache).
+    """
+    # fsync='jamais' : le journal n'est synchronisé qu'à la validation de chaque groupe
+    livres = charger_bibliotheque(fichier, journaliser=True, fsync='jamais', mode='paresseux')
+    if hasattr(livres, 'cache'):
+        livres.cache = CacheRequetes(cache_entrees, cache_livres) if cache_entrees and cache_livres else None
+    serveur = ServeurBibliotheque(livres, fichier, delai_groupe, threads)
+    ecoute = await serveur.demarrer(hote, port)
+    print(f"📡 Bibliothèque '{fichier}' ({len(livres)} livres) servie sur http://{hote}:{port}")
+    arret = asyncio.Event()
+    for signal_arret in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal_arret, arret.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows : Ctrl+C interrompt asyncio.run, la sauvegarde finale a lieu dans le finally
+            pass
+    try:
+        async with ecoute:
+            await arret.wait()
+    finally:
+        await serveur.fermer()
+
+if __name__ == '__main__':
+    parseur = argparse.ArgumentParser(description="Serveur HTTP/JSON de la bibliothèque.")
+    parseur.add_argument('--fichier', default=os.environ.get('BIBLIOTHEQUE_FICHIER', FICHIER_DATA))
+    parseur.add_argument('--hote', default='127.0.0.1')
+    parseur.add_argument('--port', type=int, default=8080)
+    parseur.add_argument('--delai-groupe', type=float, default=DELAI_GROUPE * 1000,
+                         help="fenêtre de validation groupée, en millisecondes")
+    parseur.add_argument('--threads', type=int, default=4)
+    parseur.add_argument('--cache-entrees', type=int, default=MAX_ENTREES,
+                         help="requêtes gardées par le cache des résultats (0 : pas de cache)")
+    parseur.add_argument('--cache-livres', type=int, default=MAX_LIVRES,
+                         help="livres référencés au plus par les résultats gardés")
+    parseur.add_argument('--metriques', nargs='?', const='', default=None, metavar='FICHIER_PROMETHEUS',
+                         help="activer les métriques (GET /metriques), écrites aussi dans le fichier s'il est donné")
+    parseur.add_argument('--seuil-lent', type=float, default=SEUIL_LENT * 1000,
+                         help="tracer les opérations plus longues, en millisecondes")
+    args = parseur.parse_args()
+    if args.metriques is not None:
+        activer_metriques(args.seuil_lent / 1000, args.metriques or None)
+    try:
+        asyncio.run(servir(args.fichier, args.hote, args.port, args.delai_groupe / 1000, args.threads,
+                           args.cache_entrees, args.cache_livres))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Dernière écriture du fichier Prometheus
+        desactiver_metriques()
+    print("Serveur arrêté.")
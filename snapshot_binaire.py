@@ -0,0 +1,287 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Callable, BinaryIO
+
+from livre import Livre, CHAMPS
+
+# ------------------
+# Snapshot binaire (colonnes fixes + table de chaînes, lu par mmap)
+# ------------------
+#
+# Disposition du fichier (petit-boutiste) :
+#   en-tête       : magie, nombre de livres, prochain_id, sequence, positions des
+#                   sections, enregistrements du registre des emprunts couverts (-1 : aucun)
+#   historiques   : un objet JSON {"historique": [...]} par livre qui en a un
+#   chaînes       : positions (n_chaines + 1 entiers 64 bits) puis textes UTF-8
+#   colonnes      : id, annee_publication, prix, drapeaux (disponible, prix entier),
+#                   note, titre, auteur, genre, autres champs, position et longueur
+#                   de l'historique
+#   ordre         : numéros de ligne triés par id (recherche dichotomique)
+
+EXTENSIONS_BINAIRES = ('.bin',)
+MAGIE = b'BIBLBIN3'
+_ENTETE = struct.Struct('<8sQqqQQQQq')
+# Version 2, même en-tête, sans le drapeau de prix entier : toujours lue (prix en float)
+MAGIE_V2 = b'BIBLBIN2'
+# Version 1, sans le nombre d'enregistrements du registre des emprunts : toujours lue
+MAGIE_V1 = b'BIBLBIN1'
+_ENTETE_V1 = struct.Struct('<8sQqqQQQQ')
+_SANS_CHAINE = 0xFFFFFFFF
+_SANS_ANNEE = -2 ** 31
+# Bits de la colonne 'disponible'
+_DISPONIBLE = 0x01
+_PRIX_ENTIER = 0x02
+
+# (nom, code array) dans l'ordre d'écriture
+_COLONNES = (
+    ('id', 'q'), ('annee', 'i'), ('prix', 'd'), ('disponible', 'B'), ('note', 'b'),
+    ('titre', 'I'), ('auteur', 'I'), ('genre', 'I'), ('autres', 'I'),
+    ('hist_pos', 'Q'), ('hist_len', 'I'),
+)
+
+def est_chemin_binaire(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in EXTENSIONS_BINAIRES
+
+def _aligner(f: BinaryIO, position: int) -> int:
+    reste = -position % 8
+    if reste:
+        f.write(b'\0' * reste)
+    return position + reste
+
+def ecrire_snapshot_binaire(f: BinaryIO, livres: Iterable[Dict[str, Any]], prochain_id: int, sequence: int,
+                            historique: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+                            emprunts_enregistres: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+    """Écrit les livres au format binaire dans `f` (ouvert en binaire, positionné au début).
+
+    `historique(livre)` fournit l'historique de chaque livre. Retourne, pour
+    chaque livre ayant un historique, sa (position, longueur) dans le fichier.
+    `emprunts_enregistres` : taille du registre des emprunts qui accompagne le snapshot.
+    """
+    colonnes = {nom: array(code) for nom, code in _COLONNES}
+    chaines: Dict[str, int] = {}
+    emplacements = {}
+
+    def chaine(texte: Optional[str]) -> int:
+        if texte is None:
+            return _SANS_CHAINE
+        indice = chaines.get(texte)
+        if indice is None:
+            indice = chaines[texte] = len(chaines)
+        return indice
+
+    position = f.write(b'\0' * _ENTETE.size)
+    for livre in livres:
+        id_livre = livre['id']
+        annee = livre.get('annee_publication')
+        autres = {k: livre[k] for k in livre if k not in CHAMPS}
+        colonnes['id'].append(id_livre)
+        colonnes['annee'].append(_SANS_ANNEE if annee is None else annee)
+        prix = livre.get('prix', 0.0)
+        colonnes['prix'].append(float(prix))
+        # Un prix entier est relu en int (la colonne est en double)
+        entier = isinstance(prix, int) and not isinstance(prix, bool) and float(prix) == prix
+        colonnes['disponible'].append((_DISPONIBLE if livre.get('disponible', False) else 0)
+                                      | (_PRIX_ENTIER if entier else 0))
+        colonnes['note'].append(int(livre.get('note', 0) or 0))
+        colonnes['titre'].append(chaine(livre.get('titre', '')))
+        colonnes['auteur'].append(chaine(livre.get('auteur', '')))
+        colonnes['genre'].append(chaine(livre.get('genre', '')))
+        colonnes['autres'].append(chaine(json.dumps(autres, ensure_ascii=False)) if autres else _SANS_CHAINE)
+        hist = historique(livre)
+        if hist:
+            donnees = json.dumps({'historique': hist}, ensure_ascii=False).encode('utf-8')
+            emplacements[id_livre] = (position, len(donnees))
+            colonnes['hist_pos'].append(position)
+            colonnes['hist_len'].append(len(donnees))
+            position += f.write(donnees)
+        else:
+            colonnes['hist_pos'].append(0)
+            colonnes['hist_len'].append(0)
+
+    # Table de chaînes
+    position = _aligner(f, position)
+    debut_chaines = position
+    textes = [t.encode('utf-8') for t in chaines]
+    offsets = array('Q', [0])
+    for t in textes:
+        offsets.append(offsets[-1] + len(t))
+    base = position + len(offsets) * 8
+    offsets = array('Q', (base + o for o in offsets))
+    position += _ecrire_tableau(f, offsets)
+    for t in textes:
+        position += f.write(t)
+
+    # Colonnes puis ordre par id
+    position = _aligner(f, position)
+    debut_colonnes = position
+    for nom, _ in _COLONNES:
+        position += _ecrire_tableau(f, colonnes[nom])
+        position = _aligner(f, position)
+    debut_ordre = position
+    ids = colonnes['id']
+    _ecrire_tableau(f, array('I', sorted(range(len(ids)), key=ids.__getitem__)))
+
+    f.seek(0)
+    f.write(_ENTETE.pack(MAGIE, len(ids), prochain_id, sequence, debut_chaines, len(chaines),
+                         debut_colonnes, debut_ordre, -1 if emprunts_enregistres is None else emprunts_enregistres))
+    f.seek(0, os.SEEK_END)
+    return emplacements
+
+def _ecrire_tableau(f: BinaryIO, tableau: array) -> int:
+    if sys.byteorder != 'little':
+        tableau = array(tableau.typecode, tableau)
+        tableau.byteswap()
+    return f.write(tableau.tobytes())
+
+class SnapshotBinaire:
+    """Vue en lecture seule d'un snapshot binaire, projeté en mémoire par mmap.
+
+    L'ouverture ne lit que l'en-tête ; les colonnes sont des memoryview sur le
+    fichier, et `get(id)` fait une recherche dichotomique sans rien désérialiser
+    d'autre que le livre trouvé.
+    """
+
+    def __init__(self, chemin: str) -> None:
+        self.chemin = chemin
+        self.emprunts = None
+        self._f = open(chemin, 'rb')
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Fichier vide : mmap refuse une longueur nulle
+            self._f.close()
+            raise ValueError('Snapshot binaire invalide : fichier vide.')
+        magie = self._mm[:len(MAGIE)]
+        if magie not in (MAGIE, MAGIE_V2, MAGIE_V1):
+            self.fermer()
+            raise ValueError('Snapshot binaire invalide : en-tête inconnu.')
+        if magie != MAGIE_V1:
+            (_, self._n, self.prochain_id, self.sequence, debut_chaines, n_chaines, debut_colonnes, debut_ordre,
+             emprunts_enregistres) = _ENTETE.unpack_from(self._mm, 0)
+        else:
+            (_, self._n, self.prochain_id, self.sequence, debut_chaines, n_chaines, debut_colonnes,
+             debut_ordre), emprunts_enregistres = _ENTETE_V1.unpack_from(self._mm, 0), -1
+        self.emprunts_enregistres = None if emprunts_enregistres < 0 else emprunts_enregistres
+        self._vue = vue = memoryview(self._mm)
+        self._offsets = self._tableau(vue, debut_chaines, 'Q', n_chaines + 1)
+        self._colonnes = {}
+        position = debut_colonnes
+        for nom, code in _COLONNES:
+            self._colonnes[nom] = self._tableau(vue, position, code, self._n)
+            position += array(code).itemsize * self._n
+            position += -position % 8
+        self._ordre = self._tableau(vue, debut_ordre, 'I', self._n)
+        self._cache_chaines: Dict[int, str] = {}
+
+    @staticmethod
+    def _tableau(vue: memoryview, position: int, code: str, n: int):
+        taille = array(code).itemsize * n
+        if sys.byteorder == 'little':
+            return vue[position:position + taille].cast(code)
+        copie = array(code, vue[position:position + taille].tobytes())
+        copie.byteswap()
+        return copie
+
+    def fermer(self) -> None:
+        # Les memoryview doivent être libérées avant de fermer le mmap
+        vues = [getattr(self, '_offsets', None), getattr(self, '_ordre', None)]
+        vues += list(getattr(self, '_colonnes', {}).values()) + [getattr(self, '_vue', None)]
+        for vue in vues:
+            if isinstance(vue, memoryview):
+                vue.release()
+        self._colonnes = {}
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> 'SnapshotBinaire':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fermer()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __bool__(self) -> bool:
+        return self._n > 0
+
+    def __iter__(self) -> Iterator[Livre]:
+        return (self.livre(ligne) for ligne in range(self._n))
+
+    def _chaine(self, indice: int, cache: bool = False) -> Optional[str]:
+        if indice == _SANS_CHAINE:
+            return None
+        texte = self._cache_chaines.get(indice)
+        if texte is None:
+            texte = self._mm[self._offsets[indice]:self._offsets[indice + 1]].decode('utf-8')
+            if cache:
+                self._cache_chaines[indice] = texte
+        return texte
+
+    def ligne(self, id_livre: int) -> Optional[int]:
+        """Numéro de ligne d'un id (recherche dichotomique), ou None."""
+        ids, ordre = self._colonnes['id'], self._ordre
+        bas, haut = 0, self._n
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            if ids[ordre[milieu]] < id_livre:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        if bas < self._n and ids[ordre[bas]] == id_livre:
+            return ordre[bas]
+        return None
+
+    def livre(self, ligne: int, avec_historique: bool = True) -> Livre:
+        c = self._colonnes
+        annee = c['annee'][ligne]
+        drapeaux = c['disponible'][ligne]
+        prix = c['prix'][ligne]
+        livre = Livre(
+            id=c['id'][ligne],
+            titre=self._chaine(c['titre'][ligne]),
+            auteur=self._chaine(c['auteur'][ligne], cache=True),
+            genre=self._chaine(c['genre'][ligne], cache=True),
+            annee_publication=None if annee == _SANS_ANNEE else annee,
+            prix=int(prix) if drapeaux & _PRIX_ENTIER else prix,
+            disponible=bool(drapeaux & _DISPONIBLE),
+            note=c['note'][ligne]
+        )
+        autres = self._chaine(c['autres'][ligne])
+        if autres is not None:
+            livre.update(json.loads(autres))
+        if avec_historique and c['hist_len'][ligne]:
+            livre['historique'] = self._historique_ligne(ligne)
+        return livre
+
+    def emplacement_historique(self, ligne: int) -> Optional[Tuple[int, int]]:
+        longueur = self._colonnes['hist_len'][ligne]
+        return (self._colonnes['hist_pos'][ligne], longueur) if longueur else None
+
+    def _historique_ligne(self, ligne: int) -> List[Dict[str, Any]]:
+        emplacement = self.emplacement_historique(ligne)
+        if emplacement is None:
+            return []
+        position, longueur = emplacement
+        return json.loads(self._mm[position:position + longueur].decode('utf-8'))['historique']
+
+    # --- Interface commune avec Catalogue (lecture seule) ---
+
+    def get(self, id_livre: int) -> Optional[Livre]:
+        ligne = self.ligne(id_livre)
+        return None if ligne is None else self.livre(ligne)
+
+    def historique(self, id_livre: int) -> List[Dict[str, Any]]:
+        ligne = self.ligne(id_livre)
+        if ligne is None:
+            raise ValueError(f"Aucun livre trouvé avec l'ID {id_livre}.")
+        return self._historique_ligne(ligne)
+
+    def _lecture_seule(self, *args, **kwargs):
+        raise ValueError("Snapshot binaire en lecture seule : le charger avec mode='complet' pour le modifier.")
+
+    append = extend = supprimer = modifier = _lecture_seule
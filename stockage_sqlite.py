@@ -0,0 +1,339 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Callable
+
+from emprunts import FORMAT_DATE, DUREE_EMPRUNT
+
+from index import normaliser
+from livre import Livre
+from verrous import VerrouLectureEcriture, VerrousParCle
+
+# ------------------
+# Stockage SQLite (tables livres + historique)
+# ------------------
+
+EXTENSIONS_SQLITE = ('.db', '.sqlite', '.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS livres (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titre TEXT NOT NULL,
+    auteur TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    annee_publication INTEGER,
+    prix REAL NOT NULL,
+    disponible INTEGER NOT NULL DEFAULT 1,
+    note INTEGER NOT NULL DEFAULT 0,
+    titre_norm TEXT NOT NULL,
+    auteur_norm TEXT NOT NULL,
+    genre_norm TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS historique (
+    id_livre INTEGER NOT NULL REFERENCES livres(id) ON DELETE CASCADE,
+    action TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_livres_genre ON livres(genre_norm);
+CREATE INDEX IF NOT EXISTS idx_livres_auteur ON livres(auteur_norm);
+CREATE INDEX IF NOT EXISTS idx_livres_prix ON livres(prix);
+CREATE INDEX IF NOT EXISTS idx_historique_livre ON historique(id_livre);
+CREATE INDEX IF NOT EXISTS idx_historique_date ON historique(date);
+"""
+
+_COLONNES = 'id, titre, auteur, genre, annee_publication, prix, disponible, note'
+_MODIFIABLES = ('titre', 'auteur', 'genre', 'annee_publication', 'prix', 'disponible', 'note')
+# Expressions de tri par champ (les livres sans année viennent après les autres,
+# avant eux en ordre décroissant, comme pour un Catalogue)
+_TRIS = {
+    'titre': ('titre_norm',),
+    'auteur': ('auteur_norm',),
+    'prix': ('prix',),
+    'annee_publication': ('annee_publication IS NULL', 'annee_publication'),
+}
+
+def est_chemin_sqlite(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in EXTENSIONS_SQLITE
+
+def _ordre(cles: List[Tuple[str, bool]]) -> str:
+    sens = {False: '', True: ' DESC'}
+    return ', '.join(f'{e}{sens[d]}' for champ, d in cles for e in _TRIS[champ]) + ', id'
+
+def _vers_livre(ligne: sqlite3.Row) -> Livre:
+    return Livre(
+        id=ligne['id'],
+        titre=ligne['titre'],
+        auteur=ligne['auteur'],
+        genre=ligne['genre'],
+        annee_publication=ligne['annee_publication'],
+        prix=ligne['prix'],
+        disponible=bool(ligne['disponible']),
+        note=ligne['note']
+    )
+
+class BibliothequeSQLite:
+    """Bibliothèque stockée dans une base SQLite, utilisable par les fonctions de bibliotheque.py.
+
+    Chaque mutation est une transaction courte ; les recherches, tris et
+    statistiques sont exécutés en SQL sur des colonnes normalisées (casse et
+    accents ignorés) et indexées. Les livres retournés ne portent pas leur
+    historique : utiliser `historique(id)`.
+
+    La connexion est partagée entre threads : `verrou` et `verrous_livres`
+    jouent le même rôle que pour un Catalogue.
+    """
+
+    def __init__(self, chemin: str) -> None:
+        self.chemin = os.path.abspath(chemin)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.executescript(_SCHEMA)
+        self.verrou = VerrouLectureEcriture()
+        self.verrous_livres = VerrousParCle()
+
+    def fermer(self) -> None:
+        self._conn.close()
+
+    def valider(self) -> None:
+        self._conn.commit()
+
+    # --- Interface commune avec Catalogue ---
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM livres').fetchone()[0]
+
+    def __bool__(self) -> bool:
+        return self._conn.execute('SELECT 1 FROM livres LIMIT 1').fetchone() is not None
+
+    def __iter__(self) -> Iterator[Livre]:
+        return self._livres(f'SELECT {_COLONNES} FROM livres ORDER BY id')
+
+    @property
+    def prochain_id(self) -> int:
+        """Prochain id (AUTOINCREMENT : un id supprimé n'est jamais réutilisé)."""
+        ligne = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'livres'").fetchone()
+        return (ligne[0] if ligne else 0) + 1
+
+    def get(self, id_livre: int) -> Optional[Livre]:
+        ligne = self._conn.execute(f'SELECT {_COLONNES} FROM livres WHERE id = ?', (id_livre,)).fetchone()
+        return None if ligne is None else _vers_livre(ligne)
+
+    def append(self, livre: Dict[str, Any]) -> None:
+        self.extend([livre])
+
+    def extend(self, livres: Iterable[Dict[str, Any]]) -> None:
+        """Insère des livres (et leur historique éventuel) en une seule transaction."""
+        with self._conn:
+            self._inserer(livres)
+
+    def _inserer(self, livres: Iterable[Dict[str, Any]]) -> None:
+        """Insère des livres dans la transaction en cours (sans la valider)."""
+        for livre in livres:
+            self._conn.execute(
+                'INSERT INTO livres (id, titre, auteur, genre, annee_publication, prix, disponible, note,'
+                ' titre_norm, auteur_norm, genre_norm) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (livre.get('id'), livre.get('titre', ''), livre.get('auteur', ''), livre.get('genre', ''),
+                 livre.get('annee_publication'), float(livre.get('prix', 0.0)),
+                 int(bool(livre.get('disponible', True))), int(livre.get('note', 0) or 0),
+                 normaliser(livre.get('titre', '')), normaliser(livre.get('auteur', '')).strip(),
+                 normaliser(livre.get('genre', '')).strip()))
+            historique = livre.get('historique') or []
+            self._conn.executemany(
+                'INSERT INTO historique (id_livre, action, date) VALUES (?, ?, ?)',
+                ((livre.get('id'), h['action'], h['date']) for h in historique))
+
+    def supprimer(self, id_livre: int) -> bool:
+        with self._conn:
+            return self._conn.execute('DELETE FROM livres WHERE id = ?', (id_livre,)).rowcount > 0
+
+    def modifier(self, id_livre: int, champs: Dict[str, Any]) -> Optional[Livre]:
+        colonnes = [c for c in champs if c in _MODIFIABLES]
+        if colonnes:
+            valeurs = [champs[c] for c in colonnes]
+            for c in ('titre', 'auteur', 'genre'):
+                if c in champs:
+                    colonnes.append(c + '_norm')
+                    valeurs.append(normaliser(champs[c]).strip())
+            affectations = ', '.join(f'{c} = ?' for c in colonnes)
+            with self._conn:
+                self._conn.execute(f'UPDATE livres SET {affectations} WHERE id = ?', (*valeurs, id_livre))
+        return self.get(id_livre)
+
+    def historique(self, id_livre: int) -> List[Dict[str, Any]]:
+        """Historique d'un livre (copie en lecture seule, dans l'ordre chronologique)."""
+        lignes = self._conn.execute(
+            'SELECT action, date FROM historique WHERE id_livre = ? ORDER BY rowid', (id_livre,))
+        return [{'action': a, 'date': d} for a, d in lignes]
+
+    # --- Opérations transactionnelles ---
+
+    def changer_disponibilite(self, id_livre: int, disponible: bool, evenement: Dict[str, str]) -> bool:
+        """Bascule `disponible` et consigne l'événement dans la même transaction.
+
+        La mise à jour est conditionnelle : retourne False si le livre n'existe
+        pas ou était déjà dans l'état demandé.
+        """
+        with self._conn:
+            modifie = self._conn.execute(
+                'UPDATE livres SET disponible = ? WHERE id = ? AND disponible = ?',
+                (int(disponible), id_livre, int(not disponible))).rowcount
+            if not modifie:
+                return False
+            self._conn.execute('INSERT INTO historique (id_livre, action, date) VALUES (?, ?, ?)',
+                               (id_livre, evenement['action'], evenement['date']))
+        return True
+
+    # --- Suivi des emprunts (même interface que emprunts.RegistreEmprunts) ---
+
+    def evenements_livre(self, id_livre: int) -> Iterator[Dict[str, str]]:
+        lignes = self._conn.execute(
+            'SELECT action, date FROM historique WHERE id_livre = ? ORDER BY rowid', (id_livre,))
+        return ({'action': a, 'date': d} for a, d in lignes)
+
+    def evenements(self, debut: Optional[datetime] = None, fin: Optional[datetime] = None,
+                   action: Optional[str] = None) -> Iterator[Tuple[int, str, datetime]]:
+        """(id, action, date) des événements de [debut, fin[, dans l'ordre chronologique (index sur la date)."""
+        conditions, parametres = [], []
+        for operateur, borne in (('>=', debut), ('<', fin)):
+            if borne is not None:
+                conditions.append(f'date {operateur} ?')
+                parametres.append(borne.strftime(FORMAT_DATE))
+        if action is not None:
+            conditions.append('action = ?')
+            parametres.append(action)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        lignes = self._conn.execute(f'SELECT id_livre, action, date FROM historique {where} ORDER BY date, rowid',
+                                    parametres)
+        return ((i, a, datetime.strptime(d, FORMAT_DATE)) for i, a, d in lignes)
+
+    def en_retard(self, maintenant: Optional[datetime] = None,
+                  duree: timedelta = DUREE_EMPRUNT) -> List[Tuple[int, datetime]]:
+        limite = ((maintenant or datetime.now()) - duree).strftime(FORMAT_DATE)
+        lignes = self._conn.execute(
+            "SELECT l.id, MAX(h.date) AS depuis FROM livres l"
+            " JOIN historique h ON h.id_livre = l.id AND h.action = 'emprunt'"
+            " WHERE l.disponible = 0 GROUP BY l.id HAVING depuis < ? ORDER BY depuis, l.id", (limite,))
+        return [(i, datetime.strptime(d, FORMAT_DATE)) for i, d in lignes]
+
+    def plus_empruntes(self, k: int, garder: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, int]]:
+        lignes = self._conn.execute(
+            "SELECT id_livre, COUNT(*) AS n FROM historique WHERE action = 'emprunt'"
+            " GROUP BY id_livre ORDER BY n DESC, id_livre")
+        resultats = []
+        for id_livre, n in lignes:
+            if len(resultats) >= k:
+                break
+            if garder is None or garder(id_livre):
+                resultats.append((id_livre, n))
+        return resultats
+
+    # --- Requêtes exécutées en SQL ---
+
+    def rechercher(self, champ: str, valeur: str) -> List[Livre]:
+        """Livres dont le champ contient `valeur` (casse et accents ignorés)."""
+        return list(self._livres(
+            f'SELECT {_COLONNES} FROM livres WHERE instr({champ}_norm, ?) > 0 ORDER BY id',
+            (normaliser(valeur).strip(),)))
+
+    def recherche_combinee(self, titre: Optional[str] = None, auteur: Optional[str] = None,
+                           genre: Optional[str] = None, disponible: Optional[bool] = None) -> List[Livre]:
+        conditions, parametres = [], []
+        if titre:
+            conditions.append('instr(titre_norm, ?) > 0')
+            parametres.append(normaliser(titre).strip())
+        if auteur:
+            conditions.append('instr(auteur_norm, ?) > 0')
+            parametres.append(normaliser(auteur).strip())
+        if genre:
+            conditions.append('genre_norm = ?')
+            parametres.append(normaliser(genre).strip())
+        if disponible is not None:
+            conditions.append('disponible = ?')
+            parametres.append(int(bool(disponible)))
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        return list(self._livres(f'SELECT {_COLONNES} FROM livres {where} ORDER BY id', parametres))
+
+    def filtrer(self, champ: str, valeur: str) -> List[Livre]:
+        """Livres dont le champ ('genre' ou 'auteur') vaut exactement `valeur` (normalisée)."""
+        return list(self._livres(
+            f'SELECT {_COLONNES} FROM livres WHERE {champ}_norm = ? ORDER BY id', (normaliser(valeur).strip(),)))
+
+    def trier(self, cles: List[Tuple[str, bool]]) -> List[Livre]:
+        """Livres triés selon des (champ, décroissant), la première clé étant prioritaire."""
+        return list(self._livres(f'SELECT {_COLONNES} FROM livres ORDER BY {_ordre(cles)}'))
+
+    def plage(self, champ: str, minimum: Any = None, maximum: Any = None, k: Optional[int] = None,
+              decroissant: bool = False) -> List[Livre]:
+        """Au plus k livres, dans l'ordre du champ, dont la valeur est entre les bornes (incluses)."""
+        colonne = _TRIS[champ][-1]
+        conditions, parametres = [], []
+        for operateur, borne in (('>=', minimum), ('<=', maximum)):
+            if borne is not None:
+                conditions.append(f'{colonne} {operateur} ?')
+                parametres.append(normaliser(borne).strip() if colonne.endswith('_norm') else borne)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        limite = ''
+        if k is not None:
+            limite = 'LIMIT ?'
+            parametres.append(k)
+        return list(self._livres(
+            f'SELECT {_COLONNES} FROM livres {where} ORDER BY {_ordre([(champ, decroissant)])} {limite}', parametres))
+
+    def rapport(self, k: int = 3) -> Dict[str, Any]:
+        total, disponibles, prix_total = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(disponible), 0), COALESCE(SUM(prix), 0.0) FROM livres').fetchone()
+        ligne = self._conn.execute(
+            'SELECT genre, COUNT(*) AS n FROM livres GROUP BY genre ORDER BY n DESC, MIN(id) LIMIT 1').fetchone()
+        return {
+            'total': total,
+            'disponibles': disponibles,
+            'empruntes': total - disponibles,
+            'prix_total': prix_total,
+            'genre_populaire': ligne['genre'] if ligne else None,
+            'moins_chers': list(self._livres(f'SELECT {_COLONNES} FROM livres ORDER BY prix, id LIMIT ?', (k,))),
+            'plus_chers': list(self._livres(f'SELECT {_COLONNES} FROM livres ORDER BY prix DESC, id LIMIT ?', (k,)))
+        }
+
+    def _livres(self, requete: str, parametres: Iterable[Any] = ()) -> Iterator[Livre]:
+        return (_vers_livre(ligne) for ligne in self._conn.execute(requete, tuple(parametres)))
+
+    # --- Migration ---
+
+    def importer(self, livres: Iterable[Dict[str, Any]], prochain_id: int = 1,
+                 source: Optional[str] = None) -> int:
+        """Importe des livres (avec leur historique) en une transaction ; retourne leur nombre.
+
+        `prochain_id` préserve le compteur monotone de la source, même si ses
+        derniers livres ont été supprimés. Avec `source`, la migration est
+        marquée terminée dans la même transaction (voir `migration`) : un import
+        interrompu ne laisse ni livres ni marque.
+        """
+        livres = list(livres)
+        with self._conn:
+            self._inserer(livres)
+            self._conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'livres'", (prochain_id - 1,))
+            self._conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'livres', ? "
+                               "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'livres')", (prochain_id - 1,))
+            if source is not None:
+                self._marquer_migration(source)
+        return len(livres)
+
+    @property
+    def migration(self) -> Optional[str]:
+        """Source de la migration terminée, ou None si aucune ne l'a été."""
+        ligne = self._conn.execute("SELECT valeur FROM meta WHERE cle = 'migration'").fetchone()
+        return None if ligne is None else ligne[0]
+
+    def marquer_migration(self, source: str) -> None:
+        """Marque la migration terminée sans rien importer (base déjà remplie ou sans source)."""
+        with self._conn:
+            self._marquer_migration(source)
+
+    def _marquer_migration(self, source: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (cle, valeur) VALUES ('migration', ?)", (source,))
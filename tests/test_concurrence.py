@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from bibliotheque import (afficher_journal, ajouter_livre, charger_bibliotheque, emprunter_livre,
+                          sauvegarder_bibliotheque)
+from catalogue import Catalogue
+from verrous import VerrouFichier
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def historique(catalogue, id_livre):
+    registre = catalogue.emprunts
+    return registre.historique(id_livre) if registre is not None else catalogue.historique(id_livre)
+
+@pytest.mark.parametrize('emprunts', [True, False])
+def test_historiques_differes_apres_sauvegarde_d_un_autre_processus(tmp_path, emprunts):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    catalogue = Catalogue()
+    for i in range(1, 11):
+        catalogue.append({'id': i, 'titre': f'Titre {i}', 'auteur': 'Auteur', 'genre': 'Roman',
+                          'annee_publication': 2000, 'prix': 10.0, 'disponible': True, 'note': 0,
+                          'historique': [{'action': 'emprunt', 'date': '2024-01-01 10:00'},
+                                         {'action': 'retour', 'date': '2024-01-05 10:00'}]})
+    sauvegarder_bibliotheque(catalogue, chemin)
+
+    # Comme main.ChargementEnFond : historiques relus à la demande dans le fichier
+    livres = charger_bibliotheque(chemin, journaliser=True, mode='paresseux', emprunts=emprunts)
+    # Un autre processus modifie le fichier et le remplace par renommage
+    subprocess.run([sys.executable, os.path.join(RACINE, 'main.py'), '--fichier', chemin, 'noter', '5', '3'],
+                   check=True, capture_output=True)
+
+    emprunter_livre(livres, 2)
+    afficher_journal(livres, 3)
+    assert [e['action'] for e in historique(livres, 2)] == ['emprunt', 'retour', 'emprunt']
+    sauvegarder_bibliotheque(livres, chemin, compacter=True)
+    ajouter_livre(livres, 'Nouveau', 'Autrice', 'Essai', 2020, 5.0)
+    sauvegarder_bibliotheque(livres, chemin, compacter=True)
+    livres.journal.fermer()
+
+    recharge = charger_bibliotheque(chemin, emprunts=emprunts)
+    assert len(recharge) == 11
+    assert [e['action'] for e in historique(recharge, 2)] == ['emprunt', 'retour', 'emprunt']
+    assert len(historique(recharge, 7)) == 2
+
+def _charger_dans_un_autre_processus(chemin):
+    code = ('import sys, time; sys.path.insert(0, sys.argv[1]); from bibliotheque import charger_bibliotheque; '
+            't = time.perf_counter(); charger_bibliotheque(sys.argv[2]); print(time.perf_counter() - t)')
+    sortie = subprocess.run([sys.executable, '-c', code, RACINE, chemin], check=True, capture_output=True, text=True)
+    return float(sortie.stdout)
+
+def test_verrou_limite_au_fichier_de_donnees(tmp_path):
+    premier, second = str(tmp_path / 'a.json'), str(tmp_path / 'b.json')
+    for chemin in (premier, second):
+        sauvegarder_bibliotheque(Catalogue(), chemin)
+    with VerrouFichier(premier).exclusif():
+        # Un autre catalogue du même répertoire se charge sans attendre
+        assert _charger_dans_un_autre_processus(second) < 1.0
+        attente = []
+        lecteur = threading.Thread(target=lambda: attente.append(_charger_dans_un_autre_processus(premier)))
+        lecteur.start()
+        time.sleep(2.0)
+    lecteur.join()
+    # Le chargement du fichier verrouillé a attendu la fin de l'écriture
+    assert attente[0] >= 0.5
+    assert sorted(os.listdir(tmp_path)) == ['a.json', 'a.json.verrou', 'b.json', 'b.json.verrou']
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from bibliotheque import charger_bibliotheque, emprunter_livre, sauvegarder_bibliotheque
+from emprunts import chemin_emprunts
+
+HISTORIQUES = {
+    1: [{'action': 'emprunt', 'date': '2024-01-02 10:00'}, {'action': 'retour', 'date': '2024-01-09 18:30'}],
+    2: [],
+    3: [{'action': 'emprunt', 'date': '2024-03-01 09:15'}],
+}
+
+def ecrire_fichier_historique(chemin, historiques=HISTORIQUES):
+    """Fichier à l'ancien format : une liste de livres, chacun avec son historique."""
+    livres = [{'id': i, 'titre': f'Titre {i}', 'auteur': 'Auteur', 'genre': 'Roman', 'annee_publication': 2000,
+               'prix': 10.5, 'disponible': not (h and h[-1]['action'] == 'emprunt'), 'note': 0, 'historique': h}
+              for i, h in historiques.items()]
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(livres, f, ensure_ascii=False, indent=4)
+
+def test_migration_depuis_un_fichier_historique(tmp_path):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    ecrire_fichier_historique(chemin)
+
+    catalogue = charger_bibliotheque(chemin)
+    assert not os.path.exists(chemin_emprunts(chemin))
+    assert {i: catalogue.historique(i) for i in HISTORIQUES} == HISTORIQUES
+
+    sauvegarder_bibliotheque(catalogue, chemin)
+    assert os.path.exists(chemin_emprunts(chemin))
+    donnees = json.load(open(chemin, encoding='utf-8'))
+    assert donnees['emprunts_enregistres'] == 3
+    assert all(not livre.get('historique') for livre in donnees['livres'])
+
+    for mode in ('complet', 'paresseux'):
+        recharge = charger_bibliotheque(chemin, mode=mode)
+        assert {i: recharge.emprunts.historique(i) for i in HISTORIQUES} == HISTORIQUES, mode
+
+def test_evenement_ecrit_avec_le_snapshot(tmp_path):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    ecrire_fichier_historique(chemin)
+    catalogue = charger_bibliotheque(chemin)
+    sauvegarder_bibliotheque(catalogue, chemin)
+
+    emprunter_livre(catalogue, 2)
+    # Pas encore sauvegardé : ni l'état ni l'événement ne sont sur disque
+    assert charger_bibliotheque(chemin).emprunts.historique(2) == []
+    sauvegarder_bibliotheque(catalogue, chemin)
+    recharge = charger_bibliotheque(chemin)
+    assert not recharge.get(2)['disponible']
+    assert [e['action'] for e in recharge.emprunts.historique(2)] == ['emprunt']
+
+@pytest.mark.parametrize('date', ['2024-01-02', '1965-05-01 10:00'])
+def test_historique_hors_format_garde_dans_le_fichier(tmp_path, date):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    historiques = {1: [{'action': 'emprunt', 'date': date}]}
+    ecrire_fichier_historique(chemin, historiques)
+    catalogue = charger_bibliotheque(chemin)
+    sauvegarder_bibliotheque(catalogue, chemin)
+    assert not os.path.exists(chemin_emprunts(chemin))
+    assert charger_bibliotheque(chemin).historique(1) == historiques[1]
+    assert sorted(os.listdir(tmp_path)) == ['bibliotheque.json', 'bibliotheque.json.verrou']
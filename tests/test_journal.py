@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from bibliotheque import (ajouter_livre, ajouter_note, charger_bibliotheque, emprunter_livre,
+                          retourner_livre, sauvegarder_bibliotheque, supprimer_livre)
+from journal import chemin_journal
+
+def etat(catalogue):
+    """Livres et historiques d'un catalogue, comparables d'un chargement à l'autre."""
+    registre = catalogue.emprunts
+    return [(dict(livre, historique=None),
+             registre.historique(livre['id']) if registre is not None else catalogue.historique(livre['id']))
+            for livre in catalogue]
+
+@pytest.fixture
+def fichier(tmp_path):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    catalogue = charger_bibliotheque(chemin)
+    for i in range(5):
+        ajouter_livre(catalogue, f'Titre {i}', f'Auteur {i}', 'Roman', 2000 + i, 10.0 + i)
+    sauvegarder_bibliotheque(catalogue, chemin)
+    return chemin
+
+def muter(catalogue):
+    ajouter_livre(catalogue, 'Nouveau', 'Autrice', 'Essai', 2020, 7.5)
+    emprunter_livre(catalogue, 2)
+    retourner_livre(catalogue, 2)
+    emprunter_livre(catalogue, 3)
+    ajouter_note(catalogue, 4, 5)
+    supprimer_livre(catalogue, 1)
+
+def test_rejeu_du_journal(fichier):
+    catalogue = charger_bibliotheque(fichier, journaliser=True)
+    muter(catalogue)
+    sauvegarder_bibliotheque(catalogue, fichier)
+    catalogue.journal.fermer()
+    # Le fichier de données n'a pas été réécrit : tout vient du journal
+    assert len(json.load(open(fichier, encoding='utf-8'))['livres']) == 5
+    assert os.path.getsize(chemin_journal(fichier)) > 0
+    for mode in ('complet', 'flux', 'paresseux'):
+        assert etat(charger_bibliotheque(fichier, mode=mode)) == etat(catalogue), mode
+
+def test_derniere_ligne_incomplete_ignoree_puis_tronquee(fichier):
+    catalogue = charger_bibliotheque(fichier, journaliser=True)
+    muter(catalogue)
+    catalogue.journal.fermer()
+    attendu = etat(catalogue)
+    with open(chemin_journal(fichier), 'a', encoding='utf-8') as f:
+        f.write('{"seq": 999, "op": "suppression", "i')
+
+    assert etat(charger_bibliotheque(fichier)) == attendu
+    catalogue = charger_bibliotheque(fichier, journaliser=True)
+    emprunter_livre(catalogue, 5)
+    catalogue.journal.fermer()
+    with open(chemin_journal(fichier), encoding='utf-8') as f:
+        lignes = f.read().split('\n')
+    assert lignes[-1] == ''
+    assert all(json.loads(ligne)['seq'] != 999 for ligne in lignes[:-1])
+    recharge = charger_bibliotheque(fichier)
+    assert etat(recharge) == etat(catalogue)
+    assert not recharge.get(5)['disponible']
+
+def test_compactage_puis_rechargement(fichier):
+    catalogue = charger_bibliotheque(fichier, journaliser=True, mode='paresseux')
+    muter(catalogue)
+    sauvegarder_bibliotheque(catalogue, fichier, compacter=True)
+    assert os.path.getsize(chemin_journal(fichier)) == 0
+    emprunter_livre(catalogue, 4)
+    sauvegarder_bibliotheque(catalogue, fichier, compacter=True)
+    catalogue.journal.fermer()
+    for mode in ('complet', 'flux', 'paresseux'):
+        recharge = charger_bibliotheque(fichier, mode=mode)
+        assert etat(recharge) == etat(catalogue), mode
+        assert recharge.prochain_id == catalogue.prochain_id
+        assert recharge.sequence == catalogue.sequence
@@ -0,0 +1,34 @@
+import asyncio
+
+from bibliotheque import ajouter_livre, charger_bibliotheque, sauvegarder_bibliotheque
+from serveur import ServeurBibliotheque
+
+def test_sauvegarde_en_echec_applique_mais_non_durable(tmp_path):
+    chemin = str(tmp_path / 'bibliotheque.json')
+    catalogue = charger_bibliotheque(chemin)
+    for i in range(3):
+        ajouter_livre(catalogue, f'Titre {i}', f'Auteur {i}', 'Roman', 2000 + i, 10.0 + i)
+    sauvegarder_bibliotheque(catalogue, chemin)
+
+    async def scenario():
+        livres = charger_bibliotheque(chemin, journaliser=True, fsync='jamais')
+        serveur = ServeurBibliotheque(livres, chemin, delai_groupe=0)
+        sauvegarder = serveur.validation._sauvegarder
+
+        def disque_plein():
+            raise OSError('disque plein')
+        serveur.validation._sauvegarder = disque_plein
+        statut, reponse = await serveur._traiter('POST', '/livres/1/emprunt', b'')
+        assert statut == 503, reponse
+        assert not livres.get(1)['disponible']
+        # Pas de second emprunt : la modification est bien appliquée
+        assert (await serveur._traiter('POST', '/livres/1/emprunt', b''))[0] == 400
+
+        serveur.validation._sauvegarder = sauvegarder
+        assert (await serveur._traiter('POST', '/livres/2/emprunt', b''))[0] == 200
+        assert (await serveur._traiter('GET', '/livres/9', b''))[0] == 404
+        await serveur.fermer()
+
+    asyncio.run(scenario())
+    recharge = charger_bibliotheque(chemin)
+    assert [livre['disponible'] for livre in recharge] == [False, False, True]
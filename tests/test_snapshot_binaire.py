@@ -0,0 +1,45 @@
+import json
+
+from bibliotheque import charger_bibliotheque, convertir_bibliotheque, sauvegarder_bibliotheque
+from catalogue import Catalogue
+
+def catalogue_exemple():
+    catalogue = Catalogue()
+    for i in range(1, 40):
+        catalogue.append({
+            'id': i, 'titre': f'Titre é {i}', 'auteur': ['Hugo', 'Camus', 'Zola'][i % 3],
+            'genre': ['Roman', 'Essai'][i % 2], 'annee_publication': None if i % 7 == 0 else 1900 + i,
+            'prix': i if i % 4 == 0 else round(i * 1.37, 2), 'disponible': bool(i % 2), 'note': i % 6,
+            'historique': [{'action': 'emprunt', 'date': '2024-01-01 12:00'}] * (i % 3),
+        })
+        if i % 5 == 0:
+            catalogue.get(i)['isbn'] = f'X{i}'
+    catalogue.supprimer(5)
+    return catalogue
+
+def test_aller_retour_json_bin_json(tmp_path):
+    source, binaire, retour = (str(tmp_path / nom) for nom in ('a.json', 'a.bin', 'b.json'))
+    sauvegarder_bibliotheque(catalogue_exemple(), source, compacter=True)
+    convertir_bibliotheque(source, binaire)
+    convertir_bibliotheque(binaire, retour)
+    avant, apres = (json.load(open(chemin, encoding='utf-8')) for chemin in (source, retour))
+    assert apres == avant
+    # 12 == 12.0 : les types des prix sont comparés à part
+    assert [type(l['prix']) for l in apres['livres']] == [type(l['prix']) for l in avant['livres']]
+    assert int in {type(l['prix']) for l in apres['livres']}
+
+def test_modes_de_chargement_du_binaire(tmp_path):
+    source, binaire = str(tmp_path / 'a.json'), str(tmp_path / 'a.bin')
+    attendu = catalogue_exemple()
+    sauvegarder_bibliotheque(attendu, source, compacter=True)
+    convertir_bibliotheque(source, binaire)
+    for mode in ('complet', 'flux', 'paresseux'):
+        catalogue = charger_bibliotheque(binaire, mode=mode, emprunts=False)
+        assert [dict(l, historique=catalogue.historique(l['id'])) for l in catalogue] == \
+            [dict(l, historique=attendu.historique(l['id'])) for l in attendu], mode
+    snapshot = charger_bibliotheque(binaire, mode='mmap', emprunts=False)
+    try:
+        assert len(snapshot) == len(attendu) and snapshot.get(5) is None
+        assert dict(snapshot.get(18)) == dict(attendu.get(18))
+    finally:
+        snapshot.fermer()
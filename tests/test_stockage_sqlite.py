@@ -0,0 +1,55 @@
+import pytest
+
+import stockage_sqlite
+from bibliotheque import ouvrir_sqlite
+from test_emprunts import HISTORIQUES, ecrire_fichier_historique
+
+def test_migration_interrompue_reprise_a_l_ouverture_suivante(tmp_path, monkeypatch):
+    source = str(tmp_path / 'bibliotheque.json')
+    chemin = str(tmp_path / 'bibliotheque.db')
+    ecrire_fichier_historique(source)
+
+    normaliser = stockage_sqlite.normaliser
+    appels = []
+    def normaliser_en_panne(texte):
+        appels.append(texte)
+        if len(appels) > 4:
+            raise RuntimeError('panne pendant la migration')
+        return normaliser(texte)
+    monkeypatch.setattr(stockage_sqlite, 'normaliser', normaliser_en_panne)
+    with pytest.raises(RuntimeError):
+        ouvrir_sqlite(chemin)
+    monkeypatch.setattr(stockage_sqlite, 'normaliser', normaliser)
+
+    base = ouvrir_sqlite(chemin)
+    try:
+        assert base.migration == source
+        assert sorted(l.id for l in base) == sorted(HISTORIQUES)
+        assert {i: base.historique(i) for i in HISTORIQUES} == HISTORIQUES
+        assert base.prochain_id == max(HISTORIQUES) + 1
+    finally:
+        base.fermer()
+
+    # Migration marquée : le JSON n'est plus relu, même si la base est vidée
+    base = ouvrir_sqlite(chemin)
+    for i in HISTORIQUES:
+        base.supprimer(i)
+    base.fermer()
+    base = ouvrir_sqlite(chemin)
+    try:
+        assert len(base) == 0
+    finally:
+        base.fermer()
+
+def test_base_sans_json_marquee_sans_import(tmp_path):
+    chemin = str(tmp_path / 'bibliotheque.db')
+    base = ouvrir_sqlite(chemin)
+    base.fermer()
+
+    ecrire_fichier_historique(str(tmp_path / 'bibliotheque.json'))
+    base = ouvrir_sqlite(chemin)
+    try:
+        assert base.migration is not None
+        assert len(base) == 0
+    finally:
+        base.fermer()
@@ -0,0 +1,18 @@
+import pytest
+
+from bibliotheque import ouvrir_sqlite, trier_catalogue
+from catalogue import Catalogue
+
+ANNEES = [2000, None, 1990, None, 2010]
+
+@pytest.mark.parametrize('cle, attendu', [('annee', [3, 1, 5, 2, 4]), ('-annee', [2, 4, 5, 1, 3])])
+def test_livres_sans_valeur_selon_le_sens_du_tri(tmp_path, cle, attendu):
+    livres = [{'id': i, 'titre': f'Titre {i}', 'auteur': 'Auteur', 'genre': 'Roman', 'annee_publication': a,
+               'prix': 10.0, 'disponible': True, 'note': 0} for i, a in enumerate(ANNEES, 1)]
+    base = ouvrir_sqlite(str(tmp_path / 'bibliotheque.db'))
+    base.importer(livres, prochain_id=len(livres) + 1)
+    try:
+        for source in (list(livres), Catalogue(livres), base):
+            assert [livre['id'] for livre in trier_catalogue(source, cle)] == attendu, type(source)
+    finally:
+        base.fermer()
@@ -0,0 +1,129 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de flock, le verrou entre processus est alors sans effet
+    fcntl = None
+
+# ------------------
+# Verrous (threads d'un processus, processus concurrents)
+# ------------------
+
+def chemin_verrou(filename: str) -> str:
+    return filename + '.verrou'
+
+class VerrouLectureEcriture:
+    """Verrou lecteurs-rédacteur : lectures simultanées, écritures exclusives.
+
+    Un rédacteur en attente bloque les nouvelles lectures, pour ne pas être
+    affamé par un flot de recherches. Un thread peut imbriquer des lectures, et
+    lire ou réécrire pendant sa propre écriture ; demander l'écriture pendant
+    une lecture du même thread lève RuntimeError au lieu de s'interbloquer.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._lecteurs = 0
+        self._redacteur: Optional[int] = None
+        self._redacteurs_en_attente = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def lecture(self) -> Iterator[None]:
+        lectures = getattr(self._local, 'lectures', 0)
+        if lectures or self._redacteur == threading.get_ident():
+            # Déjà détenu par ce thread
+            self._local.lectures = lectures + 1
+            try:
+                yield
+            finally:
+                self._local.lectures = lectures
+            return
+        with self._condition:
+            while self._redacteur is not None or self._redacteurs_en_attente:
+                self._condition.wait()
+            self._lecteurs += 1
+        self._local.lectures = 1
+        try:
+            yield
+        finally:
+            self._local.lectures = 0
+            with self._condition:
+                self._lecteurs -= 1
+                if not self._lecteurs:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def ecriture(self) -> Iterator[None]:
+        moi = threading.get_ident()
+        if self._redacteur == moi:
+            yield
+            return
+        if getattr(self._local, 'lectures', 0):
+            raise RuntimeError("Écriture demandée pendant une lecture du même thread.")
+        with self._condition:
+            self._redacteurs_en_attente += 1
+            try:
+                while self._redacteur is not None or self._lecteurs:
+                    self._condition.wait()
+            finally:
+                self._redacteurs_en_attente -= 1
+            self._redacteur = moi
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._redacteur = None
+                self._condition.notify_all()
+
+class VerrousParCle:
+    """Verrous répartis par clé (id de livre) : deux opérations sur un même livre
+    s'excluent, sur deux livres différents elles ne s'attendent presque jamais."""
+
+    def __init__(self, n: int = 64) -> None:
+        self._verrous = [threading.RLock() for _ in range(n)]
+
+    def verrou(self, cle: Any) -> threading.RLock:
+        return self._verrous[hash(cle) % len(self._verrous)]
+
+class VerrouFichier:
+    """Verrou consultatif entre processus (flock) sur `<fichier>.verrou`.
+
+    Le fichier de données est remplacé par renommage à chaque sauvegarde : le
+    verrou porte donc sur un fichier à part, qui lui ne change pas. Il couvre le
+    fichier de données et ses propres fichiers annexes (journal, registre des
+    emprunts), et eux seuls : deux catalogues d'un même répertoire ne s'attendent
+    pas. Chaque acquisition ouvre son propre descripteur, si bien que deux
+    threads du même processus s'excluent aussi.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.chemin = chemin_verrou(filename)
+
+    def partage(self) -> Any:
+        """Lecteurs : plusieurs à la fois, mais jamais pendant une écriture."""
+        return self._verrouiller(fcntl.LOCK_SH if fcntl else None)
+
+    def exclusif(self) -> Any:
+        return self._verrouiller(fcntl.LOCK_EX if fcntl else None)
+
+    @contextmanager
+    def _verrouiller(self, mode: Optional[int]) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        try:
+            f = open(self.chemin, 'a')
+        except OSError:
+            # Répertoire en lecture seule : rien à protéger, une écriture y échouerait
+            yield
+            return
+        with f:
+            fcntl.flock(f.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)